@@ -0,0 +1,57 @@
+"""benchmark: peak memory of SiteXmlWriter.write with and without compact mode
+
+The test data (ISRICWISE_DE_LR) is tiled n x n times. Reported are the traced peak
+of write (profiles built before) and the float64 copy of one block of layers
+that validation adds in compact mode.
+
+usage: python benchmarks/bench_compact_memory.py [n]
+"""
+import io
+import sys
+import tracemalloc
+
+import numpy as np
+import xarray as xr
+
+from ldndctools.io.xmlwriter import BLOCK_CELLS, SiteXmlWriter
+from ldndctools.misc.types import RES
+from ldndctools.sources.soil.soil_iscricwise import ISRICWISE_SoilDataset
+
+
+def tiled(ds: xr.Dataset, n: int) -> xr.Dataset:
+    """ds repeated n times along lat and lon"""
+    dlat = float(ds.lat[1] - ds.lat[0]) * ds.sizes["lat"]
+    dlon = float(ds.lon[1] - ds.lon[0]) * ds.sizes["lon"]
+    rows = [
+        xr.concat(
+            [
+                ds.assign_coords(lat=ds.lat + a * dlat, lon=ds.lon + b * dlon)
+                for b in range(n)
+            ],
+            "lon",
+        )
+        for a in range(n)
+    ]
+    return xr.concat(rows, "lat")
+
+
+def main(n: int = 8):
+    ds = tiled(xr.open_dataset("tests/data/ISRICWISE_DE_LR.nc").load(), n)
+    for compact in [False, True]:
+        soil = ISRICWISE_SoilDataset(ds, compact=compact)
+        profiles = soil.profiles
+        block = profiles.gather().take(np.arange(BLOCK_CELLS))
+        widened = sum(v.size * 8 for v in block.layers.values())
+
+        tracemalloc.start()
+        SiteXmlWriter(soil, res=RES.LR).write(cache_size=0, outfile=io.StringIO())
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(
+            f"compact={compact!s:5}  cells={len(profiles)}  "
+            f"peak={peak / 2**20:6.1f} MiB  float64 block={widened / 2**20:4.1f} MiB"
+        )
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:]))
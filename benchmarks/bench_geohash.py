@@ -0,0 +1,62 @@
+"""benchmark: scalar vs. vectorized decimal geohash encoding of global grids
+
+usage: python benchmarks/bench_geohash.py [number of scalar samples]
+"""
+import sys
+import time
+
+import numpy as np
+
+from ldndctools.misc.geohash import (
+    coords2geohash_dec,
+    coords2geohash_dec_array,
+    geohash_dec2coords,
+    geohash_dec2coords_array,
+)
+
+GRIDS = {"LR": 0.5, "MR": 0.25, "HR": 1 / 12}
+
+
+def main(n_scalar: int = 20_000):
+    for name, res in GRIDS.items():
+        lats = np.arange(-90 + res / 2, 90, res)
+        lons = np.arange(-180 + res / 2, 180, res)
+        lat2d, lon2d = np.meshgrid(lats, lons, indexing="ij")
+        n = lat2d.size
+
+        # flat arrays of cell coordinates (as in SiteXmlWriter) and a broadcast grid
+        t0 = time.perf_counter()
+        ids = coords2geohash_dec_array(lat2d.ravel(), lon2d.ravel())
+        t_enc = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        grid = coords2geohash_dec_array(lats[:, None], lons[None, :])
+        t_grid = time.perf_counter() - t0
+        assert (grid.ravel() == ids).all()
+
+        t0 = time.perf_counter()
+        geohash_dec2coords_array(ids)
+        t_dec = time.perf_counter() - t0
+
+        # scalar versions are timed on a sample and extrapolated to the grid
+        pick = np.random.default_rng(0).choice(n, size=min(n_scalar, n), replace=False)
+        plats, plons = lat2d.ravel()[pick], lon2d.ravel()[pick]
+        t0 = time.perf_counter()
+        ref = [coords2geohash_dec(lat=a, lon=o) for a, o in zip(plats, plons)]
+        t_enc_scalar = (time.perf_counter() - t0) * n / len(pick)
+        t0 = time.perf_counter()
+        [geohash_dec2coords(geohash_dec=cid) for cid in ref]
+        t_dec_scalar = (time.perf_counter() - t0) * n / len(pick)
+
+        assert ids[pick].tolist() == ref
+
+        print(
+            f"{name} ({n:>9,} cells)  "
+            f"encode {t_enc_scalar:7.2f} s -> {t_enc:6.3f} s "
+            f"(x{t_enc_scalar / t_enc:.0f}, grid {t_grid:6.3f} s)"
+            f"  decode {t_dec_scalar:7.2f} s -> {t_dec:6.3f} s "
+            f"(x{t_dec_scalar / t_dec:.0f})"
+        )
+
+
+if __name__ == "__main__":
+    main(*[int(x) for x in sys.argv[1:]])
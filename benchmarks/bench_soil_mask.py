@@ -0,0 +1,78 @@
+"""benchmark: ISRICWISE_SoilDataset construction (layer count mask) on global grids
+
+usage: python benchmarks/bench_soil_mask.py [number of rows for count_layers]
+"""
+import sys
+import time
+
+import numpy as np
+import xarray as xr
+
+from ldndctools.sources.soil.soil_iscricwise import count_layers, ISRICWISE_SoilDataset
+
+GRIDS = {"LR": 0.5, "MR": 0.25, "HR": 1 / 12}
+CHECK_VARS = ["PHAQ", "BULK", "CLPC"]
+
+
+def soil_grid(res: float, nlev: int = 5, seed: int = 0) -> xr.Dataset:
+    """synthetic ISRIC-WISE like source (random profile lengths and gaps)"""
+    rng = np.random.default_rng(seed)
+    lats = np.arange(-90 + res / 2, 90, res)
+    lons = np.arange(-180 + res / 2, 180, res)
+    shape = (nlev, len(lats), len(lons))
+
+    nlayers = rng.integers(0, nlev + 1, size=shape[1:])
+    present = np.arange(nlev)[:, None, None] < nlayers
+    top = np.where(present, np.arange(nlev)[:, None, None] * 20.0, np.nan)
+
+    coords = {"lev": np.arange(1, nlev + 1), "lat": lats, "lon": lons}
+    dims = ("lev", "lat", "lon")
+    ds = xr.Dataset(coords=coords)
+    ds["TopDep"] = dims, top
+    ds["BotDep"] = dims, top + 20.0
+    for v in CHECK_VARS:
+        values = np.where(present, rng.random(shape) * 10, np.nan)
+        values[rng.random(shape) < 0.01] = -1
+        ds[v] = dims, values
+    return ds
+
+
+def count_layers_mask(soildata: xr.Dataset) -> xr.DataArray:
+    """previous _build_mask (count_layers per cell)"""
+    ds_mask = xr.Dataset()
+    for v in CHECK_VARS + ["DEPTH"]:
+        ds_mask[v] = xr.apply_ufunc(
+            count_layers, soildata[v], input_core_dims=[["lev"]], vectorize=True
+        )
+        ds_mask[v] = ds_mask[v].where(ds_mask[v] > 0)
+    return ds_mask.to_array(dim="v", name="mask").min(dim="v", skipna=False)
+
+
+def main(n_rows: int = 20):
+    for name, res in GRIDS.items():
+        ds = soil_grid(res)
+        n = ds.sizes["lat"] * ds.sizes["lon"]
+
+        t0 = time.perf_counter()
+        soil = ISRICWISE_SoilDataset(ds)
+        mask = soil.layer_mask
+        t_new = time.perf_counter() - t0
+
+        # count_layers is timed on a sample of rows and extrapolated to the grid
+        rows = min(n_rows, ds.sizes["lat"])
+        sample = soil.original.isel(lat=slice(0, rows))
+        t0 = time.perf_counter()
+        ref = count_layers_mask(sample)
+        t_old = (time.perf_counter() - t0) * ds.sizes["lat"] / rows
+
+        xr.testing.assert_equal(ref, mask.isel(lat=slice(0, rows)))
+
+        print(
+            f"{name} ({n:>9,} cells)  "
+            f"constructor + mask {t_old:7.2f} s -> {t_new:6.3f} s "
+            f"(x{t_old / t_new:.0f})"
+        )
+
+
+if __name__ == "__main__":
+    main(*[int(x) for x in sys.argv[1:]])
@@ -0,0 +1,81 @@
+"""benchmark: minidom site xml vs. template serializer (time per 100k sites)
+
+usage: python benchmarks/bench_xmlserializer.py [number of sites]
+"""
+import io
+import sys
+import time
+import xml.dom.minidom as md
+import xml.etree.cElementTree as et
+from pathlib import Path
+
+import numpy as np
+import xarray as xr
+
+from ldndctools.io.xmlserializer import SiteXmlSerializer
+from ldndctools.io.xmlwriter import build_layer_table, RenderedSite, SiteXmlStream
+from ldndctools.misc.layertable import LayerTable
+from ldndctools.misc.validation import validate_layers
+from ldndctools.misc.xmlclasses import SiteXML
+from ldndctools.sources.soil.soil_iscricwise import ISRICWISE_SoilDataset
+
+TESTFILE = Path(__file__).parents[1] / "tests" / "data" / "ISRICWISE_DE_LR.nc"
+
+
+def minidom_xml(sites):
+    xml = et.Element("ldndcsite")
+    for site_cnt, (lat, lon, cid, rows) in enumerate(sites):
+        site = SiteXML(lat=lat, lon=lon, id=cid)
+        for lay in LayerTable(data=rows, offsets=np.array([0, len(rows)])).layerdata(0):
+            site.xml.find("./soil/layers").append(
+                et.Element("layer", **lay.serialize())
+            )
+        x = site.xml.find("description")
+        if site_cnt == 0:
+            xml.append(x)
+        site.xml.remove(x)
+        xml.append(site.xml)
+    return md.parseString(et.tostring(xml)).toprettyxml()
+
+
+def template_xml(sites, pretty=True):
+    serializer = SiteXmlSerializer(pretty=pretty)
+    fh = io.StringIO()
+    stream = SiteXmlStream(fh, serializer)
+    for lat, lon, cid, rows in sites:
+        xml = serializer.site(
+            lat=lat, lon=lon, cid=cid, layers=serializer.table_layers(rows)
+        )
+        stream.add(RenderedSite(cid=cid, lat=lat, lon=lon, xml=xml))
+    stream.close()
+    return fh.getvalue()
+
+
+def main(n_sites: int = 5000):
+    cells = ISRICWISE_SoilDataset(xr.open_dataset(TESTFILE)).profiles.gather()
+    layers, _ = validate_layers(cells.layers)
+    table = build_layer_table(layers)
+    sites = []
+    for n in range(n_sites):
+        k = n % len(cells)
+        sites.append((cells.lat[k].item(), cells.lon[k].item(), n, table.site(k)))
+
+    timings = {}
+    for name, func in [
+        ("minidom", minidom_xml),
+        ("template (pretty)", template_xml),
+        ("template (compact)", lambda s: template_xml(s, pretty=False)),
+    ]:
+        t0 = time.perf_counter()
+        func(sites)
+        timings[name] = (time.perf_counter() - t0) * 100_000 / n_sites
+
+    assert minidom_xml(sites) == template_xml(sites)
+
+    for name, t in timings.items():
+        speedup = timings["minidom"] / t
+        print(f"{name:20s} {t:8.2f} s per 100k sites  (x{speedup:.1f})")
+
+
+if __name__ == "__main__":
+    main(*[int(x) for x in sys.argv[1:]])
@@ -17,7 +17,7 @@ import xarray as xr
 from dask.distributed import Client
 from pydantic import ValidationError
 
-from ldndctools.misc.geohash import coords2geohash_dec
+from ldndctools.io.idgrid import GeohashGrid
 from ldndctools.misc.types import BoundingBox
 
 warnings.filterwarnings("ignore")
@@ -153,15 +153,12 @@ def writer(
     return all_hashes
 
 
-@np.vectorize
-def inner_func(x, lat, lon):
-    return -1 if np.isnan(x) else coords2geohash_dec(lat=lat, lon=lon)
-
-
 def geohash_xr(mask: xr.DataArray) -> xr.DataArray:
-    lon_xr = mask.lon.broadcast_like(mask)
-    lat_xr = mask.lat.broadcast_like(mask)
-    data = xr.apply_ufunc(inner_func, mask, lat_xr, lon_xr, output_dtypes=[np.int64])
+    grid = GeohashGrid(mask.lat.values, mask.lon.values, name="climate")
+    ids = xr.DataArray(
+        grid.ids, coords={"lat": mask.lat, "lon": mask.lon}, dims=("lat", "lon")
+    )
+    data = ids.broadcast_like(mask).where(mask.notnull(), -1)
     assert data.dtype == np.int64
     return data
 
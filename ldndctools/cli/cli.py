@@ -14,6 +14,7 @@ from pathlib import Path
 from typing import Optional, Sequence
 
 from ldndctools import __version__
+from ldndctools.misc.layertable import PRESETS
 
 log = logging.getLogger(__name__)
 
@@ -145,6 +146,14 @@ def cli(raw_args: Optional[Sequence[str]] = None):
         help="optional location file with lat lon coords",
     )
 
+    parser.add_argument(
+        "--ids",
+        dest="ids",
+        default=None,
+        metavar="FILE",
+        help="optional file with site ids to create (i.e. ids.txt of cdgen)",
+    )
+
     parser.add_argument(
         "-i",
         "--interactive",
@@ -179,6 +188,83 @@ def cli(raw_args: Optional[Sequence[str]] = None):
         help="make passed config (-c) the new default",
     )
 
+    parser.add_argument(
+        "-w",
+        "--workers",
+        dest="workers",
+        default=1,
+        type=int,
+        help="number of processes for site creation",
+    )
+
+    parser.add_argument(
+        "--shard-sites",
+        dest="shard_sites",
+        default=None,
+        type=int,
+        metavar="N",
+        help="split output into numbered xml files with at most N sites",
+    )
+
+    parser.add_argument(
+        "--shard-bytes",
+        dest="shard_bytes",
+        default=None,
+        type=int,
+        metavar="BYTES",
+        help="split output into numbered xml files with at most BYTES size",
+    )
+
+    parser.add_argument(
+        "--sample",
+        dest="sample",
+        default=None,
+        type=int,
+        metavar="N",
+        help="only create N randomly drawn sites",
+    )
+
+    parser.add_argument(
+        "--seed",
+        dest="seed",
+        default=None,
+        type=int,
+        metavar="S",
+        help="random seed for --sample",
+    )
+
+    parser.add_argument(
+        "--discretization",
+        dest="discretization",
+        default="extra_split",
+        choices=list(PRESETS),
+        help="re-discretization of soil layers",
+    )
+
+    parser.add_argument(
+        "--compact",
+        dest="compact",
+        action="store_true",
+        default=False,
+        help="keep soil data as float32 (less memory)",
+    )
+
+    parser.add_argument(
+        "--no-soil-cache",
+        dest="soil_cache",
+        action="store_false",
+        default=True,
+        help="do not cache preprocessed soil data",
+    )
+
+    parser.add_argument(
+        "--block-cache",
+        dest="block_cache",
+        action="store_true",
+        default=False,
+        help="read remote soil data in blocks instead of downloading the file",
+    )
+
     parser.add_argument(
         "-v",
         dest="verbose",
@@ -198,6 +284,18 @@ def cli(raw_args: Optional[Sequence[str]] = None):
         log.critical("Option -S requires that you pass a file with -c.")
         exit(1)
 
+    # a site id file selects the sites, it cannot be combined with a region
+    # selection or a bounding box
+    if args.ids:
+        for option, value in [
+            ("-i", args.interactive),
+            ("--bbox", args.bbox),
+            ("--region", args.rcode),
+        ]:
+            if value:
+                log.critical(f"Option --ids cannot be combined with {option}.")
+                exit(1)
+
     if args.gui:
         try:
             from streamlit import cli as stcli
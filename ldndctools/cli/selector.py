@@ -219,16 +219,42 @@ class Selector(object):
         self._selection = ask_for_region(self)
 
 
+def _site_ids(ids: pd.Series, infile) -> Iterable[int]:
+    """integer site ids (ValueError naming the first invalid id otherwise)"""
+    values = pd.to_numeric(ids, errors="coerce")
+    invalid = values.isna() | (values % 1 != 0)
+    if invalid.any():
+        raise ValueError(
+            f"Site ids in {infile} must be integers, got: {ids[invalid].iloc[0]!r}"
+        )
+    return values.astype("int64").values
+
+
 class CoordinateSelection:
     def __init__(self, infile, lon_col="lon", lat_col="lat", id_col="ID"):
-        df = pd.read_csv(infile, delim_whitespace=True)
+        df = pd.read_csv(infile, sep=r"\s+")
 
         self.lons = df[lon_col].values
         self.lats = df[lat_col].values
         self.ids = (
-            df[id_col].values if id_col in list(df.columns) else range(len(self.lats))
+            _site_ids(df[id_col], infile)
+            if id_col in list(df.columns)
+            else range(len(self.lats))
         )
 
     @property
     def selected(self):
         return dict({k: (v1, v2) for v1, v2, k in zip(self.lons, self.lats, self.ids)})
+
+
+class IdSelection:
+    """site ids (decimal geohash) read from a file (i.e. ids.txt written by cdgen)"""
+
+    def __init__(self, infile):
+        with open(infile) as f:
+            ids = pd.Series([x for line in f for x in line.split()], dtype=object)
+        self.ids = list(_site_ids(ids, infile))
+
+    @property
+    def selected(self):
+        return self.ids
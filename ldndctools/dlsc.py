@@ -23,8 +23,16 @@ from pydantic import ValidationError
 from tqdm import tqdm
 
 from ldndctools.cli.cli import cli
-from ldndctools.cli.selector import ask_for_resolution, CoordinateSelection, Selector
+from ldndctools.cli.selector import (
+    ask_for_resolution,
+    CoordinateSelection,
+    IdSelection,
+    Selector,
+)
 from ldndctools.extra import get_config, set_config
+from ldndctools.io.blockcache import open_source
+from ldndctools.io.soilcache import local_path, SoilCache
+from ldndctools.io.zarrstore import open_zarr, soil_zarr_path
 from ldndctools.misc.create_data import create_dataset
 from ldndctools.misc.types import BoundingBox, RES
 from ldndctools.sources.soil.soil_iscricwise import ISRICWISE_SoilDataset
@@ -41,6 +49,39 @@ with resources.path("data", "") as dpath:
     DPATH = Path(dpath)
 
 
+def _open_soil(
+    catalog, res: RES, *, compact: bool, soil_cache: bool, block_cache: bool = False
+):
+    """soil dataset of res (from the local Zarr copy of soilzarr if present)"""
+    soil_zarr = soil_zarr_path(res.name)
+    cache = None
+    if soil_zarr.exists():
+        # chunked copy, only the chunks of the selected region are read
+        log.info(f"Soil data: {soil_zarr}")
+        soil_raw = open_zarr(soil_zarr)
+        checksum = soil_raw.attrs.get("source_checksum")
+        if soil_cache and checksum:
+            cache = SoilCache(checksum=checksum, name=res.name)
+    elif block_cache:
+        # remote reads of the blocks of the selected region (no full download, so
+        # the preprocessed soil cache of the full grid is not used)
+        soil_raw = open_source(catalog.soil(res=res.name))
+    elif soil_cache:
+        # preprocessed profiles come from the cache, the source is opened lazily
+        source = catalog.soil(res=res.name)
+        soil_raw = source.to_dask()
+        cache = SoilCache(
+            local_path(source.urlpath, source.storage_options), name=res.name
+        )
+    else:
+        soil_raw = catalog.soil(res=res.name).read()
+
+    soil = ISRICWISE_SoilDataset(soil_raw, compact=compact)
+    if cache is not None:
+        cache.attach(soil)
+    return soil
+
+
 def main():
     # parse args
     args = cli()
@@ -65,7 +106,7 @@ def main():
     #     SOURCE=_get_cfg_item("project", "source"),
     # )
 
-    if (args.rcode is not None) or (args.file is not None):
+    if (args.rcode is not None) or (args.file is not None) or (args.ids is not None):
         log.info("Non-interactive mode...")
         cfg["interactive"] = False
 
@@ -109,11 +150,17 @@ def main():
         catalog = intake.open_catalog(str(cat))
 
     df = catalog.admin(scale=res_scale_mapper[res]).read()
-    soil_raw = catalog.soil(res=res.name).read()
-
-    soil = ISRICWISE_SoilDataset(soil_raw)
-
-    if args.file:
+    soil = _open_soil(
+        catalog,
+        res,
+        compact=args.compact,
+        soil_cache=args.soil_cache,
+        block_cache=args.block_cache,
+    )
+
+    if args.ids:
+        selector = IdSelection(args.ids)
+    elif args.file:
         selector = CoordinateSelection(args.file)
     else:
         selector = Selector(df)
@@ -131,22 +178,34 @@ def main():
     else:
         if isinstance(selector, Selector):
             log.info("Adjusting bounding box to selection extent")
-            extent = selector.gdf_mask.bounds.iloc[0]
+            minx, miny, maxx, maxy = selector.gdf.total_bounds
 
             new_bbox = BoundingBox(
-                x1=np.floor(extent.minx).astype("float").item(),
-                x2=np.ceil(extent.maxx).astype("float").item(),
-                y1=np.floor(extent.miny).astype("float").item(),
-                y2=np.ceil(extent.maxy).astype("float").item(),
+                x1=np.floor(minx).astype("float").item(),
+                x2=np.ceil(maxx).astype("float").item(),
+                y1=np.floor(miny).astype("float").item(),
+                y2=np.ceil(maxy).astype("float").item(),
             )
             selector.set_bbox(new_bbox)
 
     log.info(selector.selected)
 
     with tqdm(total=1) as progressbar:
-        xml, nc = create_dataset(soil, selector, res, progressbar)
+        # xml is streamed to the outfile while sites are created
+        _, nc = create_dataset(
+            soil,
+            selector,
+            res,
+            progressbar,
+            outfile=cfg["outname"],
+            workers=args.workers,
+            shard_sites=args.shard_sites,
+            shard_bytes=args.shard_bytes,
+            sample=args.sample,
+            seed=args.seed,
+            discretization=args.discretization,
+        )
 
-    open(cfg["outname"], "w").write(xml)
     ENCODING = {
         "siteid": {"dtype": "int32", "_FillValue": -1, "zlib": True},
         "soilmask": {"dtype": "int32", "_FillValue": -1, "zlib": True},
@@ -0,0 +1,197 @@
+"""partial reads of remote (catalog) files through a bounded block cache on disk"""
+import hashlib
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+import fsspec
+import xarray as xr
+from fsspec.caching import BaseCache, register_cache
+
+from ldndctools.io.idgrid import _atomic_write, cache_dir
+
+__all__ = [
+    "DEFAULT_BLOCK_SIZE",
+    "DEFAULT_MAX_BYTES",
+    "DiskBlockCache",
+    "open_blocks",
+    "open_source",
+    "remote_url",
+]
+
+log = logging.getLogger(__name__)
+
+DEFAULT_BLOCK_SIZE = 4 * 2**20
+DEFAULT_MAX_BYTES = 2 * 2**30
+
+
+def _runs(blocks: List[int]) -> Iterator[List[int]]:
+    """consecutive runs of (sorted) block numbers"""
+    run: List[int] = []
+    for n in blocks:
+        if run and n != run[-1] + 1:
+            yield run
+            run = []
+        run.append(n)
+    if run:
+        yield run
+
+
+class DiskBlockCache(BaseCache):
+    """fixed size blocks of a remote file kept on disk (fsspec cache_type)
+
+    Blocks are stored as directory/key/<n>.blk and shared by all processes that
+    open the same remote file. Consecutive missing blocks are fetched with one
+    range request. The least recently used blocks of all files in directory are
+    removed after a fetch, so at most max_bytes are kept.
+    """
+
+    name = "ldndctools_diskblocks"
+
+    def __init__(
+        self,
+        blocksize: int,
+        fetcher,
+        size: int,
+        *,
+        directory: Union[str, Path],
+        key: str,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ):
+        super().__init__(blocksize, fetcher, size)
+        self.directory = Path(directory)
+        self.path = self.directory / key
+        self.max_bytes = max_bytes
+        self.nblocks = -(-size // blocksize)
+
+    def _block_size(self, n: int) -> int:
+        return min(self.blocksize, self.size - n * self.blocksize)
+
+    def _read_block(self, n: int) -> Optional[bytes]:
+        path = self.path / f"{n}.blk"
+        try:
+            data = path.read_bytes()
+            os.utime(path)
+        except OSError:
+            return None
+        return data if len(data) == self._block_size(n) else None
+
+    def _write_block(self, n: int, data: bytes) -> None:
+        try:
+            self.path.mkdir(parents=True, exist_ok=True)
+            _atomic_write(self.path / f"{n}.blk", lambda f: f.write(data))
+        except OSError as err:
+            log.warning(f"Block not cached ({err})")
+
+    def _evict(self) -> None:
+        """remove least recently used blocks (of all files) beyond max_bytes"""
+        blocks = []
+        for path in self.directory.glob("*/*.blk"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            blocks.append((stat.st_mtime_ns, stat.st_size, path))
+
+        total = sum(size for _, size, _ in blocks)
+        for _, size, path in sorted(blocks, key=lambda b: b[0]):
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
+
+    def _fetch(self, start: Optional[int], stop: Optional[int]) -> bytes:
+        if start is None:
+            start = 0
+        if stop is None or stop > self.size:
+            stop = self.size
+        if start >= stop:
+            return b""
+
+        first, last = start // self.blocksize, (stop - 1) // self.blocksize
+        blocks: Dict[int, bytes] = {}
+        missing = []
+        for n in range(first, last + 1):
+            data = self._read_block(n)
+            if data is None:
+                missing.append(n)
+            else:
+                blocks[n] = data
+                self.hit_count += 1
+
+        for run in _runs(missing):
+            offset = run[0] * self.blocksize
+            data = self.fetcher(offset, min((run[-1] + 1) * self.blocksize, self.size))
+            self.miss_count += len(run)
+            self.total_requested_bytes += len(data)
+            for n in run:
+                blocks[n] = data[(n - run[0]) * self.blocksize :][: self.blocksize]
+                self._write_block(n, blocks[n])
+        if missing:
+            self._evict()
+
+        data = b"".join(blocks[n] for n in range(first, last + 1))
+        offset = first * self.blocksize
+        return data[start - offset : stop - offset]
+
+
+register_cache(DiskBlockCache, clobber=True)
+
+
+def remote_url(
+    urlpath: str, storage_options: Optional[Dict[str, Any]] = None
+) -> Tuple[str, Dict[str, Any]]:
+    """url and storage options of a catalog url without the simplecache layer"""
+    options = dict(storage_options or {})
+    if not urlpath.startswith("simplecache::"):
+        return urlpath, options
+    urlpath = urlpath[len("simplecache::") :]
+    protocol = urlpath.split("://")[0] if "://" in urlpath else "file"
+    return urlpath, dict(options.get(protocol, {}))
+
+
+def open_blocks(
+    urlpath: str,
+    storage_options: Optional[Dict[str, Any]] = None,
+    *,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    max_bytes: int = DEFAULT_MAX_BYTES,
+    directory: Optional[Union[str, Path]] = None,
+):
+    """open a remote file for reading, byte ranges are fetched in cached blocks
+
+    The cache key contains the size and version (ETag/ modification time) of the
+    file, so blocks of a replaced remote file are not reused.
+    """
+    fs, path = fsspec.core.url_to_fs(urlpath, **(storage_options or {}))
+    info = fs.info(path)
+    version = info.get("ETag") or info.get("LastModified") or info.get("mtime")
+    key = repr((urlpath, info["size"], str(version), block_size))
+    directory = Path(directory) if directory is not None else cache_dir() / "blocks"
+
+    return fs.open(
+        path,
+        "rb",
+        block_size=block_size,
+        cache_type=DiskBlockCache.name,
+        cache_options={
+            "directory": directory,
+            "key": hashlib.blake2b(key.encode()).hexdigest()[:16],
+            "max_bytes": max_bytes,
+        },
+    )
+
+
+def open_source(source, **kwargs) -> xr.Dataset:
+    """open a (NetCDF) catalog source lazily, reading blocks instead of the file
+
+    kwargs are passed to open_blocks (i.e. block_size, max_bytes). dlsc uses it for
+    soil (--block-cache), elevation has no reader yet but opens the same way.
+    """
+    urlpath, options = remote_url(source.urlpath, source.storage_options)
+    f = open_blocks(urlpath, options, **kwargs)
+    return xr.open_dataset(f, engine="h5netcdf", chunks=source.chunks)
@@ -0,0 +1,131 @@
+"""soil data of many grid cells as plain numpy arrays, selection of grid cells"""
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+from ldndctools.misc.geohash import (
+    coords2geohash_dec_array,
+    geohash_dec2coords_array,
+)
+
+__all__ = ["cells_from_coords", "cells_from_ids", "SiteArrays"]
+
+
+@dataclass
+class SiteArrays:
+    """soil layer data of selected grid cells (one row per cell, row-major order)"""
+
+    jx: np.ndarray
+    ix: np.ndarray
+    lat: np.ndarray
+    lon: np.ndarray
+    layers: Dict[str, np.ndarray]
+    ids: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self.jx)
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """return all data as a flat dict of arrays (layer vars prefixed 'layer/')"""
+        arrays = {"jx": self.jx, "ix": self.ix, "lat": self.lat, "lon": self.lon}
+        if self.ids is not None:
+            arrays["ids"] = self.ids
+        arrays.update({f"layer/{k}": v for k, v in self.layers.items()})
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray]) -> "SiteArrays":
+        """inverse of to_arrays"""
+        return cls(
+            jx=arrays["jx"],
+            ix=arrays["ix"],
+            lat=arrays["lat"],
+            lon=arrays["lon"],
+            ids=arrays.get("ids"),
+            layers={
+                k[len("layer/") :]: v
+                for k, v in arrays.items()
+                if k.startswith("layer/")
+            },
+        )
+
+    def take(self, index: Union[slice, np.ndarray]) -> "SiteArrays":
+        """cells of index (a slice or cell positions)"""
+        return SiteArrays(
+            jx=self.jx[index],
+            ix=self.ix[index],
+            lat=self.lat[index],
+            lon=self.lon[index],
+            ids=None if self.ids is None else self.ids[index],
+            layers={k: v[index] for k, v in self.layers.items()},
+        )
+
+    @classmethod
+    def concat(cls, parts: List["SiteArrays"]) -> "SiteArrays":
+        """cells of all parts (in order)"""
+        arrays = [p.to_arrays() for p in parts]
+        return cls.from_arrays(
+            {k: np.concatenate([a[k] for a in arrays]) for k in arrays[0]}
+        )
+
+    def site(self, n: int) -> Dict[str, np.ndarray]:
+        """return the layer values (var -> array along zdim) of site n"""
+        return {k: v[n] for k, v in self.layers.items()}
+
+
+def _decode(values: np.ndarray, fill_value: Optional[int]) -> np.ndarray:
+    """float values of integer (compact) data, NaN for fill_value"""
+    if fill_value is None or not np.issubdtype(values.dtype, np.integer):
+        return values
+    return np.where(values == fill_value, np.nan, values).astype(np.float32)
+
+
+def _nearest_index(values: np.ndarray, coords: np.ndarray) -> np.ndarray:
+    """index of the nearest coordinate of a regular 1d grid (-1 if outside)"""
+    if len(coords) == 0:
+        return np.full(np.shape(values), -1, dtype=np.int64)
+    step = coords[1] - coords[0] if len(coords) > 1 else 1.0
+    idx = np.rint((values - coords[0]) / step).astype(np.int64)
+    return np.where((idx >= 0) & (idx < len(coords)), idx, -1)
+
+
+def cells_from_ids(
+    ids: Iterable[int], lats: np.ndarray, lons: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """return grid indices (jx, ix) of decimal geohash site ids (row-major order)
+
+    Ids are decoded to coordinates and mapped to cells of the regular lat/ lon grid
+    directly; ids that do not belong to a cell center of this grid are dropped.
+    """
+    ids = np.unique(np.fromiter(ids, dtype=np.int64))
+    clats, clons = geohash_dec2coords_array(ids)
+
+    jx = _nearest_index(clats, lats)
+    ix = _nearest_index(clons, lons)
+
+    valid = (jx >= 0) & (ix >= 0)
+    centers = coords2geohash_dec_array(lats[jx[valid]], lons[ix[valid]])
+    valid[valid] = centers == ids[valid]
+    jx, ix = jx[valid], ix[valid]
+    order = np.lexsort((ix, jx))
+    return jx[order], ix[order]
+
+
+def cells_from_coords(
+    lats: np.ndarray, lons: np.ndarray, grid_lats: np.ndarray, grid_lons: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """snap points to the nearest cells of a regular grid (row-major order)
+
+    Returns cell indices (jx, ix) and for each cell the index of the first point
+    that falls into it. Points outside the grid are dropped, points that share a
+    cell are deduplicated.
+    """
+    jx = _nearest_index(np.asarray(lats, dtype=float), grid_lats)
+    ix = _nearest_index(np.asarray(lons, dtype=float), grid_lons)
+
+    valid = (jx >= 0) & (ix >= 0)
+    flat = jx[valid] * len(grid_lons) + ix[valid]
+    cells, first = np.unique(flat, return_index=True)
+    points = np.flatnonzero(valid)[first]
+    return cells // len(grid_lons), cells % len(grid_lons), points
@@ -0,0 +1,126 @@
+"""decimal geohash id grids, cached on disk and opened memory-mapped"""
+import hashlib
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import BinaryIO, Callable, Optional, Union
+
+import numpy as np
+
+from ldndctools.misc.geohash import coords2geohash_dec_array
+
+__all__ = ["cache_dir", "GeohashGrid"]
+
+log = logging.getLogger(__name__)
+
+
+def cache_dir() -> Path:
+    """default cache location (env LDNDCTOOLS_CACHE or ~/.cache/ldndctools)"""
+    return Path(
+        os.environ.get("LDNDCTOOLS_CACHE", Path.home() / ".cache" / "ldndctools")
+    )
+
+
+def _index_of(values: np.ndarray, coords: np.ndarray) -> Optional[int]:
+    """offset of values as a contiguous slice of coords (None if not contained)"""
+    if len(values) == 0:
+        return None
+    start = np.flatnonzero(coords == values[0])
+    if len(start) == 0:
+        return None
+    start = start[0].item()
+    if not np.array_equal(coords[start : start + len(values)], values):
+        return None
+    return start
+
+
+def _atomic_write(path: Path, write: Callable[[BinaryIO], None]) -> None:
+    """write to a temporary file and move it into place"""
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+class GeohashGrid:
+    """decimal geohash ids of all cells of a lat/ lon grid
+
+    The ids only depend on the grid coordinates, so they are computed once per grid
+    (i.e. the soil grid of a RES or a climate grid) and stored as a .npy file next
+    to the coordinates. Later runs open the ids memory-mapped (zero copy); the
+    stored coordinates are checked and the file is rebuilt if they do not match.
+    Without a usable cache directory the ids are kept in memory.
+    """
+
+    def __init__(
+        self,
+        lats: np.ndarray,
+        lons: np.ndarray,
+        *,
+        name: str = "grid",
+        pre: int = 6,
+        directory: Optional[Union[str, Path]] = None,
+    ):
+        self.lats = np.asarray(lats, dtype=float)
+        self.lons = np.asarray(lons, dtype=float)
+        self.pre = pre
+
+        h = hashlib.blake2b(repr((pre, self.lats.shape, self.lons.shape)).encode())
+        h.update(self.lats.tobytes())
+        h.update(self.lons.tobytes())
+        stem = f"geohash_{name}_{len(self.lats)}x{len(self.lons)}_{h.hexdigest()[:16]}"
+        directory = Path(directory) if directory is not None else cache_dir()
+        self.path = directory / "idgrids" / f"{stem}.npy"
+        self.coords_path = self.path.with_suffix(".coords.npz")
+
+        self.ids: np.ndarray = self._open()
+
+    def _valid(self) -> bool:
+        """check that cached ids exist and belong to this grid"""
+        if not (self.path.is_file() and self.coords_path.is_file()):
+            return False
+        with np.load(self.coords_path) as coords:
+            return (
+                coords["pre"].item() == self.pre
+                and np.array_equal(coords["lat"], self.lats)
+                and np.array_equal(coords["lon"], self.lons)
+            )
+
+    def _build(self) -> np.ndarray:
+        return coords2geohash_dec_array(
+            self.lats[:, None], self.lons[None, :], self.pre
+        )
+
+    def _open(self) -> np.ndarray:
+        try:
+            if not self._valid():
+                self._store(self._build())
+            ids = np.load(self.path, mmap_mode="r")
+            if ids.shape != (len(self.lats), len(self.lons)):
+                raise ValueError(f"unexpected shape {ids.shape} of {self.path}")
+            return ids
+        except (OSError, ValueError) as err:
+            log.warning(f"Geohash id cache not used ({err})")
+            return self._build()
+
+    def _store(self, ids: np.ndarray) -> None:
+        """write coordinates and ids (ids last, they mark a complete cache entry)"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        _atomic_write(
+            self.coords_path,
+            lambda f: np.savez(f, lat=self.lats, lon=self.lons, pre=self.pre),
+        )
+        _atomic_write(self.path, lambda f: np.save(f, ids))
+
+    def subgrid(self, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+        """ids of a (clipped) region of the grid (a view, computed if not contained)"""
+        lats, lons = np.asarray(lats, dtype=float), np.asarray(lons, dtype=float)
+        j0, i0 = _index_of(lats, self.lats), _index_of(lons, self.lons)
+        if j0 is None or i0 is None:
+            return coords2geohash_dec_array(lats[:, None], lons[None, :], self.pre)
+        return self.ids[j0 : j0 + len(lats), i0 : i0 + len(lons)]
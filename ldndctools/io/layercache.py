@@ -0,0 +1,87 @@
+"""memoization of rendered soil layers for identical soil profiles"""
+import hashlib
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Sequence
+
+import numpy as np
+
+__all__ = ["LayerCache"]
+
+
+class LayerCache:
+    """bounded LRU cache keyed by a hash of the raw layer values of a profile
+
+    Many grid cells of a soil unit map share the same layer stack, so the
+    validated, completed (hydraulic properties, splits) and serialized layers of a
+    profile are only created once (as long as the profile stays in the cache).
+    """
+
+    def __init__(self, maxsize: int = 10_000):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[bytes, Any]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    @staticmethod
+    def keys(values: Dict[str, np.ndarray], *extra: Hashable) -> List[bytes]:
+        """hash raw layer values of many profiles (var -> (profiles, levels))
+
+        extra settings (i.e. the layer split) are part of every key.
+        """
+        seed = hashlib.blake2b(repr((list(values), extra)).encode(), digest_size=16)
+        arrays = [np.asarray(v) for v in values.values()]
+        if not arrays:
+            return []
+        rows = np.concatenate(
+            [a.reshape(len(a), int(np.prod(a.shape[1:]))) for a in arrays], axis=1
+        )
+        keys = []
+        for row in np.ascontiguousarray(rows):
+            h = seed.copy()
+            h.update(row.tobytes())
+            keys.append(h.digest())
+        return keys
+
+    @classmethod
+    def key(cls, values: Dict[str, np.ndarray], *extra: Hashable) -> bytes:
+        """hash raw layer values of a profile (var -> array along lev)"""
+        return cls.keys({k: np.asarray(v)[None] for k, v in values.items()}, *extra)[0]
+
+    def _store(self, key: bytes, value: Any) -> None:
+        self._data[key] = value
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def get_or_create_many(
+        self, keys: Sequence[bytes], func: Callable[[List[int]], List[Any]]
+    ) -> List[Any]:
+        """values of keys, the missing ones are created in one call
+
+        func gets the positions of the first occurrence of the missing keys and
+        returns their values. Repeated keys are hits (created values are reused
+        even if they do not fit into the cache).
+        """
+        values: Dict[bytes, Any] = {}
+        missing: Dict[bytes, int] = {}
+        for n, key in enumerate(keys):
+            if key in values or key in missing:
+                self.hits += 1
+            elif key in self._data:
+                self.hits += 1
+                self._data.move_to_end(key)
+                values[key] = self._data[key]
+            else:
+                self.misses += 1
+                missing[key] = n
+
+        for key, value in zip(missing, func(list(missing.values()))):
+            values[key] = value
+            self._store(key, value)
+        return [values[key] for key in keys]
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return dict(hits=self.hits, misses=self.misses)
@@ -0,0 +1,91 @@
+"""process block-wise slices of numpy arrays in a process pool (shared memory)"""
+import multiprocessing as mp
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+import numpy as np
+
+__all__ = ["map_blocks", "row_blocks", "SharedArrays"]
+
+ArraySpec = Dict[str, Tuple[str, Tuple[int, ...], str]]
+
+
+class SharedArrays:
+    """copy numpy arrays to shared memory blocks that workers attach to by name"""
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        self._shm: List[SharedMemory] = []
+        self.spec: ArraySpec = {}
+        for name, a in arrays.items():
+            a = np.ascontiguousarray(a)
+            shm = SharedMemory(create=True, size=max(a.nbytes, 1))
+            np.ndarray(a.shape, dtype=a.dtype, buffer=shm.buf)[...] = a
+            self._shm.append(shm)
+            self.spec[name] = (shm.name, a.shape, a.dtype.str)
+
+    def close(self) -> None:
+        for shm in self._shm:
+            shm.close()
+            shm.unlink()
+        self._shm = []
+
+    def __enter__(self) -> "SharedArrays":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+def attach(spec: ArraySpec) -> Tuple[Dict[str, np.ndarray], List[SharedMemory]]:
+    """return (zero-copy) views of shared arrays and the handles keeping them alive"""
+    arrays, handles = {}, []
+    for name, (shm_name, shape, dtype) in spec.items():
+        shm = SharedMemory(name=shm_name)
+        arrays[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+        handles.append(shm)
+    return arrays, handles
+
+
+# per-process worker state (set once by the pool initializer)
+_state: Dict[str, Any] = {}
+
+
+def _init_worker(spec: ArraySpec, func: Callable, kwargs: Dict[str, Any]) -> None:
+    arrays, handles = attach(spec)
+    _state.update(arrays=arrays, handles=handles, func=func, kwargs=kwargs)
+
+
+def _run_block(block: Tuple[int, int]) -> Tuple[Any, int]:
+    start, stop = block
+    result = _state["func"](_state["arrays"], start, stop, **_state["kwargs"])
+    return result, stop - start
+
+
+def row_blocks(jx: np.ndarray, nblocks: int) -> List[Tuple[int, int]]:
+    """split row-major ordered cells into (start, stop) ranges of whole grid rows"""
+    if len(jx) == 0:
+        return []
+    row_starts = np.flatnonzero(np.r_[True, np.diff(jx) != 0])
+    starts = [g[0] for g in np.array_split(row_starts, nblocks) if len(g) > 0]
+    stops = starts[1:] + [len(jx)]
+    return [(int(a), int(b)) for a, b in zip(starts, stops)]
+
+
+def map_blocks(
+    func: Callable,
+    arrays: Dict[str, np.ndarray],
+    blocks: List[Tuple[int, int]],
+    *,
+    workers: int,
+    **kwargs: Any,
+) -> Iterator[Tuple[Any, int]]:
+    """yield (func(arrays, start, stop, **kwargs), number of cells) in block order
+
+    The arrays are copied to shared memory once; tasks only carry the block range.
+    func must be a module-level function (it is pickled by reference).
+    """
+    with SharedArrays(arrays) as shared:
+        with mp.Pool(
+            workers, initializer=_init_worker, initargs=(shared.spec, func, kwargs)
+        ) as pool:
+            yield from pool.imap(_run_block, blocks)
@@ -0,0 +1,208 @@
+"""ragged soil profile store (valid layers of valid cells only)"""
+import json
+import os
+import shutil
+import tempfile
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+
+import numpy as np
+import xarray as xr
+
+from ldndctools.io.extraction import _decode, SiteArrays
+from ldndctools.io.idgrid import _index_of
+
+__all__ = ["ProfileStore"]
+
+
+@dataclass
+class ProfileStore:
+    """soil profiles of a lat/ lon grid as flat per-variable layer arrays (CSR)
+
+    cells holds the row-major flat grid index of all cells with layers (sorted),
+    the layers of cells[n] are layers[var][offsets[n]:offsets[n + 1]] and were
+    found at the levels level[offsets[n]:offsets[n + 1]] of the dense data.
+    Integer variables keep their fill_value (compact data).
+    """
+
+    lat: np.ndarray
+    lon: np.ndarray
+    nlev: int
+    cells: np.ndarray
+    offsets: np.ndarray
+    level: np.ndarray
+    layers: Dict[str, np.ndarray]
+    fill_values: Dict[str, int] = field(default_factory=dict)
+
+    def __len__(self) -> int:
+        return len(self.cells)
+
+    @property
+    def nlayers(self) -> int:
+        return len(self.level)
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return len(self.lat), len(self.lon)
+
+    @property
+    def counts(self) -> np.ndarray:
+        """number of layers per cell"""
+        return np.diff(self.offsets)
+
+    @classmethod
+    def from_dataset(
+        cls, data: xr.Dataset, valid: xr.DataArray, *, zdim: str = "lev"
+    ) -> "ProfileStore":
+        """store the layers of data where valid (i.e. SoilDataset.mask_3d) is set"""
+        dims = ("lat", "lon", zdim)
+        keep = valid.notnull().transpose(*dims).values
+        counts = keep.sum(axis=2).ravel()
+        cells = np.flatnonzero(counts)
+        level = np.nonzero(keep)[2].astype(np.int16)
+
+        return cls(
+            lat=data.coords["lat"].values,
+            lon=data.coords["lon"].values,
+            nlev=keep.shape[2],
+            cells=cells,
+            offsets=np.concatenate([[0], np.cumsum(counts[cells])]),
+            level=level,
+            layers={v: data[v].transpose(*dims).values[keep] for v in data.data_vars},
+            fill_values={
+                v: data[v].attrs["fill_value"]
+                for v in data.data_vars
+                if "fill_value" in data[v].attrs
+            },
+        )
+
+    def _layer_index(self, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """index of all layers of the cells in rows and their layer counts"""
+        counts = self.counts[rows]
+        start = np.repeat(self.offsets[rows] - np.cumsum(counts) + counts, counts)
+        return start + np.arange(counts.sum()), counts
+
+    def subset(
+        self, lat: np.ndarray, lon: np.ndarray, keep: Optional[np.ndarray] = None
+    ) -> "ProfileStore":
+        """store of a part (lat, lon) of the grid, only the cells where keep is set
+
+        The store itself if all of its cells are kept.
+        """
+        j0, i0 = _index_of(np.asarray(lat), self.lat), _index_of(
+            np.asarray(lon), self.lon
+        )
+        if j0 is None or i0 is None:
+            raise ValueError("Coordinates are not part of the profile store grid")
+
+        jx, ix = self.cells // len(self.lon) - j0, self.cells % len(self.lon) - i0
+        inside = (jx >= 0) & (jx < len(lat)) & (ix >= 0) & (ix < len(lon))
+        if keep is not None:
+            inside[inside] = keep[jx[inside], ix[inside]]
+        rows = np.flatnonzero(inside)
+        if len(rows) == len(self) and (len(lat), len(lon)) == self.shape:
+            return self
+        index, counts = self._layer_index(rows)
+
+        return ProfileStore(
+            lat=np.asarray(lat),
+            lon=np.asarray(lon),
+            nlev=self.nlev,
+            cells=jx[rows] * len(lon) + ix[rows],
+            offsets=np.concatenate([[0], np.cumsum(counts)]),
+            level=self.level[index],
+            layers={v: values[index] for v, values in self.layers.items()},
+            fill_values=dict(self.fill_values),
+        )
+
+    def _rows(self, jx: np.ndarray, ix: np.ndarray) -> np.ndarray:
+        """row of the cells (jx, ix) in cells (-1 if the cell has no layers)"""
+        flat = np.asarray(jx) * len(self.lon) + np.asarray(ix)
+        if len(self.cells) == 0:
+            return np.full(len(flat), -1)
+        rows = np.minimum(np.searchsorted(self.cells, flat), len(self.cells) - 1)
+        return np.where(self.cells[rows] == flat, rows, -1)
+
+    def gather(
+        self, jx: Optional[np.ndarray] = None, ix: Optional[np.ndarray] = None
+    ) -> SiteArrays:
+        """dense layer arrays (cells, levels) of the given cells (in the given order)
+
+        Without jx, ix all cells with a top layer depth are returned (row-major).
+        """
+        if jx is None or ix is None:
+            top = self.level[self.offsets[:-1]] == 0
+            depth = _decode(self.layers["depth"][self.offsets[:-1]], self.fill("depth"))
+            flat = self.cells[top & ~np.isnan(depth)]
+            jx, ix = flat // len(self.lon), flat % len(self.lon)
+        jx, ix = np.asarray(jx, dtype=np.int64), np.asarray(ix, dtype=np.int64)
+
+        rows = self._rows(jx, ix)
+        site = np.flatnonzero(rows >= 0)
+        index, counts = self._layer_index(rows[site])
+        target = (np.repeat(site, counts), self.level[index])
+
+        layers = {}
+        for var, values in self.layers.items():
+            dtype = values.dtype if values.dtype.kind == "f" else np.float32
+            dense = np.full((len(jx), self.nlev), np.nan, dtype=dtype)
+            dense[target] = _decode(values[index], self.fill(var))
+            layers[var] = dense
+
+        return SiteArrays(
+            jx=jx, ix=ix, lat=self.lat[jx], lon=self.lon[ix], layers=layers
+        )
+
+    def fill(self, var: str) -> Optional[int]:
+        return self.fill_values.get(var)
+
+    def save(self, path: Union[str, Path]) -> None:
+        """write the store as a directory of .npy files (replaced atomically)"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = Path(tempfile.mkdtemp(dir=path.parent, suffix=".tmp"))
+        try:
+            arrays = {
+                "lat": self.lat,
+                "lon": self.lon,
+                "cells": self.cells,
+                "offsets": self.offsets,
+                "level": self.level,
+            }
+            arrays.update({f"layer_{v}": values for v, values in self.layers.items()})
+            for name, values in arrays.items():
+                np.save(tmp / f"{name}.npy", values)
+            meta = {
+                "nlev": self.nlev,
+                "variables": list(self.layers),
+                "fill_values": self.fill_values,
+            }
+            (tmp / "meta.json").write_text(json.dumps(meta))
+            if path.exists():
+                shutil.rmtree(path)
+            os.replace(tmp, path)
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+
+    @classmethod
+    def load(cls, path: Union[str, Path], *, mmap: bool = True) -> "ProfileStore":
+        """open a saved store (arrays memory-mapped)"""
+        path = Path(path)
+        meta = json.loads((path / "meta.json").read_text())
+        mode = "r" if mmap else None
+
+        def load(name: str) -> np.ndarray:
+            return np.load(path / f"{name}.npy", mmap_mode=mode)
+
+        return cls(
+            lat=load("lat"),
+            lon=load("lon"),
+            nlev=meta["nlev"],
+            cells=load("cells"),
+            offsets=load("offsets"),
+            level=load("level"),
+            layers={v: load(f"layer_{v}") for v in meta["variables"]},
+            fill_values=meta["fill_values"],
+        )
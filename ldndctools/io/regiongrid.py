@@ -0,0 +1,156 @@
+"""admin region (country) id rasters, rasterized once and cached on disk"""
+import hashlib
+import logging
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple, Union
+
+import geopandas as gpd
+import numpy as np
+from affine import Affine
+from rasterio import features
+
+from ldndctools.io.idgrid import _atomic_write, _index_of, cache_dir
+
+__all__ = ["RegionGrid"]
+
+log = logging.getLogger(__name__)
+
+
+def _transform(lats: np.ndarray, lons: np.ndarray) -> Affine:
+    """affine transform of a regular grid given by its cell centers"""
+    dx = lons[1] - lons[0] if len(lons) > 1 else 1.0
+    dy = lats[1] - lats[0] if len(lats) > 1 else 1.0
+    return Affine(dx, 0.0, lons[0] - dx / 2, 0.0, dy, lats[0] - dy / 2)
+
+
+class RegionGrid:
+    """integer region ids of all cells of a lat/ lon grid
+
+    Every region (i.e. country ADM0_A3 code) is rasterized once with the same
+    all_touched semantics as SoilDataset.clip_mask. ids holds the id (index into
+    codes + 1, 0 for none) of the first region that touches a cell, cells touched
+    by further regions are listed in shared_cells/ shared_ids. The rasters are
+    cached like GeohashGrid (keyed by grid and geometries) and opened
+    memory-mapped, so selecting regions is an isin over ids without any geometry
+    work.
+    """
+
+    def __init__(
+        self,
+        df: gpd.GeoDataFrame,
+        lats: np.ndarray,
+        lons: np.ndarray,
+        *,
+        column: str = "ADM0_A3",
+        name: str = "grid",
+        all_touched: bool = True,
+        directory: Optional[Union[str, Path]] = None,
+    ):
+        self.lats = np.asarray(lats, dtype=float)
+        self.lons = np.asarray(lons, dtype=float)
+        self.column = column
+        self.all_touched = all_touched
+
+        df = df.loc[:, [column, "geometry"]].sort_values(column, kind="stable")
+        self.codes: List[str] = sorted(df[column].unique())
+        self._regions = df
+
+        h = hashlib.blake2b(repr((column, all_touched, self.codes)).encode())
+        h.update(self.lats.tobytes())
+        h.update(self.lons.tobytes())
+        for wkb in df.geometry.to_wkb():
+            h.update(wkb)
+        stem = f"regions_{name}_{len(self.lats)}x{len(self.lons)}_{h.hexdigest()[:16]}"
+        directory = Path(directory) if directory is not None else cache_dir()
+        self.path = directory / "regiongrids" / f"{stem}.npy"
+        self.shared_path = self.path.with_suffix(".shared.npz")
+
+        self.ids, self.shared_cells, self.shared_ids = self._open()
+
+    def _build(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        shape = (len(self.lats), len(self.lons))
+        transform = _transform(self.lats, self.lons)
+        ids = np.zeros(shape, dtype=np.int16)
+        shared_cells, shared_ids = [], []
+
+        for k, (_, geometries) in enumerate(self._regions.groupby(self.column)):
+            # rasterize within the (padded) bounds of the region only
+            minx, miny, maxx, maxy = geometries.total_bounds
+            col0, row0 = ~transform * (minx, miny)
+            col1, row1 = ~transform * (maxx, maxy)
+            rows = slice(
+                max(int(np.floor(min(row0, row1))) - 1, 0),
+                min(int(np.ceil(max(row0, row1))) + 1, shape[0]),
+            )
+            cols = slice(
+                max(int(np.floor(min(col0, col1))) - 1, 0),
+                min(int(np.ceil(max(col0, col1))) + 1, shape[1]),
+            )
+            if rows.start >= rows.stop or cols.start >= cols.stop:
+                continue
+
+            touched = features.geometry_mask(
+                geometries.geometry,
+                out_shape=(rows.stop - rows.start, cols.stop - cols.start),
+                transform=transform * Affine.translation(cols.start, rows.start),
+                all_touched=self.all_touched,
+                invert=True,
+            )
+            jx, ix = np.nonzero(touched)
+            cells = (jx + rows.start) * shape[1] + ix + cols.start
+
+            free = ids.ravel()[cells] == 0
+            ids.ravel()[cells[free]] = k + 1
+            shared_cells.append(cells[~free])
+            shared_ids.append(np.full(np.count_nonzero(~free), k + 1, dtype=np.int16))
+
+        if shared_cells:
+            return ids, np.concatenate(shared_cells), np.concatenate(shared_ids)
+        return ids, np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int16)
+
+    def _open(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        try:
+            if not (self.path.is_file() and self.shared_path.is_file()):
+                self._store(*self._build())
+            with np.load(self.shared_path) as shared:
+                if shared["codes"].tolist() != self.codes:
+                    raise ValueError(f"unexpected codes in {self.shared_path}")
+                cells, ids = shared["cells"], shared["ids"]
+            grid = np.load(self.path, mmap_mode="r")
+            if grid.shape != (len(self.lats), len(self.lons)):
+                raise ValueError(f"unexpected shape {grid.shape} of {self.path}")
+            return grid, cells, ids
+        except (OSError, ValueError) as err:
+            log.warning(f"Region grid cache not used ({err})")
+            return self._build()
+
+    def _store(self, ids: np.ndarray, cells: np.ndarray, shared: np.ndarray) -> None:
+        """write shared cells and the raster (last, marks a complete cache entry)"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        _atomic_write(
+            self.shared_path,
+            lambda f: np.savez(f, codes=self.codes, cells=cells, ids=shared),
+        )
+        _atomic_write(self.path, lambda f: np.save(f, ids))
+
+    def mask(
+        self,
+        codes: Iterable[str],
+        lats: Optional[np.ndarray] = None,
+        lons: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """boolean mask of the cells touched by any of the regions codes
+
+        If lats, lons are given, the mask of this (clipped) part of the grid.
+        """
+        selected = [self.codes.index(c) + 1 for c in codes if c in self.codes]
+        mask = np.isin(self.ids, selected)
+        mask.ravel()[self.shared_cells[np.isin(self.shared_ids, selected)]] = True
+
+        if lats is None or lons is None:
+            return mask
+        lats, lons = np.asarray(lats, dtype=float), np.asarray(lons, dtype=float)
+        j0, i0 = _index_of(lats, self.lats), _index_of(lons, self.lons)
+        if j0 is None or i0 is None:
+            raise ValueError("Coordinates are not part of the region grid")
+        return mask[j0 : j0 + len(lats), i0 : i0 + len(lons)]
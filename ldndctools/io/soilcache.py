@@ -0,0 +1,138 @@
+"""preprocessed soil (layer mask and profiles of the full grid) cached on disk"""
+import hashlib
+import json
+import logging
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+import fsspec
+import numpy as np
+import xarray as xr
+
+import ldndctools
+from ldndctools.io.idgrid import _atomic_write, cache_dir
+from ldndctools.io.profiles import ProfileStore
+from ldndctools.sources.soil.soil_base import SoilDataset
+
+__all__ = ["file_checksum", "local_path", "SoilCache"]
+
+log = logging.getLogger(__name__)
+
+
+def local_path(urlpath: str, storage_options: Optional[Dict[str, Any]] = None) -> Path:
+    """local file of a (i.e. simplecache::) catalog url"""
+    return Path(fsspec.open_local(urlpath, **(storage_options or {})))
+
+
+def file_checksum(path: Union[str, Path], directory: Optional[Path] = None) -> str:
+    """blake2b checksum of a file (memoized by path, size and modification time)"""
+    path = Path(path).resolve()
+    stat = path.stat()
+    memo = (directory or cache_dir()) / "checksums.json"
+    try:
+        known = json.loads(memo.read_text())
+    except (OSError, ValueError):
+        known = {}
+
+    entry = known.get(str(path))
+    if entry and entry[:2] == [stat.st_size, stat.st_mtime_ns]:
+        return entry[2]
+
+    h = hashlib.blake2b()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 24), b""):
+            h.update(block)
+    checksum = h.hexdigest()
+
+    known[str(path)] = [stat.st_size, stat.st_mtime_ns, checksum]
+    try:
+        memo.parent.mkdir(parents=True, exist_ok=True)
+        _atomic_write(memo, lambda f: f.write(json.dumps(known).encode()))
+    except OSError as err:
+        log.warning(f"Checksum not memoized ({err})")
+    return checksum
+
+
+class SoilCache:
+    """layer mask and profile store of a soil source, keyed by source and version
+
+    The key combines the checksum of the source file, the ldndctools version, the
+    soil dataset class and the compact mode, so a changed source (or release) is
+    preprocessed again. Arrays are stored as .npy files and opened memory-mapped.
+    Copies of a source (i.e. Zarr stores) pass the checksum of the source file.
+    """
+
+    def __init__(
+        self,
+        source: Optional[Union[str, Path]] = None,
+        *,
+        checksum: Optional[str] = None,
+        name: str = "soil",
+        directory: Optional[Union[str, Path]] = None,
+    ):
+        if (source is None) == (checksum is None):
+            raise ValueError("Either a source file or its checksum is required")
+        directory = Path(directory) if directory is not None else cache_dir()
+        self.checksum = checksum or file_checksum(source, directory)
+        self.directory = directory / "soil"
+        self.name = name
+
+    def path(self, soil: SoilDataset) -> Path:
+        """cache entry of the (unclipped) soil dataset"""
+        key = repr(
+            (
+                self.checksum,
+                ldndctools.__version__,
+                type(soil).__name__,
+                soil.compact,
+            )
+        )
+        digest = hashlib.blake2b(key.encode()).hexdigest()[:16]
+        return self.directory / f"{self.name}_{digest}"
+
+    def load(self, soil: SoilDataset) -> bool:
+        """use a cached entry for soil (False if there is none)"""
+        path = self.path(soil)
+        try:
+            profiles = ProfileStore.load(path / "profiles")
+            mask = np.load(path / "layer_mask.npy", mmap_mode="r")
+        except (OSError, ValueError) as err:
+            log.debug(f"No usable soil cache at {path} ({err})")
+            return False
+
+        lat, lon = soil.original.lat, soil.original.lon
+        if not (
+            np.array_equal(lat, profiles.lat) and np.array_equal(lon, profiles.lon)
+        ):
+            log.warning(f"Soil cache {path} does not match the source grid")
+            return False
+
+        layer_mask = xr.DataArray(
+            np.asarray(mask),
+            coords={"lat": lat, "lon": lon},
+            dims=("lat", "lon"),
+            name="mask",
+        )
+        soil.use_profiles(profiles, layer_mask)
+        return True
+
+    def store(self, soil: SoilDataset) -> None:
+        """preprocess soil (full grid, before window/ clip) and write a cache entry"""
+        path = self.path(soil)
+        mask = soil.layer_mask.transpose("lat", "lon")
+        lats, lons = soil.grid
+        if mask.shape != (len(lats), len(lons)):
+            raise ValueError("Only the full grid of a soil source can be cached")
+        profiles = soil.profiles
+
+        profiles.save(path / "profiles")
+        _atomic_write(path / "layer_mask.npy", lambda f: np.save(f, mask.values))
+
+    def attach(self, soil: SoilDataset) -> SoilDataset:
+        """use the cached entry for soil, preprocess and store it first if missing"""
+        if not self.load(soil):
+            log.info("Preprocessing soil data (cached for later runs)")
+            self.store(soil)
+            if not self.load(soil):
+                raise OSError(f"Soil cache {self.path(soil)} could not be read")
+        return soil
@@ -0,0 +1,96 @@
+"""render ldndc site xml from precompiled text templates"""
+from typing import Callable, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+from ldndctools.misc.layertable import FIELDS, INT_FIELDS
+from ldndctools.misc.types import LayerData, nmap, NODATA
+
+__all__ = ["SiteXmlSerializer"]
+
+# layer fields that are not written to the site file
+IGNORE = ["topd", "botd", "split"]
+
+
+def _formatter(var: str) -> Callable[[float], str]:
+    """return a formatter for var with the significant digits used by serialize"""
+    digits = {k: significant for k, _, significant in nmap.values()}
+    digits.update(wcmin=2, wcmax=2)
+
+    if var in digits:
+        d = digits[var]
+        return lambda value: str(round(value, d))
+    return str
+
+
+class SiteXmlSerializer:
+    """render sites as text, byte-compatible with the minidom pretty output
+
+    pretty: indent elements with tabs (as minidom.toprettyxml)
+    compact: no indentation, one site per line
+    """
+
+    def __init__(self, pretty: bool = True):
+        self.pretty = pretty
+
+        self.fields: List[str] = [
+            f for f in LayerData.__fields__.keys() if f not in IGNORE
+        ]
+        self._formats: List[Tuple[str, Callable[[float], str], str]] = []
+        for f in self.fields:
+            fmt = _formatter(f)
+            self._formats.append((f, fmt, fmt(NODATA)))
+        # (column, formatter, nodata, int field) of the layer table columns
+        self._columns = [
+            (FIELDS.index(f), fmt, nodata, f in INT_FIELDS)
+            for f, fmt, nodata in self._formats
+        ]
+
+        indent, newl = ("\t", "\n") if pretty else ("", "")
+
+        attrs = " ".join(f'{f}="{{}}"' for f in self.fields)
+        self._layer = f"{indent * 4}<layer {attrs}/>{newl}"
+
+        general = (
+            f'usehistory="arable" soil="NONE" humus="NONE" litterheight="0.0" '
+            f'corg5="{NODATA}" corg30="{NODATA}"'
+        )
+        self._site_start = (
+            f'{indent}<site id="{{}}" lat="{{}}" lon="{{}}">{newl}'
+            f"{indent * 2}<general/>{newl}"
+            f"{indent * 2}<soil>{newl}"
+            f"{indent * 3}<general {general}/>{newl}"
+            f"{indent * 3}<layers>{newl}"
+        )
+        self._site_end = (
+            f"{indent * 3}</layers>{newl}"
+            f"{indent * 2}</soil>{newl}"
+            f"{indent}</site>\n"
+        )
+        self.header = '<?xml version="1.0" ?>\n'
+        self.document_start = f"{self.header}<ldndcsite>{newl}{indent}<description/>\n"
+        self.document_end = "</ldndcsite>\n"
+        self.empty_document = f"{self.header}<ldndcsite/>\n"
+
+    def layer(self, values: Iterable[str]) -> str:
+        """render a single layer from formatted attribute values"""
+        return self._layer.format(*values)
+
+    def row_values(self, row: Sequence[float]) -> List[str]:
+        """return the formatted attribute values of a layer table row"""
+        values = []
+        for col, fmt, nodata, is_int in self._columns:
+            value = row[col]
+            if value != value:
+                values.append(nodata)
+            else:
+                values.append(fmt(int(value) if is_int else value))
+        return values
+
+    def table_layers(self, rows: np.ndarray) -> str:
+        """render the layer block of a site from layer table rows"""
+        return "".join(self.layer(self.row_values(row)) for row in rows.tolist())
+
+    def site(self, *, lat: float, lon: float, cid: int, layers: str) -> str:
+        """render a site with a pre-rendered layer block"""
+        return self._site_start.format(cid, lat, lon) + layers + self._site_end
@@ -1,52 +1,471 @@
-import xml.dom.minidom as md
-import xml.etree.cElementTree as et
-from typing import Any, Dict, Iterable, List, Optional, Tuple
+import io
+import json
+import logging
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    TextIO,
+    Tuple,
+    Union,
+)
 
 import numpy as np
 import xarray as xr
 from pydantic import ValidationError
 
-from ldndctools.misc.geohash import coords2geohash_dec
+from ldndctools.io.extraction import cells_from_coords, cells_from_ids, SiteArrays
+from ldndctools.io.idgrid import GeohashGrid
+from ldndctools.io.layercache import LayerCache
+from ldndctools.io.parallel import map_blocks, row_blocks
+from ldndctools.io.xmlserializer import SiteXmlSerializer
+from ldndctools.misc.calculations import calc_hydraulic_properties_table
 from ldndctools.misc.helper import mutually_exclusive
+from ldndctools.misc.layertable import Discretization, LayerTable, PRESETS
 from ldndctools.misc.types import LayerData, RES
-from ldndctools.misc.xmlclasses import SiteXML
+from ldndctools.misc.validation import validate_layers
 from ldndctools.sources.soil.soil_base import SoilDataset
 
+log = logging.getLogger(__name__)
 
-def translate_data_format(d: xr.Dataset) -> List[LayerData]:
-    """translate data from nc soil file (point-wise xarray sel) to new naming/ units"""
+# cells per block of the writer (bounds the memory of validated/ completed layers)
+BLOCK_CELLS = 10_000
 
-    data: List[LayerData] = []
-    for lev in d.lev:
-        ld = LayerData()
 
+def translate_layers(values: Dict[str, np.ndarray]) -> List[LayerData]:
+    """translate per-layer values of one site (var -> array along lev) to LayerData
+
+    Values are validated field by field (validate_layers validates whole arrays).
+    """
+
+    data: List[LayerData] = []
+    for k in range(len(values["depth"])):
         # TODO: catch this more elegantly via mask/ layer_mask
-        if np.isnan(d.sel(lev=lev)["depth"]):
+        if np.isnan(values["depth"][k]):
             continue
 
-        for varname, value in d.data_vars.items():
-            da = value.sel(lev=lev).values.item()  # type: ignore
+        ld = LayerData()
+        for varname, value in values.items():
             try:
-                setattr(ld, varname, da)
+                setattr(ld, varname, value[k].item())
             except ValidationError:
                 setattr(ld, varname, None)
         data.append(ld)
     return data
 
 
+def translate_data_format(d: xr.Dataset) -> List[LayerData]:
+    """translate data from nc soil file (point-wise xarray sel) to new naming/ units"""
+    return translate_layers({k: v.values for k, v in d.data_vars.items()})
+
+
+class RenderedSite(NamedTuple):
+    """a rendered site with the metadata needed for sharding and manifests"""
+
+    cid: int
+    lat: float
+    lon: float
+    xml: str
+
+
+def build_layer_table(
+    layers: Dict[str, np.ndarray],
+    extra_split: Optional[bool] = True,
+    discretization: Optional[Union[str, Discretization]] = None,
+) -> LayerTable:
+    """complete the validated layers of all cells at once
+
+    Profiles end before the first incomplete layer (see LayerTable.from_profiles),
+    cells without a complete top layer get no layers. Hydraulic properties are only
+    calculated if wcmin/ wcmax are not given. Layers are re-discretized with
+    discretization (a preset name or thickness/ max_depth) or the extra_split preset.
+    """
+    table = LayerTable.from_profiles(layers)
+    if not {"wcmin", "wcmax"} <= set(layers):
+        table = calc_hydraulic_properties_table(table)
+
+    if discretization is None and extra_split:
+        discretization = "extra_split"
+    if isinstance(discretization, str):
+        discretization = PRESETS[discretization]
+    if discretization is not None:
+        table = table.rediscretize(*discretization)
+    return table
+
+
+def render_layers(
+    cells: SiteArrays,
+    serializer: SiteXmlSerializer,
+    cache: Optional[LayerCache] = None,
+    extra_split: Optional[bool] = True,
+    discretization: Optional[Union[str, Discretization]] = None,
+) -> Tuple[List[str], List[Dict[str, int]]]:
+    """rendered layer blocks of cells ("" without valid layers), rejected values
+
+    Layers are validated, completed (build_layer_table) and rendered in one batch,
+    once per distinct profile (raw layer values) with a cache; profiles in the
+    cache are reused. Rejected values (see validate_layers) are returned per cell.
+    """
+
+    def create(rows: List[int]) -> List[Tuple[str, Dict[str, int]]]:
+        layers = {k: v[rows] for k, v in cells.layers.items()}
+        layers, rejected = validate_layers(layers, per_cell=True)
+        table = build_layer_table(
+            layers, extra_split=extra_split, discretization=discretization
+        )
+        return [
+            (
+                serializer.table_layers(table.site(m)),
+                {k: int(v[m]) for k, v in rejected.items() if v[m]},
+            )
+            for m in range(len(rows))
+        ]
+
+    if cache is None:
+        profiles = create(list(range(len(cells))))
+    else:
+        keys = LayerCache.keys(
+            cells.layers, extra_split, discretization, serializer.pretty
+        )
+        profiles = cache.get_or_create_many(keys, create)
+    return [layers for layers, _ in profiles], [counts for _, counts in profiles]
+
+
+def render_sites(
+    cells: SiteArrays, layers: List[str], serializer: SiteXmlSerializer
+) -> List[RenderedSite]:
+    """render the sites of cells with their layer blocks (skipped if empty)"""
+    sites = []
+    for n, block in enumerate(layers):
+        if block:
+            lat, lon, cid = (
+                cells.lat[n].item(),
+                cells.lon[n].item(),
+                cells.ids[n].item(),
+            )
+            xml = serializer.site(lat=lat, lon=lon, cid=cid, layers=block)
+            sites.append(RenderedSite(cid=cid, lat=lat, lon=lon, xml=xml))
+    return sites
+
+
+def render_block(
+    cells: SiteArrays,
+    serializer: SiteXmlSerializer,
+    cache: Optional[LayerCache] = None,
+    extra_split: Optional[bool] = True,
+    discretization: Optional[Union[str, Discretization]] = None,
+) -> Tuple[List[RenderedSite], Counter]:
+    """render the sites of a block of cells, number of rejected values"""
+    layers, counts = render_layers(
+        cells, serializer, cache, extra_split=extra_split, discretization=discretization
+    )
+    return collect_sites(cells, layers, counts, serializer)
+
+
+def collect_sites(
+    cells: SiteArrays,
+    layers: List[str],
+    counts: List[Dict[str, int]],
+    serializer: SiteXmlSerializer,
+) -> Tuple[List[RenderedSite], Counter]:
+    """sites of cells with rendered layers (render_layers), total rejected values"""
+    rejected: Counter = Counter()
+    for c in counts:
+        rejected.update(c)
+    return render_sites(cells, layers, serializer), rejected
+
+
+def sample_cells(
+    soil: SoilDataset,
+    jx: np.ndarray,
+    ix: np.ndarray,
+    size: int,
+    serializer: SiteXmlSerializer,
+    cache: Optional[LayerCache] = None,
+    seed: Optional[int] = None,
+    extra_split: Optional[bool] = True,
+    discretization: Optional[Union[str, Discretization]] = None,
+    max_rounds: int = 10,
+) -> Tuple[SiteArrays, List[str], List[Dict[str, int]]]:
+    """draw size of the cells (jx, ix) at random that yield a site
+
+    Only drawn cells are converted and rendered (render_layers). Cells without a
+    valid layer are replaced by further draws; each round draws the missing number
+    of cells divided by the valid fraction of the cells drawn so far, for at most
+    max_rounds rounds. Returns the cells (in the order of jx, ix), their rendered
+    layer blocks and rejected values.
+    """
+    order = np.random.default_rng(seed).permutation(len(jx))
+    picks, parts, layers, rejected = [np.empty(0, dtype=np.int64)], [], [], []
+    start, found = 0, 0
+    for _ in range(max_rounds):
+        if found >= size or start >= len(order):
+            break
+        fraction = max(found, 1) / start if start else 1.0
+        draw = order[start : start + int(np.ceil((size - found) / fraction))]
+        start += len(draw)
+
+        cells = soil.gather(jx[draw], ix[draw])
+        blocks, counts = render_layers(
+            cells,
+            serializer,
+            cache,
+            extra_split=extra_split,
+            discretization=discretization,
+        )
+        valid = [m for m, block in enumerate(blocks) if block][: size - found]
+        picks.append(draw[valid])
+        parts.append(cells.take(np.asarray(valid, dtype=np.int64)))
+        layers.extend(blocks[m] for m in valid)
+        rejected.extend(counts[m] for m in valid)
+        found += len(valid)
+
+    if not parts:
+        parts.append(soil.gather(jx[:0], ix[:0]))
+    grid_order = np.argsort(np.concatenate(picks), kind="stable")
+    return (
+        SiteArrays.concat(parts).take(grid_order),
+        [layers[m] for m in grid_order],
+        [rejected[m] for m in grid_order],
+    )
+
+
+# layer cache of a worker process (kept across the blocks of a run)
+_worker_cache: Optional[LayerCache] = None
+
+
+def _render_block(
+    arrays: Dict[str, np.ndarray],
+    start: int,
+    stop: int,
+    *,
+    pretty: bool = True,
+    cache_size: int = 0,
+    extra_split: Optional[bool] = True,
+    discretization: Optional[Union[str, Discretization]] = None,
+) -> Tuple[List[RenderedSite], Counter, Tuple[int, int]]:
+    """render a block of cells in a worker process (sites, rejected, cache stats)"""
+    global _worker_cache
+
+    cache = None
+    if cache_size > 0:
+        if _worker_cache is None or _worker_cache.maxsize != cache_size:
+            _worker_cache = LayerCache(cache_size)
+        cache = _worker_cache
+    hits, misses = (cache.hits, cache.misses) if cache is not None else (0, 0)
+
+    cells = SiteArrays.from_arrays(arrays).take(slice(start, stop))
+    sites, rejected = render_block(
+        cells,
+        SiteXmlSerializer(pretty=pretty),
+        cache,
+        extra_split=extra_split,
+        discretization=discretization,
+    )
+
+    if cache is not None:
+        hits, misses = cache.hits - hits, cache.misses - misses
+    return sites, rejected, (hits, misses)
+
+
+@contextmanager
+def open_output(outfile: Optional[Union[str, Path, TextIO]]) -> Iterator[TextIO]:
+    """yield a text handle for outfile (path, file object or None for in-memory)"""
+    if outfile is None:
+        yield io.StringIO()
+    elif isinstance(outfile, (str, Path)):
+        with open(outfile, "w", encoding="utf-8") as fh:
+            yield fh
+    else:
+        yield outfile
+
+
+class SiteXmlStream:
+    """write a ldndcsite xml document site by site to a text file handle
+
+    Only one site is held in memory at any time.
+    """
+
+    def __init__(self, fh: TextIO, serializer: Optional[SiteXmlSerializer] = None):
+        self._fh = fh
+        self.serializer = serializer or SiteXmlSerializer()
+        self.number_of_sites = 0
+        self.bytes_written = 0
+
+    def _write(self, text: str) -> None:
+        self._fh.write(text)
+        self.bytes_written += len(text.encode())
+
+    def add(self, site: RenderedSite) -> None:
+        """append a rendered site (the document header is written before the first)"""
+        if self.number_of_sites == 0:
+            self._write(self.serializer.document_start)
+        self._write(site.xml)
+        self.number_of_sites += 1
+
+    def close(self) -> None:
+        """write the closing tag (or an empty document if no site was added)"""
+        if self.number_of_sites == 0:
+            self._write(self.serializer.empty_document)
+        else:
+            self._write(self.serializer.document_end)
+
+    def getvalue(self) -> str:
+        """return the document (in-memory streams only)"""
+        return self._fh.getvalue()
+
+
+class ShardedSiteXmlStream:
+    """write sites to numbered xml documents (shards) and a json manifest
+
+    sites_HR.xml is written as sites_HR.0000.xml, sites_HR.0001.xml, ... and
+    sites_HR.manifest.json. A new shard is started once max_sites or max_bytes would
+    be exceeded. Each shard is a complete ldndcsite document.
+    """
+
+    def __init__(
+        self,
+        outfile: Union[str, Path],
+        serializer: Optional[SiteXmlSerializer] = None,
+        *,
+        max_sites: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+    ):
+        self.outfile = Path(outfile)
+        self.serializer = serializer or SiteXmlSerializer()
+        self.max_sites = max_sites
+        self.max_bytes = max_bytes
+        self.shards: List[Dict[str, Any]] = []
+        self._fh: Optional[TextIO] = None
+        self._stream: Optional[SiteXmlStream] = None
+
+    @property
+    def manifest_file(self) -> Path:
+        return self.outfile.with_suffix(".manifest.json")
+
+    def shard_file(self, n: int) -> Path:
+        return self.outfile.with_suffix(f".{n:04d}.xml")
+
+    def _is_full(self, site: RenderedSite) -> bool:
+        stream = self._stream
+        if self.max_sites and stream.number_of_sites >= self.max_sites:
+            return True
+        if self.max_bytes and stream.number_of_sites > 0:
+            size = stream.bytes_written + len(site.xml.encode())
+            return size + len(self.serializer.document_end.encode()) > self.max_bytes
+        return False
+
+    def _close_shard(self) -> None:
+        if self._stream is not None:
+            self._stream.close()
+            self._fh.close()
+            self.shards[-1]["bytes"] = self._stream.bytes_written
+            self._fh, self._stream = None, None
+
+    def add(self, site: RenderedSite) -> None:
+        if self._stream is None or self._is_full(site):
+            self._close_shard()
+            path = self.shard_file(len(self.shards))
+            self._fh = open(path, "w", encoding="utf-8")
+            self._stream = SiteXmlStream(self._fh, self.serializer)
+            self.shards.append(
+                dict(
+                    file=path.name,
+                    sites=0,
+                    bytes=0,
+                    id_range=[site.cid, site.cid],
+                    bbox=[site.lon, site.lat, site.lon, site.lat],
+                )
+            )
+
+        self._stream.add(site)
+
+        shard = self.shards[-1]
+        shard["sites"] += 1
+        shard["id_range"] = [
+            min(shard["id_range"][0], site.cid),
+            max(shard["id_range"][1], site.cid),
+        ]
+        x1, y1, x2, y2 = shard["bbox"]
+        shard["bbox"] = [
+            min(x1, site.lon),
+            min(y1, site.lat),
+            max(x2, site.lon),
+            max(y2, site.lat),
+        ]
+
+    def close(self) -> None:
+        """close the last shard and write the manifest"""
+        self._close_shard()
+        manifest = dict(
+            sites=sum(shard["sites"] for shard in self.shards),
+            shards=self.shards,
+        )
+        with open(self.manifest_file, "w") as f:
+            json.dump(manifest, f, indent=2)
+
+
+@contextmanager
+def open_site_stream(
+    outfile: Optional[Union[str, Path, TextIO]],
+    serializer: SiteXmlSerializer,
+    *,
+    shard_sites: Optional[int] = None,
+    shard_bytes: Optional[int] = None,
+) -> Iterator[Union[SiteXmlStream, ShardedSiteXmlStream]]:
+    """yield a (sharded) site stream for outfile that is closed on exit
+
+    The stream is also closed if writing fails (complete documents and manifest of
+    the sites written so far).
+    """
+    if shard_sites or shard_bytes:
+        if not isinstance(outfile, (str, Path)):
+            raise ValueError("Sharded output requires an outfile path")
+        stream = ShardedSiteXmlStream(
+            outfile, serializer, max_sites=shard_sites, max_bytes=shard_bytes
+        )
+        try:
+            yield stream
+        finally:
+            stream.close()
+    else:
+        with open_output(outfile) as fh:
+            stream = SiteXmlStream(fh, serializer)
+            try:
+                yield stream
+            finally:
+                stream.close()
+
+
 class SiteXmlWriter:
     """Site Xml File Writer"""
 
     def __init__(self, soil: SoilDataset, res: RES):
-        self.soil = soil.data
+        self.source = soil
         self.mask = soil.mask
+        # full (unclipped) source grid, site ids are cached per source grid
+        self.grid = soil.grid
         self.ids: Optional[xr.DataArray] = None
         self.res = res
+        self.cache_stats: Optional[Dict[str, int]] = None
+        self.rejected: Optional[Dict[str, int]] = None
+
+    @property
+    def soil(self) -> xr.Dataset:
+        """converted soil data of the source"""
+        return self.source.data
 
     @property
     def number_of_sites(self) -> int:
         assert self.mask is not None
-        return self.mask.sum().item()
+        return self.source.number_of_sites
 
     @property
     def arrays(self) -> xr.Dataset:
@@ -56,7 +475,7 @@ class SiteXmlWriter:
             ds["siteid"] = self.ids
         return ds
 
-    @mutually_exclusive("sample", "ids", "id_array", "coords")
+    @mutually_exclusive("sample", "id_selection", "id_array", "coords")
     def write(
         self,
         sample: Optional[int] = None,
@@ -65,118 +484,181 @@ class SiteXmlWriter:
         id_selection: Optional[Iterable[int]] = None,
         id_array: Optional[xr.DataArray] = None,
         coords: Optional[Iterable[Tuple[float, float]]] = None,
+        coord_ids: Optional[Iterable[int]] = None,
         extra_split: Optional[bool] = True,
-    ) -> str:
+        outfile: Optional[Union[str, Path, TextIO]] = None,
+        pretty: bool = True,
+        workers: int = 1,
+        shard_sites: Optional[int] = None,
+        shard_bytes: Optional[int] = None,
+        cache_size: int = 10_000,
+        seed: Optional[int] = None,
+        discretization: Optional[Union[str, Discretization]] = None,
+    ) -> Optional[str]:
+        """create site xml for all valid cells (or a random sample of them)
+
+        If outfile (path or file object) is given, the xml is streamed to it site by
+        site and None is returned, otherwise the xml is returned as a string. Use
+        pretty=False for compact output (no indentation, one site per line). With
+        workers > 1 sites are rendered in a process pool (same output and order).
+        With shard_sites and/ or shard_bytes the output is split into numbered xml
+        files of at most that size (plus a json manifest) while sites are created.
+        Identical soil profiles (raw layer values) are only validated, completed and
+        rendered once, kept in a LRU cache of cache_size profiles (0 disables the
+        cache). sample=N draws N cells of the
+        mask that yield a site at random (reproducible with seed), id_selection only
+        the cells of the given (decimal geohash) site ids and coords the cells nearest
+        to the given (lon, lat) points (site ids from coord_ids if given, points that
+        share a cell are deduplicated); only these cells are extracted. Soil layers
+        are split with the discretization (preset name, see PRESETS, or thickness/
+        max_depth in mm) instead of the extra_split of the top layer if given.
+        """
 
         if status_widget:
             status_widget.warning("Preparing data")
 
-        if not all(v is None for v in [sample, id_selection, coords]):
-            # options currently not implemented
-            raise NotImplementedError
+        lats = self.mask.coords["lat"].values
+        lons = self.mask.coords["lon"].values
+
+        # select cells of the mask (all, a random sample, site ids or coordinates)
+        point_ids = None
+        if coords is not None:
+            points = np.array(list(coords), dtype=float).reshape(-1, 2)
+            mjx, mix, kept = cells_from_coords(points[:, 1], points[:, 0], lats, lons)
+            in_mask = self.mask.values[mjx, mix] == 1
+            mjx, mix, kept = mjx[in_mask], mix[in_mask], kept[in_mask]
+            if coord_ids is not None:
+                point_ids = np.asarray(list(coord_ids))[kept]
+            if len(mjx) < len(points):
+                log.warning(
+                    f"{len(points) - len(mjx)} coordinates outside the (masked) soil "
+                    "grid or in a cell shared with another coordinate"
+                )
+        elif id_selection is not None:
+            id_selection = list(id_selection)
+            mjx, mix = cells_from_ids(id_selection, lats, lons)
+            in_mask = self.mask.values[mjx, mix] == 1
+            mjx, mix = mjx[in_mask], mix[in_mask]
+            if len(mjx) < len(set(id_selection)):
+                log.warning(
+                    f"{len(set(id_selection)) - len(mjx)} site ids not found in "
+                    "the (masked) soil grid"
+                )
+        else:
+            mjx, mix = np.nonzero(self.mask.values == 1)
+
+        serializer = SiteXmlSerializer(pretty=pretty)
+        cache = LayerCache(cache_size) if cache_size > 0 else None
+        settings = dict(extra_split=extra_split, discretization=discretization)
+
+        if sample is not None:
+            sampled = sample_cells(
+                self.source, mjx, mix, sample, serializer, cache, seed=seed, **settings
+            )
+            mjx, mix = sampled[0].jx, sampled[0].ix
+            if len(mjx) < sample:
+                log.warning(f"Only {len(mjx)} of {sample} sampled cells yield a site")
 
+        # assign ids to the selected cells
         ids: xr.DataArray = xr.zeros_like(self.mask, dtype=np.int32)
+        if id_array is not None:
+            cids = id_array.transpose("lat", "lon").values[mjx, mix]
+        elif point_ids is not None:
+            cids = point_ids
+        else:
+            ids_grid = GeohashGrid(*self.grid, name=self.res.name)
+            cids = ids_grid.subgrid(lats, lons)[mjx, mix]
+        ids.values[mjx, mix] = cids
+        selected = xr.zeros_like(self.mask, dtype=bool)
+        selected.values[mjx, mix] = True
+        self.ids = ids.where(selected) * self.mask
+
+        # gather all valid cells and layers from the profile store (or convert only
+        # the selected cells, sampled cells are converted and rendered already)
+        if sample is not None:
+            cells = sampled[0]
+        elif not all(v is None for v in [id_selection, coords]):
+            cells = self.source.gather(mjx, mix)
+        else:
+            cells = self.source.profiles.gather()
+        cells.ids = ids.values[cells.jx, cells.ix]
 
-        Lcids: List[int] = []
-        Lix: List[int] = []
-        Ljx: List[int] = []
-        Dcids: Dict[Tuple[float, float], int] = {}
-
-        for j in range(len(self.soil.coords["lat"])):
-            for i in range(len(self.soil.coords["lon"])):
-                if id_array:
-                    cid: int = id_array.isel(lat=j, lon=i)
-                else:
-                    cid: int = coords2geohash_dec(
-                        lat=self.soil.coords["lat"][j].values.item(),
-                        lon=self.soil.coords["lon"][i].values.item(),
-                    )
-                # print(cid)
-                ids[j, i] = cid
-                Lcids.append(cid)
-                Lix.append(i)
-                Ljx.append(j)
-                Dcids[
-                    (
-                        self.soil.coords["lat"].values[j],
-                        self.soil.coords["lon"].values[i],
-                    )
-                ] = cid
-
-        self.ids = ids * self.mask
-
-        def create_chunks(items: List[int]) -> List[List[int]]:
-            block = 200
-            return [items[item : item + block] for item in range(0, len(items), block)]
-
-        Lcids2d = create_chunks(Lcids)
-        Lix2d = create_chunks(Lix)
-        Ljx2d = create_chunks(Ljx)
-
-        sites = []
-
-        # NOTE: Possibly some selection missing
         step = 0
-        total_steps = self.number_of_sites
+        total_steps = len(mjx)
+
+        # validate, complete and render blocks of whole grid rows (values that
+        # LayerData rejects become NaN), in a process pool with workers > 1
+        nblocks = max(-(-len(cells) // BLOCK_CELLS), workers * 8 if workers > 1 else 1)
+        blocks = row_blocks(cells.jx, nblocks)
+        if sample is not None:
+            results = iter(
+                [(*collect_sites(cells, *sampled[1:], serializer), len(cells))]
+            )
+        elif workers > 1:
+            # merged in the same order as the serial path
+            rendered = map_blocks(
+                _render_block,
+                cells.to_arrays(),
+                blocks,
+                workers=workers,
+                pretty=pretty,
+                cache_size=cache_size,
+                **settings,
+            )
 
-        for Lix, Ljx, Lcids in zip(Lix2d, Ljx2d, Lcids2d):
+            def collect_blocks():
+                for (sites, rejected, (hits, misses)), ncells in rendered:
+                    if cache is not None:
+                        cache.hits += hits
+                        cache.misses += misses
+                    yield sites, rejected, ncells
+
+            results = collect_blocks()
+        else:
+            results = (
+                (
+                    *render_block(
+                        cells.take(slice(start, stop)), serializer, cache, **settings
+                    ),
+                    stop - start,
+                )
+                for start, stop in blocks
+            )
+
+        rejected_total: Counter = Counter()
+        with open_site_stream(
+            outfile, serializer, shard_sites=shard_sites, shard_bytes=shard_bytes
+        ) as stream:
+            for sites, rejected, ncells in results:
+                for site in sites:
+                    stream.add(site)
+                rejected_total.update(rejected)
+
+                if progressbar:
+                    if hasattr(progressbar, "progress"):
+                        progressbar.progress(step / total_steps)
+                    else:
+                        progressbar.update(ncells / total_steps)
+                    step += ncells
+
+                if status_widget:
+                    status_widget.warning(f"{(step/total_steps)*100:.1f}% done")
+
+        # rules in validation order (also those without rejected values)
+        _, rules = validate_layers({k: v[:0] for k, v in cells.layers.items()})
+        self.rejected = {rule: rejected_total[rule] for rule in rules}
+        if any(self.rejected.values()):
+            log.info(
+                "Rejected layer values: "
+                + ", ".join(f"{k}={v}" for k, v in self.rejected.items() if v)
+            )
 
-            subset = self.soil.isel(
-                lat=xr.DataArray(np.array(Ljx), dims="points"),
-                lon=xr.DataArray(np.array(Lix), dims="points"),
+        if cache is not None:
+            self.cache_stats = cache.stats
+            total = cache.hits + cache.misses
+            log.info(
+                f"Layer cache: {cache.hits} hits, {cache.misses} misses "
+                f"({cache.hits / max(total, 1) * 100:.1f}% reused)"
             )
 
-            for point in subset.points:
-                d = subset.sel(points=point)
-                lat, lon = float(d.lat), float(d.lon)
-
-                # take point sel and return dict with modified data naming/ units
-                # TODO: do proper mask checking
-                if not np.isnan(d.sel(lev=1)["depth"].values.item()):
-                    data = translate_data_format(d)
-
-                    site = SiteXML(
-                        lat=lat, lon=lon, id=Dcids[(lat, lon)]
-                    )  # **BASEINFO)
-
-                    add_site = False
-                    for i, lay in enumerate(data):
-                        assert i < 5, "Currently max of 5 layers expected"
-
-                        # abort if we have no valid data for layer
-                        if None in [lay.ph, lay.bd, lay.clay, lay.sand]:
-                            break
-
-                        # default iron percentage
-                        lay.iron = 0.01
-
-                        if i == 0 and extra_split:
-                            site.add_soil_layer(
-                                lay, litter=False, extra_split=extra_split
-                            )
-                        else:
-                            site.add_soil_layer(lay, litter=False)
-                        add_site = True
-
-                    if add_site:
-                        sites.append(site)
-
-                    if progressbar:
-                        if hasattr(progressbar, "progress"):
-                            progressbar.progress(step / total_steps)
-                        else:
-                            progressbar.update(1 / total_steps)
-                        step += 1
-
-                    if status_widget:
-                        status_widget.warning(f"{(step/total_steps)*100:.1f}% done")
-
-        # create xml
-        xml = et.Element("ldndcsite")
-        for site_cnt, site in enumerate(sites):
-            x = site.xml.find("description")
-            if site_cnt == 0:
-                xml.append(x)
-            site.xml.remove(x)
-            xml.append(site.xml)
-        return md.parseString(et.tostring(xml)).toprettyxml()
+        return stream.getvalue() if outfile is None else None
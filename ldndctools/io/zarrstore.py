@@ -0,0 +1,65 @@
+"""local, spatially chunked Zarr copies of the (NetCDF) soil sources"""
+import logging
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+import xarray as xr
+
+from ldndctools.io.idgrid import cache_dir
+
+__all__ = ["DEFAULT_CHUNKS", "convert_to_zarr", "open_zarr", "soil_zarr_path"]
+
+log = logging.getLogger(__name__)
+
+# lat/ lon chunk sizes (all levels of a cell are in one chunk)
+DEFAULT_CHUNKS = {"lat": 256, "lon": 256}
+
+# encodings that are kept (compression, chunking of the NetCDF source are not)
+_ENCODING = ("dtype", "_FillValue", "scale_factor", "add_offset", "units", "calendar")
+
+
+def soil_zarr_path(res: str, directory: Optional[Union[str, Path]] = None) -> Path:
+    """location of the Zarr copy of a soil resolution (in the ldndctools cache)"""
+    directory = Path(directory) if directory is not None else cache_dir()
+    return directory / "zarr" / f"soil_{res}.zarr"
+
+
+def convert_to_zarr(
+    ds: xr.Dataset,
+    path: Union[str, Path],
+    *,
+    chunks: Optional[Dict[str, int]] = None,
+    attrs: Optional[Dict[str, Any]] = None,
+) -> Path:
+    """write ds as a Zarr store chunked along lat/ lon (replaced atomically)
+
+    chunks (default DEFAULT_CHUNKS) are capped to the size of the dimensions,
+    dimensions without a chunk size (i.e. lev) are not split.
+    """
+    chunks = {**DEFAULT_CHUNKS, **(chunks or {})}
+    ds = ds.chunk({d: min(chunks.get(d, n), n) for d, n in ds.sizes.items()})
+    ds = ds.assign_attrs(**(attrs or {}))
+    for var in ds.variables.values():
+        var.encoding = {k: v for k, v in var.encoding.items() if k in _ENCODING}
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = Path(tempfile.mkdtemp(dir=path.parent, suffix=".tmp"))
+    try:
+        ds.to_zarr(tmp, mode="w")
+        if path.exists():
+            shutil.rmtree(path)
+        os.replace(tmp, path)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    log.info(f"Soil data written to {path}")
+    return path
+
+
+def open_zarr(path: Union[str, Path]) -> xr.Dataset:
+    """open a Zarr store lazily (dask arrays with the chunks of the store)"""
+    return xr.open_zarr(Path(path))
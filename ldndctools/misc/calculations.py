@@ -1,9 +1,15 @@
+import logging
 import math
 from typing import Tuple
 
+import numpy as np
+
 from ldndctools.misc.errors import ParameterMissingError
+from ldndctools.misc.layertable import LayerTable
 from ldndctools.misc.types import LayerData
 
+log = logging.getLogger(__name__)
+
 
 # currently not used
 def calc_litter_properties(
@@ -51,6 +57,69 @@ def calcHeight(TK, N):
     return (TKmm, layerHeight)
 
 
+def _water_contents(corg, clay, sand, bd):
+    """field capacity and wilting point (see calc_hydraulic_properties)
+
+    Works on scalars and (broadcastable) numpy arrays alike.
+    """
+
+    # convert units
+    corg = corg * 100
+    clay = clay * 100
+    sand = sand * 100
+
+    theta_r = 0.015 + 0.005 * clay + 0.014 * corg
+    theta_s = 0.81 - 0.283 * bd + 0.001 * clay
+
+    log_n = 0.053 - 0.009 * sand - 0.013 * clay + 0.00015 * sand**2
+    log_alpha = -2.486 + 0.025 * sand - 0.351 * corg - 2.617 * bd - 0.023 * clay
+
+    alpha = np.power(math.e, log_alpha)
+    vgn = np.power(math.e, log_n)
+    vgm = 1.0  # (1.0 - (1.0/ vGn)) off as we do not use texture classes but real frac
+
+    field_capacity = theta_r + (theta_s - theta_r) / np.power(
+        (1.0 + np.power(alpha * 100.0, vgn)), vgm
+    )
+    wilting_point = theta_r + (theta_s - theta_r) / np.power(
+        (1.0 + np.power(alpha * 15800.0, vgn)), vgm
+    )
+    return field_capacity, wilting_point
+
+
+def calc_hydraulic_properties_array(
+    corg: np.ndarray, clay: np.ndarray, sand: np.ndarray, bd: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """calc wcmin, wcmax for arrays of layers (see calc_hydraulic_properties)
+
+    wcmin is NaN where the field capacity is below the wilting point, wcmin/ wcmax
+    are NaN where they are negative (both logged) and both are NaN where an input
+    value is missing (NaN).
+    """
+    field_capacity, wilting_point = _water_contents(
+        *(np.asarray(v, dtype=float) for v in [corg, clay, sand, bd])
+    )
+    fixed = field_capacity < wilting_point
+    if np.any(fixed):
+        log.warning(
+            "Field capacity < wilting point "
+            f"({np.count_nonzero(fixed)} layers)! Fixing with: wcmin := None"
+        )
+    wcmax = field_capacity * 1000
+    wcmin = np.where(fixed, np.nan, wilting_point * 1000)
+
+    # negative water contents (from implausible input values) are dropped
+    negative = (wcmin < 0) | (wcmax < 0)
+    if np.any(negative):
+        log.warning(
+            "Negative wcmin/ wcmax "
+            f"({np.count_nonzero(negative)} layers)! Fixing with: value := None"
+        )
+        wcmin = np.where(wcmin < 0, np.nan, wcmin)
+        wcmax = np.where(wcmax < 0, np.nan, wcmax)
+    return wcmin, wcmax
+
+
 def calc_hydraulic_properties(ld: LayerData) -> LayerData:
     """Calc hydraulic properties based on et al. (1996)
 
@@ -75,45 +144,27 @@ def calc_hydraulic_properties(ld: LayerData) -> LayerData:
     if None in [ld.corg, ld.clay, ld.sand, ld.bd]:
         raise ParameterMissingError("Required: corg, clay, sand, bd")
 
-    # convert units
-    corg = ld.corg * 100
-    clay = ld.clay * 100
-    sand = ld.sand * 100
-    bd = ld.bd
-
-    theta_r = 0.015 + 0.005 * clay + 0.014 * corg
-    theta_s = 0.81 - 0.283 * bd + 0.001 * clay
-
-    log_n = 0.053 - 0.009 * sand - 0.013 * clay + 0.00015 * sand ** 2
-    log_alpha = -2.486 + 0.025 * sand - 0.351 * corg - 2.617 * bd - 0.023 * clay
-
-    alpha = math.e ** log_alpha
-    vgn = math.e ** log_n
-    vgm = 1.0  # (1.0 - (1.0/ vGn)) off as we do not use texture classes but real frac
-
-    field_capacity = theta_r + (theta_s - theta_r) / math.pow(
-        (1.0 + math.pow(alpha * 100.0, vgn)), vgm
-    )
-    wilting_point = theta_r + (theta_s - theta_r) / math.pow(
-        (1.0 + math.pow(alpha * 15800.0, vgn)), vgm
-    )
+    wcmin, wcmax = calc_hydraulic_properties_array(ld.corg, ld.clay, ld.sand, ld.bd)
 
     # TODO: check this more systematically
     #
     # Which combo of soil parameters is valid and should be corrected if
     # wcmin/ wcmax calc is bad, and which should be blocked and raised
+    ld.wcmax = None if np.isnan(wcmax) else wcmax.item()
+    ld.wcmin = None if np.isnan(wcmin) else wcmin.item()
 
-    try:
-        if field_capacity < wilting_point:
-            raise ValueError("Field capacity < wilting point!")
+    return ld
 
-    except ValueError:
-        print("WARNING: Field capacity < wilting point! Fixing with: wcmin := None")
-        ld.wcmax = field_capacity * 1000
-        ld.wcmin = None
-        return ld
 
-    ld.wcmax = field_capacity * 1000
-    ld.wcmin = wilting_point * 1000
+def calc_hydraulic_properties_table(table: LayerTable) -> LayerTable:
+    """calc hydraulic properties (wcmin, wcmax) of all layers of a table in place
 
-    return ld
+    Same as calc_hydraulic_properties_array (wcmin is NaN if field capacity <
+    wilting point, negative values are NaN, both are NaN for layers without corg,
+    clay, sand or bd).
+    """
+    columns = [table.column(v) for v in ["corg", "clay", "sand", "bd"]]
+    wcmin, wcmax = calc_hydraulic_properties_array(*columns)
+    table.column("wcmin")[:] = wcmin
+    table.column("wcmax")[:] = wcmax
+    return table
@@ -1,10 +1,11 @@
-from typing import Any, Optional, Union
+from pathlib import Path
+from typing import Any, Optional, TextIO, Union
 
-import numpy as np
 import rioxarray  # noqa
-import xarray as xr
 
-from ldndctools.cli.selector import CoordinateSelection, Selector
+from ldndctools.cli.selector import CoordinateSelection, IdSelection, Selector
+from ldndctools.io.extraction import cells_from_ids
+from ldndctools.io.regiongrid import RegionGrid
 from ldndctools.io.xmlwriter import SiteXmlWriter
 from ldndctools.misc.types import RES
 from ldndctools.sources.soil.soil_base import SoilDataset
@@ -12,55 +13,109 @@ from ldndctools.sources.soil.soil_base import SoilDataset
 
 def create_dataset(
     soil: SoilDataset,
-    selector: Union[Selector, CoordinateSelection],
+    selector: Union[Selector, CoordinateSelection, IdSelection],
     res: RES,
     progressbar: Optional[Any] = None,
     status_widget: Optional[Any] = None,
+    outfile: Optional[Union[str, Path, TextIO]] = None,
+    workers: int = 1,
+    shard_sites: Optional[int] = None,
+    shard_bytes: Optional[int] = None,
+    sample: Optional[int] = None,
+    seed: Optional[int] = None,
+    discretization: Optional[str] = None,
 ):
     # soil = soil.load()
     # soil = soil.rio.write_crs(4326)
 
     if isinstance(selector, Selector):
         print("Using Selector")
-        if selector.gdf_mask is None:
+        if selector.gdf is None:
             print("No valid data to process for this region/ bbox request.")
             exit(1)
 
-        # clip region selection
-        soil.clip_mask_box(
+        # clip region selection (only the bbox of the source is converted)
+        box = dict(
             minx=selector._bbox.x1,
             miny=selector._bbox.y1,
             maxx=selector._bbox.x2,
             maxy=selector._bbox.y2,
         )
-        soil.clip_mask(selector.gdf_mask.geometry, all_touched=True)
+        soil.window(**box)
+        soil.clip_mask_box(**box)
 
-        xmlwriter = SiteXmlWriter(soil, res=res)
-        site_xml = xmlwriter.write(progressbar=progressbar, status_widget=status_widget)
+        # countries are rasterized once per soil grid (cached)
+        regions = RegionGrid(selector._df, *soil.grid, name=res.name)
+        selected = regions.mask(
+            selector.selected, soil.layer_mask.lat.values, soil.layer_mask.lon.values
+        )
+        if not selected.any():
+            print("No valid data to process for this region/ bbox request.")
+            exit(1)
+        soil.clip_mask_cells(selected)
 
-    else:
-        # WARNING: THIS BRANCH IS DEFUNCT!!!
-        soil.clip_mask_box(
-            minx=min(selector.lons),
-            miny=min(selector.lats),
-            maxx=max(selector.lons),
-            maxy=max(selector.lats),
+        xmlwriter = SiteXmlWriter(soil, res=res)
+        site_xml = xmlwriter.write(
+            progressbar=progressbar,
+            status_widget=status_widget,
+            outfile=outfile,
+            workers=workers,
+            shard_sites=shard_sites,
+            shard_bytes=shard_bytes,
+            discretization=discretization,
+            sample=sample,
+            seed=seed,
         )
 
-        results = []
-        for lat, lon in zip(selector.lats, selector.lons):
-            results.append(soil.data.sel(lat=lat, lon=lon, method="nearest"))
+    elif isinstance(selector, IdSelection):
+        print("Using IdSelection")
+        # only convert the bbox of the ids of the soil grid (if there are any)
+        lats, lons = soil.grid
+        jx, ix = cells_from_ids(selector.ids, lats, lons)
+        if len(jx) > 0:
+            soil.window(
+                minx=lons[ix].min(),
+                miny=lats[jx].min(),
+                maxx=lons[ix].max(),
+                maxy=lats[jx].max(),
+            )
 
-        soil_new = xr.ones_like(soil.data) * np.nan
-        for p in results:
-            for v in soil.data_vars:
-                soil_new[v].loc[dict(lat=p.lat, lon=p.lon)] = p[v]
+        xmlwriter = SiteXmlWriter(soil, res=res)
+        site_xml = xmlwriter.write(
+            progressbar=progressbar,
+            status_widget=status_widget,
+            outfile=outfile,
+            workers=workers,
+            shard_sites=shard_sites,
+            shard_bytes=shard_bytes,
+            discretization=discretization,
+            id_selection=selector.ids,
+        )
 
-        xmlwriter = SiteXmlWriter(soil_new, res=res)
+    else:
+        print("Using CoordinateSelection")
+        # only convert the bbox of the points (padded by a cell at the borders)
+        pad = 1.0
+        box = dict(
+            minx=min(selector.lons) - pad,
+            miny=min(selector.lats) - pad,
+            maxx=max(selector.lons) + pad,
+            maxy=max(selector.lats) + pad,
+        )
+        soil.window(**box)
+        soil.clip_mask_box(**box)
+
+        xmlwriter = SiteXmlWriter(soil, res=res)
         site_xml = xmlwriter.write(
             progressbar=progressbar,
             status_widget=status_widget,
             coords=zip(selector.lons, selector.lats),
+            coord_ids=selector.ids,
+            outfile=outfile,
+            workers=workers,
+            shard_sites=shard_sites,
+            shard_bytes=shard_bytes,
+            discretization=discretization,
         )
 
     site_nc = xmlwriter.arrays
@@ -3,9 +3,12 @@
 # NOTE: This is a very slow and simplistic implementation!
 #       ... there are other libs that could be much faster by have C/ C++ code
 #       i.e.: https://github.com/hkwi/python-geohash
+#       Use the *_array functions below for many coordinates/ ids at once.
 
 from typing import Tuple
 
+import numpy as np
+
 ch32 = "0123456789bcdefghjkmnpqrstuvwxyz"
 bool2ch = {f"{i:05b}": ch for i, ch in enumerate(ch32)}
 ch2bool = {v: k for k, v in bool2ch.items()}
@@ -85,3 +88,88 @@ def geohash_dec2coords(*, geohash_dec: int, pre: int = 6) -> Tuple[float, float]
     return round(sum(res[0]) / 2, max(3, pre - 3)), round(
         sum(res[1]) / 2, max(3, pre - 3)
     )
+
+
+# vectorized versions (numpy arrays of coordinates/ ids, identical results)
+
+
+def _bisect_bits(values: np.ndarray, mn: float, mx: float, nbits: int) -> np.ndarray:
+    """bits of nbits successive bisections of [mn, mx] (as in bisect)"""
+    # grid coordinates repeat a lot: bisect the unique values only
+    shape = values.shape
+    values, inverse = np.unique(values, return_inverse=True)
+    bits = np.zeros(values.shape, dtype=np.int64)
+    mn, mx = np.full(values.shape, float(mn)), np.full(values.shape, float(mx))
+    for _ in range(nbits):
+        mid = (mn + mx) / 2
+        upper = ~(values < mid)
+        bits = (bits << 1) | upper
+        np.copyto(mn, mid, where=upper)
+        np.copyto(mx, mid, where=~upper)
+    return bits[inverse].reshape(shape)
+
+
+def _spread(x: np.ndarray) -> np.ndarray:
+    """move bit k of x (< 2**32) to bit 2k"""
+    x = x & 0x00000000FFFFFFFF
+    x = (x | (x << 16)) & 0x0000FFFF0000FFFF
+    x = (x | (x << 8)) & 0x00FF00FF00FF00FF
+    x = (x | (x << 4)) & 0x0F0F0F0F0F0F0F0F
+    x = (x | (x << 2)) & 0x3333333333333333
+    return (x | (x << 1)) & 0x5555555555555555
+
+
+def _compact(x: np.ndarray) -> np.ndarray:
+    """move bit 2k of x to bit k (inverse of _spread)"""
+    x = x & 0x5555555555555555
+    x = (x | (x >> 1)) & 0x3333333333333333
+    x = (x | (x >> 2)) & 0x0F0F0F0F0F0F0F0F
+    x = (x | (x >> 4)) & 0x00FF00FF00FF00FF
+    x = (x | (x >> 8)) & 0x0000FFFF0000FFFF
+    return (x | (x >> 16)) & 0x00000000FFFFFFFF
+
+
+def coords2geohash_dec_array(
+    lats: np.ndarray, lons: np.ndarray, pre: int = 6
+) -> np.ndarray:
+    """convert arrays of lat, lon coordinates to decimal geohashes (int64)
+
+    Same bisection as encoder, but lat and lon are bisected separately (before
+    broadcasting, i.e. lats[:, None], lons[None, :] for a grid) and the bits are
+    interleaved into the integer id directly (the base32 string is skipped).
+    """
+    nbits = pre * 5
+    latbits = _bisect_bits(np.asarray(lats, dtype=float), -90, 90, nbits // 2)
+    lonbits = _bisect_bits(np.asarray(lons, dtype=float), -180, 180, nbits - nbits // 2)
+
+    # the first (leftmost) bit is a lon bit
+    odd = nbits % 2
+    return (_spread(lonbits) << (1 - odd)) | (_spread(latbits) << odd)
+
+
+def _round_center(k: np.ndarray, nbits: int, mn: int, width: int, digits: int):
+    """round the center of bisection cell k (exact, as builtin round)"""
+    # center = mn + (2k + 1) * width / 2**(nbits + 1), scaled by 10**digits
+    den = 2 ** (nbits + 1)
+    dtype = np.int64 if den * width * 10**digits < 2**62 else object
+    num = (mn * den + (2 * k.astype(dtype) + 1) * width) * 10**digits
+    q, r = num // den, num % den
+    q = q + ((2 * r > den) | ((2 * r == den) & (q % 2 == 1)))
+    return (q / 10**digits).astype(float)
+
+
+def geohash_dec2coords_array(
+    geohash_dec: np.ndarray, pre: int = 6
+) -> Tuple[np.ndarray, np.ndarray]:
+    """convert an array of decimal geohashes to lat, lon coordinate arrays"""
+    ids = np.asarray(geohash_dec, dtype=np.int64)
+    nbits = pre * 5
+
+    odd = nbits % 2
+    ilon = _compact(ids >> (1 - odd))
+    ilat = _compact(ids >> odd)
+
+    digits = max(3, pre - 3)
+    lats = _round_center(ilat, nbits // 2, -90, 180, digits)
+    lons = _round_center(ilon, nbits - nbits // 2, -180, 360, digits)
+    return lats, lons
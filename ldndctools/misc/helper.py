@@ -22,13 +22,13 @@ logging.getLogger("botocore").setLevel(logging.WARNING)
 
 # from: https://stackoverflow.com/a/54487188/5300574
 def mutually_exclusive(keyword: str, *keywords: str):
-    """decorator for mutually exclusive kwargs"""
+    """decorator for mutually exclusive kwargs (kwargs passed as None are ignored)"""
     keywords = (keyword,) + keywords
 
     def wrapper(func: Any) -> Any:
         @wraps(func)
         def inner(*args: Any, **kwargs: Any) -> Any:
-            if sum(k in keywords for k in kwargs) > 1:
+            if sum(k in keywords and v is not None for k, v in kwargs.items()) > 1:
                 raise TypeError(
                     "You must specify exactly one of {}".format(", ".join(keywords))
                 )
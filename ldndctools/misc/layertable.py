@@ -0,0 +1,162 @@
+"""compact, array-backed soil layer table (LayerData objects only as a view)"""
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, NamedTuple
+
+import numpy as np
+
+from ldndctools.misc.types import LayerData
+
+__all__ = [
+    "Discretization",
+    "FIELDS",
+    "INT_FIELDS",
+    "LAYER_DTYPE",
+    "LayerTable",
+    "PRESETS",
+]
+
+# fixed column order, same as the LayerData fields
+FIELDS: List[str] = list(LayerData.__fields__)
+INT_FIELDS = {f for f in FIELDS if issubclass(LayerData.__fields__[f].type_, int)}
+LAYER_DTYPE = np.dtype([(f, np.float64) for f in FIELDS])
+
+_col = {f: i for i, f in enumerate(FIELDS)}
+
+# layers are only used up to the first layer without these values
+REQUIRED = ["ph", "bd", "clay", "sand"]
+
+
+def _layerdata(row: np.ndarray) -> LayerData:
+    """LayerData view of a table row (no validation)"""
+    fields = {}
+    for f, v in zip(FIELDS, row.tolist()):
+        if v != v:
+            v = None
+        elif f in INT_FIELDS:
+            v = int(v)
+        fields[f] = v
+    return LayerData.construct(**fields)
+
+
+@dataclass
+class LayerTable:
+    """soil layers of many sites in one float64 array (NaN for missing values)
+
+    data has one row per layer and one column per LayerData field (FIELDS order),
+    the layers of site n are data[offsets[n]:offsets[n + 1]].
+    """
+
+    data: np.ndarray
+    offsets: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    @property
+    def nlayers(self) -> int:
+        return len(self.data)
+
+    @property
+    def records(self) -> np.ndarray:
+        """structured array view (one record per layer)"""
+        return np.ascontiguousarray(self.data).view(LAYER_DTYPE)[:, 0]
+
+    @property
+    def counts(self) -> np.ndarray:
+        """number of layers per site"""
+        return np.diff(self.offsets)
+
+    def column(self, var: str) -> np.ndarray:
+        """values of field var of all layers (a view)"""
+        return self.data[:, _col[var]]
+
+    def site(self, n: int) -> np.ndarray:
+        """layer rows of site n (a view)"""
+        return self.data[self.offsets[n] : self.offsets[n + 1]]
+
+    def layerdata(self, n: int) -> List[LayerData]:
+        """layers of site n as LayerData objects"""
+        return [_layerdata(row) for row in self.site(n)]
+
+    @classmethod
+    def from_layerdata(cls, sites: Iterable[Iterable[LayerData]]) -> "LayerTable":
+        """table of sites given as lists of LayerData"""
+        rows, counts = [], [0]
+        for layers in sites:
+            n = 0
+            for ld in layers:
+                rows.append([getattr(ld, f) for f in FIELDS])
+                n += 1
+            counts.append(n)
+        data = np.array(rows, dtype=float).reshape(-1, len(FIELDS))
+        return cls(data=data, offsets=np.cumsum(counts))
+
+    @classmethod
+    def from_profiles(
+        cls, values: Dict[str, np.ndarray], max_layers: int = 5
+    ) -> "LayerTable":
+        """table of validated per-cell layer arrays (var -> (cells, levels))
+
+        Layers without depth are skipped and a profile ends before the first layer
+        that lacks one of the REQUIRED values. Iron is set to the default percentage
+        of 0.01.
+        """
+        has_depth = ~np.isnan(values["depth"])
+        incomplete = has_depth & np.any([np.isnan(values[v]) for v in REQUIRED], axis=0)
+        keep = has_depth & (np.cumsum(incomplete, axis=1) == 0)
+        counts = keep.sum(axis=1)
+        assert not np.any(
+            (counts >= max_layers) & (has_depth.sum(axis=1) > max_layers)
+        ), f"Currently max of {max_layers} layers expected"
+
+        data = np.full((int(counts.sum()), len(FIELDS)), np.nan)
+        data[:, _col["depth"]] = LayerData.__fields__["depth"].default
+        for var, value in values.items():
+            data[:, _col[var]] = value[keep]
+        data[:, _col["iron"]] = 0.01
+
+        return cls(data=data, offsets=np.concatenate([[0], np.cumsum(counts)]))
+
+    def rediscretize(self, thickness: float, max_depth: float) -> "LayerTable":
+        """split the layers of all sites into layers of thickness down to max_depth
+
+        Pieces of thickness are carved off the top of every layer (above max_depth)
+        as long as the rest of the layer is at least thickness as well; the rest
+        remains one layer. All other values are copied to the new layers.
+        """
+        depth = self.column("depth")
+        base = np.concatenate([[0.0], np.cumsum(depth)])
+        top = base[:-1] - np.repeat(base[self.offsets[:-1]], self.counts)
+
+        # number of pieces of thickness and the rest of each layer
+        above = np.clip(max_depth - top, 0, depth)
+        pieces = np.floor_divide(above, thickness).astype(np.int64)
+        rest = depth - pieces * thickness
+        pieces[(rest > 0) & (rest < thickness) & (pieces > 0)] -= 1
+        rest = depth - pieces * thickness
+        repeats = pieces + (rest > 0)
+
+        data = np.repeat(self.data, repeats, axis=0)
+        start = np.repeat(np.cumsum(repeats) - repeats, repeats)
+        k = np.arange(len(data)) - start
+        data[:, _col["depth"]] = np.where(
+            k < np.repeat(pieces, repeats), thickness, np.repeat(rest, repeats)
+        )
+
+        layers = np.concatenate([[0], np.cumsum(repeats)])
+        return LayerTable(data=data, offsets=layers[self.offsets])
+
+
+class Discretization(NamedTuple):
+    """target layer thickness and depth of LayerTable.rediscretize (mm)"""
+
+    thickness: float
+    max_depth: float
+
+
+PRESETS: Dict[str, Discretization] = {
+    # carve a 20 mm layer off the top layer (if it is at least 40 mm)
+    "extra_split": Discretization(thickness=20, max_depth=20),
+    # 20 mm layers down to 300 mm
+    "fine": Discretization(thickness=20, max_depth=300),
+}
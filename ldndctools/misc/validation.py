@@ -0,0 +1,86 @@
+"""batched validation of layer data arrays with the rules of LayerData
+
+Validating LayerData field by field (validate_assignment) is slow for millions of
+layers. validate_layers applies the same conint/ confloat ranges and the texture
+rule to whole arrays at once and nulls (NaN) rejected values, like the
+ValidationError fallback of translate_layers does with None.
+"""
+from typing import Any, Dict, Tuple
+
+import numpy as np
+
+from ldndctools.misc.types import LayerData
+
+__all__ = ["TEXTURE", "validate_layers"]
+
+# summation order of LayerData.check_texture_is_plausible
+TEXTURE = ["sand", "silt", "clay"]
+
+
+def _is_int(var: str) -> bool:
+    return issubclass(LayerData.__fields__[var].type_, int)
+
+
+def _in_range(var: str, values: np.ndarray) -> np.ndarray:
+    """mask of values that pass the constraints of field var"""
+    constraint = LayerData.__fields__[var].type_
+    ok = np.isfinite(values) if _is_int(var) else ~np.isnan(values)
+    for bound, op in [
+        ("ge", np.greater_equal),
+        ("gt", np.greater),
+        ("le", np.less_equal),
+        ("lt", np.less),
+    ]:
+        limit = getattr(constraint, bound, None)
+        if limit is not None:
+            with np.errstate(invalid="ignore"):
+                ok &= op(values, limit)
+    return ok
+
+
+def validate_layers(
+    layers: Dict[str, np.ndarray], per_cell: bool = False
+) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+    """validate layer arrays (var -> array) like assigning them to LayerData
+
+    Variables are checked in the given order (the texture rule only sees texture
+    values accepted before). Returns the arrays with rejected values set to NaN
+    (int fields truncated as by pydantic) and the number of rejected values per
+    rule (field name or "texture"), per cell (first axis) if per_cell is set.
+    Missing values (NaN) are not counted.
+    """
+    valid: Dict[str, np.ndarray] = {}
+    rejected: Dict[str, Any] = {}
+
+    def count(mask: np.ndarray) -> Any:
+        if per_cell:
+            return mask.reshape(len(mask), int(np.prod(mask.shape[1:]))).sum(axis=1)
+        return int(np.count_nonzero(mask))
+
+    for var, values in layers.items():
+        if var not in LayerData.__fields__:
+            raise ValueError(f'"LayerData" object has no field "{var}"')
+
+        values = np.asarray(values, dtype=float)
+        if _is_int(var):
+            values = np.trunc(values)
+        present = ~np.isnan(values)
+        ok = _in_range(var, values)
+        rejected[var] = count(present & ~ok)
+
+        if var in TEXTURE:
+            total = np.zeros(values.shape)
+            for t in TEXTURE:
+                v = values if t == var else valid.get(t)
+                if v is not None:
+                    total = total + np.where(np.isnan(v), 0.0, v)
+            implausible = ok & (total > 1.0)
+            rejected["texture"] = rejected.get("texture", 0) + count(implausible)
+            ok &= ~implausible
+
+        if np.any(rejected[var]) and not LayerData.__fields__[var].allow_none:
+            raise ValueError(f"{rejected[var]} invalid values for required {var}")
+
+        valid[var] = np.where(ok, values, np.nan)
+
+    return valid, rejected
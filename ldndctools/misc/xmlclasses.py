@@ -1,10 +1,29 @@
 import xml.dom.minidom as md
 import xml.etree.cElementTree as et
+from typing import List
 
-from ldndctools.misc.calculations import calc_hydraulic_properties
+from ldndctools.misc.calculations import calc_hydraulic_properties_table
+from ldndctools.misc.layertable import LayerTable, PRESETS
 from ldndctools.misc.types import LayerData, NODATA
 
 
+def prepare_soil_layer(
+    ld: LayerData, litter: bool = False, extra_split: bool = False
+) -> List[LayerData]:
+    """complete a soil layer and return the layer(s) to add to a site"""
+    table = LayerTable.from_layerdata([[ld]])
+
+    # only calculate hydrological properties if we have a mineral soil layer added
+    if not litter:
+        table = calc_hydraulic_properties_table(table)
+
+    # create identical top layer with finer discretization
+    if extra_split:
+        table = table.rediscretize(*PRESETS["extra_split"])
+
+    return table.layerdata(0)
+
+
 class BaseXML(object):
     def __init__(self, start_year: int = 2000, end_year: int = 2012, **kwargs):
         self.xml = None  # ET.Element("setups"), define by child
@@ -57,22 +76,7 @@ class SiteXML(BaseXML):
     def add_soil_layer(
         self, ld: LayerData, litter: bool = False, extra_split: bool = False
     ):
-        """ this adds a soil layer to the given site (to current if no ID given)"""
-        # only calculate hydrological properties if we have a mineral soil layer added
-        if not litter:
-            ld = calc_hydraulic_properties(ld)
-
-        if extra_split:
-            # create identical top layer with finer discretization
-            if ld.depth >= 40:
-                ld_extra = ld.copy()
-                ld_extra.depth = 20
-
-                # adjust height of original top layer to be consistent
-                ld.depth = ld.depth - 20
-
-                soil_layer_extra = et.Element("layer", **ld_extra.serialize())
-                self.xml.find("./soil/layers").append(soil_layer_extra)
-
-        soil_layer = et.Element("layer", **ld.serialize())
-        self.xml.find("./soil/layers").append(soil_layer)
+        """this adds a soil layer to the given site (to current if no ID given)"""
+        for lay in prepare_soil_layer(ld, litter=litter, extra_split=extra_split):
+            soil_layer = et.Element("layer", **lay.serialize())
+            self.xml.find("./soil/layers").append(soil_layer)
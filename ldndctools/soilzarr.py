@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# Convert the catalog soil sources to local, spatially chunked Zarr stores
+#
+# dlsc opens the Zarr copy of a resolution (if present) lazily, so a regional
+# request only reads the chunks that intersect its bounding box.
+
+import argparse
+import logging
+from importlib import resources
+from typing import Optional, Sequence
+
+import intake
+
+from ldndctools.io.soilcache import file_checksum, local_path
+from ldndctools.io.zarrstore import convert_to_zarr, DEFAULT_CHUNKS, soil_zarr_path
+from ldndctools.misc.types import RES
+
+log = logging.getLogger(__name__)
+
+
+def conf(raw_args: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Convert soil data to local chunked Zarr stores (used by dlsc)"
+    )
+    parser.add_argument(
+        "-r",
+        "--resolution",
+        dest="resolution",
+        nargs="+",
+        default=[r.name for r in RES.members()],
+        choices=[r.name for r in RES.members()],
+        help="soil resolution(s) to convert (default: all)",
+    )
+
+    parser.add_argument(
+        "--chunks",
+        dest="chunks",
+        nargs=2,
+        type=int,
+        default=[DEFAULT_CHUNKS["lat"], DEFAULT_CHUNKS["lon"]],
+        metavar=("LAT", "LON"),
+        help="chunk size (cells) along lat and lon",
+    )
+
+    parser.add_argument(
+        "--overwrite",
+        dest="overwrite",
+        action="store_true",
+        default=False,
+        help="replace existing Zarr stores",
+    )
+
+    return parser.parse_args(raw_args)
+
+
+def main(raw_args: Optional[Sequence[str]] = None):
+    logging.basicConfig(level=logging.INFO)
+    args = conf(raw_args)
+    chunks = dict(zip(["lat", "lon"], args.chunks))
+
+    with resources.path("data", "catalog.yml") as cat:
+        catalog = intake.open_catalog(str(cat))
+
+    for res in args.resolution:
+        path = soil_zarr_path(res)
+        if path.exists() and not args.overwrite:
+            log.info(f"{path} exists (use --overwrite to replace it)")
+            continue
+
+        source = catalog.soil(res=res)
+        checksum = file_checksum(local_path(source.urlpath, source.storage_options))
+        log.info(f"Converting soil {res} (chunks: {chunks})")
+        convert_to_zarr(
+            source.to_dask(), path, chunks=chunks, attrs={"source_checksum": checksum}
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,8 @@
-from typing import Dict, Iterable, Optional, Union
+from dataclasses import astuple
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple, Union
 
+import numpy as np
 import xarray as xr
 
 from ldndctools.sources.soil.types import BaseAttribute, FullAttribute
@@ -28,6 +31,85 @@ def convert_unit(unit_a: str, unit_b: str) -> float:
     return conv
 
 
+class ConversionPlan:
+    """unit conversion of all source variables of a schema, compiled once
+
+    steps: (source variable, target attribute, conversion factor)
+    """
+
+    def __init__(
+        self,
+        steps: List[Tuple[str, FullAttribute, float]],
+        *,
+        dtype: np.dtype = np.float32,
+    ):
+        self.steps = steps
+        self.dtype = np.dtype(dtype)
+
+    @property
+    def names(self) -> List[str]:
+        """target variable names (stack order)"""
+        return [target.name for _, target, _ in self.steps]
+
+    def __call__(
+        self,
+        source: xr.Dataset,
+        mask: xr.DataArray,
+        *,
+        out: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """converted and masked values of all targets as one stack
+
+        Returns an array (targets, *mask.dims), NaN outside of mask. Each target is
+        written in one pass (conversion and mask fused) into out (or a new array).
+        """
+        valid = mask.notnull().values
+        shape = (len(self.steps),) + valid.shape
+        if out is None:
+            out = np.full(shape, np.nan, dtype=self.dtype)
+        elif out.shape != shape:
+            raise ValueError(f"out has shape {out.shape}, expected {shape}")
+        else:
+            out.fill(np.nan)
+
+        for k, (var, _, factor) in enumerate(self.steps):
+            values = source[var].broadcast_like(mask).transpose(*mask.dims).values
+            np.multiply(values, factor, out=out[k], where=valid, casting="same_kind")
+        return out
+
+    def to_dataset(
+        self, stack: np.ndarray, source: xr.Dataset, mask: xr.DataArray
+    ) -> xr.Dataset:
+        """target variables of a stack (views) with the coords of mask"""
+        ds = xr.Dataset()
+        for (var, target, _), values in zip(self.steps, stack):
+            attrs = dict(
+                source[var].attrs, long_name=target.long_name, unit=target.unit
+            )
+            ds[target.name] = xr.DataArray(
+                values, coords=mask.coords, dims=mask.dims, attrs=attrs
+            )
+        return ds
+
+
+@lru_cache(maxsize=32)
+def _compile_plan(
+    sources: Tuple[Tuple[str, str], ...],
+    targets: Tuple[Tuple[str, str, str, int], ...],
+    mapper: Tuple[Tuple[str, str], ...],
+    variables: Tuple[str, ...],
+    dtype: str,
+) -> ConversionPlan:
+    """conversion plan of a schema (as hashable tuples), recent plans are kept"""
+    units, mapper = dict(sources), dict(mapper)
+    attrs = {t[0]: FullAttribute(*t) for t in targets}
+    steps = []
+    for var in variables:
+        target = attrs[mapper[var]]
+        steps.append((var, target, convert_unit(units[var], target.unit)))
+    return ConversionPlan(steps, dtype=dtype)
+
+
 class Converter:
     def __init__(
         self,
@@ -39,6 +121,24 @@ class Converter:
         self._a = a
         self._b = b
         self._mapper = mapper
+        self._sources = {x.name: x for x in a}
+        self._targets = {x.name: x for x in b}
+
+    def plan(
+        self, variables: Iterable[str], *, dtype: np.dtype = np.float32
+    ) -> ConversionPlan:
+        """conversion plan of the given source variables (others are skipped)
+
+        Plans are compiled once per schema and shared (bounded LRU cache).
+        """
+        variables = [v for v in variables if v in self._sources]
+        return _compile_plan(
+            tuple((x.name, x.unit) for x in self._sources.values()),
+            tuple(astuple(x) for x in self._targets.values()),
+            tuple(self._mapper.items()),
+            tuple(variables),
+            np.dtype(dtype).str,
+        )
 
     def __call__(
         self, source_data: Union[xr.Dataset, xr.DataArray], *, var: Optional[str] = None
@@ -49,14 +149,12 @@ class Converter:
         else:
             raise NotImplementedError("An xarray dataarray is required for source_data")
 
-        source = next((x for x in self._a if x.name == var), None)
-        target = next(
-            (x for x in self._b if x.name == self._mapper.get(var, None)), None
-        )
+        source = self._sources.get(var)
+        target = self._targets.get(self._mapper.get(var, None))
 
         if source is not None:
             conv = convert_unit(source.unit, target.unit)
-            target_data = source_data.copy() * conv
+            target_data = source_data * conv
             target_data.name = target.name
             target_data.attrs["long_name"] = target.long_name
             target_data.attrs["unit"] = target.unit
@@ -1,17 +1,37 @@
 from abc import ABC, abstractmethod
-from typing import Any, Union
+from collections import Counter
+from typing import Any, Callable, Dict, Tuple, Union
 
 import geopandas as gpd
 import numpy as np
 import rioxarray  # noqa
 import xarray as xr
 
+from ldndctools.io.extraction import SiteArrays
+from ldndctools.io.profiles import ProfileStore
+from ldndctools.misc.calculations import calc_hydraulic_properties_array
 from ldndctools.sources.soil.types import FullAttribute
 
 __all__ = []
 
 
 class SoilDataset(ABC):
+    """base class of soil sources
+
+    Derived properties (mask, mask_3d, data, profiles, number_of_sites) are built
+    once and memoized on the instance. Assigning _soil or _mask (i.e. clip_mask,
+    clip_mask_box) drops them, rebuilds are counted in rebuilds. The layer mask
+    (_mask) is built from _soil on first use, so a window set before that limits
+    all work to the window.
+
+    In compact mode the source is read as float32, data holds float32 variables
+    and the COMPACT_INT variables as integers (FILL_VALUE for missing values).
+    This covers data and profiles only: the site xml writer validates and completes
+    the layers of the written cells in float64 (LayerTable), one block of at most
+    BLOCK_CELLS cells at a time, so the widened copies do not add to its peak
+    memory.
+    """
+
     required_attributes = ["_source_attrs", "_mapper"]
 
     _target_attrs = [
@@ -33,12 +53,81 @@ class SoilDataset(ABC):
 
     core_soil_attrs = ["bd", "clay", "sand", "corg", "norg"]
 
+    compact: bool = False
+    _zdim: str = "lev"
+
+    # integer variables of compact data
+    COMPACT_INT: Dict[str, np.dtype] = {"depth": np.dtype(np.int16)}
+    FILL_VALUE = -1
+
     def __init_subclass__(cls, **kwargs):
         for attr_name in cls.required_attributes:
             if not hasattr(cls, attr_name):
                 raise NotImplementedError(f"Defining {attr_name} is required")
         return super().__init_subclass__(**kwargs)
 
+    @property
+    def _soil(self) -> Union[xr.Dataset, None]:
+        return self.__dict__.get("_soil_data")
+
+    @_soil.setter
+    def _soil(self, soil: Union[xr.Dataset, None]) -> None:
+        self.__dict__["_soil_data"] = soil
+        self.invalidate()
+
+    @property
+    def _mask(self) -> Union[xr.DataArray, None]:
+        if "_layer_mask" not in self.__dict__ and self._soil is not None:
+            self.__dict__["_layer_mask"] = self._build_mask(self._soil)
+            self.rebuilds["layer_mask"] += 1
+        return self.__dict__.get("_layer_mask")
+
+    @_mask.setter
+    def _mask(self, mask: Union[xr.DataArray, None]) -> None:
+        self.__dict__["_layer_mask"] = mask
+        self.invalidate()
+
+    @property
+    def rebuilds(self) -> Counter:
+        """number of times each derived property was built"""
+        return self.__dict__.setdefault("_rebuilds", Counter())
+
+    def invalidate(self) -> None:
+        """drop memoized derived properties"""
+        self.__dict__["_derived"] = {}
+
+    def _memoized(self, name: str, build: Callable[[], Any]) -> Any:
+        derived: Dict[str, Any] = self.__dict__.setdefault("_derived", {})
+        if name not in derived:
+            derived[name] = build()
+            self.rebuilds[name] += 1
+        return derived[name]
+
+    @property
+    def dtype(self) -> np.dtype:
+        """float type of converted data"""
+        return np.dtype(np.float32 if self.compact else np.float64)
+
+    @staticmethod
+    def _as_float32(soildata: xr.Dataset) -> xr.Dataset:
+        """source with float32 instead of float64 variables (lazy for dask)"""
+        return soildata.assign(
+            {
+                v: soildata[v].astype(np.float32)
+                for v in soildata.data_vars
+                if soildata[v].dtype == np.float64
+            }
+        )
+
+    def _pack_integers(self, ds: xr.Dataset) -> None:
+        """store the COMPACT_INT variables of converted data as integers"""
+        for var, dtype in self.COMPACT_INT.items():
+            if var in ds.data_vars:
+                values = ds[var].values
+                packed = np.where(np.isnan(values), self.FILL_VALUE, np.rint(values))
+                ds[var] = ds[var].copy(data=packed.astype(dtype))
+                ds[var].attrs["fill_value"] = self.FILL_VALUE
+
     @abstractmethod
     def _build_mask(self, soildata: xr.Dataset) -> xr.Dataset:
         pass
@@ -47,10 +136,42 @@ class SoilDataset(ABC):
     def _converter(self) -> Any:
         pass
 
+    @property
+    def grid(self) -> Tuple[np.ndarray, np.ndarray]:
+        """lat, lon coordinates of the full source grid (before window)"""
+        if "_source_grid" in self.__dict__:
+            return self.__dict__["_source_grid"]
+        return self.original.lat.values, self.original.lon.values
+
+    def window(self, *, minx: float, miny: float, maxx: float, maxy: float) -> None:
+        """restrict the source data to a box before conversion and mask building
+
+        Cells with centers inside the box padded by one cell are kept, so clipping
+        with the same box afterwards (clip_mask_box, clip_mask) gives the result of
+        clipping the full grid.
+        """
+        if self.original is None:
+            raise NotImplementedError("This is invalid!")
+        soil = self.original
+        self.__dict__.setdefault("_source_grid", (soil.lat.values, soil.lon.values))
+
+        index = {}
+        for dim, lo, hi in [("lat", miny, maxy), ("lon", minx, maxx)]:
+            coords = soil[dim].values
+            pad = np.abs(np.diff(coords)).max(initial=0)
+            inside = np.flatnonzero((coords >= lo - pad) & (coords <= hi + pad))
+            index[dim] = slice(inside.min(), inside.max() + 1) if len(inside) else []
+        soil = soil.isel(index)
+
+        mask = self.__dict__.get("_layer_mask")
+        self._soil = soil
+        if mask is not None:
+            self._mask = mask.sel(lat=soil.lat, lon=soil.lon)
+
     # TODO: flesh this out in full (with tests)
     def clip_mask(self, geometry: gpd.GeoSeries, *, all_touched: bool = True) -> None:
         """clip mask to target region(s)"""
-        if self.mask is not None:
+        if self._mask is not None:
             self._mask.rio.write_crs("epsg:4326", inplace=True)
             self._mask = self._mask.rio.clip(
                 geometry, all_touched=all_touched, drop=False
@@ -58,11 +179,18 @@ class SoilDataset(ABC):
         else:
             raise NotImplementedError("This is invalid!")
 
+    def clip_mask_cells(self, selected: np.ndarray) -> None:
+        """clip mask to selected cells (boolean array on the grid of the mask)"""
+        if self._mask is not None:
+            self._mask = self._mask.where(selected)
+        else:
+            raise NotImplementedError("This is invalid!")
+
     def clip_mask_box(self, *, minx: int, miny: int, maxx: int, maxy: int) -> None:
         """clip mask to target box"""
-
-        half_res = (self.data.coords["lon"][1] - self.data.coords["lon"][0]) * 0.5
-        if self.mask is not None:
+        if self._mask is not None:
+            lons = self._mask.coords["lon"]
+            half_res = (lons[1] - lons[0]) * 0.5
             self._mask.rio.write_crs("epsg:4326", inplace=True)
             self._mask = self._mask.rio.clip_box(
                 minx=minx,
@@ -76,33 +204,110 @@ class SoilDataset(ABC):
     @property
     def mask(self) -> Union[xr.DataArray, None]:
         """return binary mask"""
+        return self._memoized("mask", self._binary_mask)
+
+    def _binary_mask(self) -> Union[xr.DataArray, None]:
         return (
             xr.ones_like(self._mask).where(self._mask >= 1)
             if self._mask is not None
             else None
         )
 
+    @property
+    def number_of_sites(self) -> int:
+        """return number of cells in mask"""
+        return self._memoized("number_of_sites", lambda: int(self.mask.sum()))
+
     @property
     def mask_3d(self) -> xr.DataArray:
         """return 3d mask to clip soildata"""
-        lev_max_idx = self.layer_mask.max(skipna=True).astype(int).item()
-        mask = (self.layer_mask.values >= np.arange(lev_max_idx)[:, None, None]).astype(
-            int
-        )
+        return self._memoized("mask_3d", self._build_mask_3d)
 
-        for v in self.original.data_vars:
-            if len(self.original[v].squeeze(drop=True).shape) == 3:
+    def _build_mask_3d(self) -> xr.DataArray:
+        return self._region_mask_3d(self.original, self.layer_mask)
+
+    @staticmethod
+    def _region_mask_3d(original: xr.Dataset, layer_mask: xr.DataArray) -> xr.DataArray:
+        """3d mask of the region of layer_mask (levels of the 3d vars of original)"""
+        for v in original.data_vars:
+            # (singleton dimensions other than lat/ lon, i.e. time, do not count)
+            da = original[v]
+            single = [
+                d for d in da.dims if da.sizes[d] == 1 and d not in ("lat", "lon")
+            ]
+            da = da.squeeze(single, drop=True)
+            if da.ndim == 3:
                 break
         else:
             raise ValueError("A 3d data_var is required")
 
+        # (all levels of the data, also for windows without (deep) valid cells)
+        lev = next(d for d in da.dims if d not in ("lat", "lon"))
+        mask = layer_mask.values >= np.arange(da.sizes[lev])[:, None, None]
+
         # subset to target region
-        mask_3d = xr.ones_like(
-            self.original[v].sel(lat=self.layer_mask.lat, lon=self.layer_mask.lon)
+        return xr.ones_like(
+            original[v].sel(lat=layer_mask.lat, lon=layer_mask.lon)
+        ).where(mask)
+
+    @property
+    def profiles(self) -> ProfileStore:
+        """valid layers of the valid cells of data (ragged)"""
+        return self._memoized("profiles", self._build_profiles)
+
+    def _build_profiles(self) -> ProfileStore:
+        source = self.__dict__.get("_source_profiles")
+        if source is not None:
+            mask = self.layer_mask
+            keep = mask.notnull().transpose("lat", "lon").values
+            return source.subset(mask.lat.values, mask.lon.values, keep)
+        return ProfileStore.from_dataset(self.data, self.mask_3d, zdim=self._zdim)
+
+    def gather(self, jx: np.ndarray, ix: np.ndarray) -> SiteArrays:
+        """layers of the cells (jx, ix) of the layer mask (as profiles.gather)
+
+        Only these cells are converted (as one grid row), unless the profiles of
+        the mask are built already or come from a preprocessed store.
+        """
+        jx, ix = np.asarray(jx, dtype=np.int64), np.asarray(ix, dtype=np.int64)
+        if "profiles" in self.__dict__.get("_derived", {}) or (
+            "_source_profiles" in self.__dict__
+        ):
+            return self.profiles.gather(jx, ix)
+
+        mask = self.layer_mask.transpose("lat", "lon")
+        lats, lons = mask.lat.values[jx], mask.lon.values[ix]
+        cells = {
+            "lat": xr.DataArray(lats, dims="cell"),
+            "lon": xr.DataArray(lons, dims="cell"),
+        }
+
+        def as_row(obj):
+            return (
+                obj.sel(cells)
+                .drop_vars(["lat", "lon"])
+                .rename(cell="lon")
+                .expand_dims(lat=[0.0])
+                .assign_coords(lon=np.arange(len(jx), dtype=float))
+                .transpose(..., "lat", "lon")
+            )
+
+        original, mask = as_row(self.original), as_row(mask)
+        mask_3d = self._region_mask_3d(original, mask)
+        data = self._convert(original, mask, lambda: mask_3d)
+        sites = ProfileStore.from_dataset(data, mask_3d, zdim=self._zdim).gather(
+            np.zeros(len(jx), dtype=np.int64), np.arange(len(jx))
         )
-        mask_3d[:] = mask
-        mask_3d = mask_3d.where(mask_3d == 1)
-        return mask_3d
+        return SiteArrays(jx=jx, ix=ix, lat=lats, lon=lons, layers=sites.layers)
+
+    def use_profiles(self, profiles: ProfileStore, layer_mask: xr.DataArray) -> None:
+        """use preprocessed profiles and layer mask of the full source grid
+
+        Nothing is converted afterwards: profiles of a clipped mask are taken from
+        the given store (data and mask_3d are still built from the source on use).
+        """
+        self.__dict__["_source_profiles"] = profiles
+        self._mask = layer_mask
 
     @property
     def layer_mask(self) -> xr.DataArray:
@@ -114,14 +319,59 @@ class SoilDataset(ABC):
         """return source xarray dataset"""
         return self._soil if self._soil is not None else None
 
+    def _add_hydraulic_properties(self, ds: xr.Dataset) -> None:
+        """add wcmin, wcmax of all cells and layers to converted soil data"""
+        inputs = ["corg", "clay", "sand", "bd"]
+        if not all(v in ds.data_vars for v in inputs):
+            return
+
+        wcmin, wcmax = xr.apply_ufunc(
+            calc_hydraulic_properties_array,
+            *(ds[v] for v in inputs),
+            output_core_dims=[[], []],
+            dask="parallelized",
+            output_dtypes=[float, float],
+        )
+        targets = {t.name: t for t in self._target_attrs}
+        for name, da in [("wcmin", wcmin), ("wcmax", wcmax)]:
+            ds[name] = da.astype(self.dtype, copy=False).assign_attrs(
+                long_name=targets[name].long_name, unit=targets[name].unit
+            )
+
     @property
     def data(self) -> Union[xr.Dataset, None]:
         """return masked xarray soil dataset with ldndc standard variables"""
+        return self._memoized("data", self._build_data)
+
+    def _build_data(self) -> Union[xr.Dataset, None]:
         if self.original is not None:
-            ds = xr.Dataset()
-            for var in self.original.data_vars:
-                da = self._converter()(self.original[var])
-                if da is not None:
-                    ds[da.name] = da * self.mask_3d
-            return ds
+            return self._convert(self.original, self.layer_mask, lambda: self.mask_3d)
         return None
+
+    def _convert(
+        self,
+        original: xr.Dataset,
+        layer_mask: Union[xr.DataArray, None],
+        mask_3d: Callable[[], xr.DataArray],
+    ) -> xr.Dataset:
+        """converted and masked soil data of the region of layer_mask
+
+        mask_3d (the 3d mask of that region) is only built if there is something to
+        convert.
+        """
+        # only convert the region of the (clipped) mask
+        if layer_mask is not None:
+            original = original.sel(lat=layer_mask.lat, lon=layer_mask.lon)
+
+        # all variables converted and masked into one stack (float64 keeps the
+        # values of the element-wise conversion, float32 in compact mode)
+        ds = xr.Dataset()
+        if len(original.data_vars) > 0:
+            plan = self._converter().plan(original.data_vars, dtype=self.dtype)
+            if plan.steps:
+                mask = mask_3d()
+                ds = plan.to_dataset(plan(original, mask), original, mask)
+        self._add_hydraulic_properties(ds)
+        if self.compact:
+            self._pack_integers(ds)
+        return ds
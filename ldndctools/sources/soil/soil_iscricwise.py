@@ -1,6 +1,7 @@
 from itertools import takewhile
 from typing import Dict, Iterable, Optional
 
+import numpy as np
 import xarray as xr
 
 from ldndctools.sources.soil.conversion import Converter
@@ -15,6 +16,13 @@ def count_layers(x):
     return sum([1 for _ in takewhile(lambda a: a >= 0, x)])
 
 
+def _count_leading_valid(values: np.ndarray) -> np.ndarray:
+    """count_layers along the last axis of an array"""
+    with np.errstate(invalid="ignore"):
+        valid = values >= 0
+    return np.logical_and.accumulate(valid, axis=-1).sum(axis=-1)
+
+
 class ISRICWISE_SoilDataset(SoilDataset):
     _source_attrs: Iterable[BaseAttribute] = [
         BaseAttribute(name="DEPTH", unit="cm"),
@@ -40,10 +48,18 @@ class ISRICWISE_SoilDataset(SoilDataset):
         "CFRAG": "scel",
     }
 
-    def __init__(self, soildata: xr.Dataset, *, zdim: Optional[str] = "lev"):
+    def __init__(
+        self,
+        soildata: xr.Dataset,
+        *,
+        zdim: Optional[str] = "lev",
+        compact: bool = False
+    ):
         self._zdim = zdim
+        self.compact = compact
+        if compact:
+            soildata = self._as_float32(soildata)
         self._soil = self._calculate_missing_vars(soildata)
-        self._mask = self._build_mask(self._soil)
 
     def _calculate_missing_vars(self, soildata: xr.Dataset) -> xr.Dataset:
         """calculate missing soil variables (i.e. depth)"""
@@ -55,19 +71,26 @@ class ISRICWISE_SoilDataset(SoilDataset):
         return soildata
 
     def _build_mask(self, soildata: xr.Dataset) -> xr.DataArray:
-        """build a mask based on missing soil attributes"""
+        """build a mask based on missing soil attributes
+
+        count_layers of all cells as array operations: a cumulative product (and)
+        of the valid (>= 0) flags along zdim counts the leading valid layers; the
+        mask holds the minimum over the check variables (NaN if it is 0). Lazy
+        (dask) sources are counted chunk-wise, the (2d) mask itself is computed.
+        """
         check_vars = ["PHAQ", "BULK", "CLPC", "DEPTH"]
 
-        ds_mask = xr.Dataset()
+        counts = None
         for v in [cv for cv in soildata.data_vars if cv in check_vars]:
-            ds_mask[v] = xr.apply_ufunc(
-                count_layers,
+            n = xr.apply_ufunc(
+                _count_leading_valid,
                 soildata[v],
                 input_core_dims=[[self._zdim]],
-                vectorize=True,
+                dask="parallelized",
+                output_dtypes=[np.int64],
             )
-            ds_mask[v] = ds_mask[v].where(ds_mask[v] > 0)
-        return ds_mask.to_array(dim="v", name="mask").min(dim="v", skipna=False)
+            counts = n if counts is None else np.minimum(counts, n)
+        return counts.where(counts > 0).rename("mask").compute()
 
     def _converter(self) -> Converter:
         return Converter(
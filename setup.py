@@ -61,6 +61,7 @@ setup(
             "dlsc=ldndctools.dlsc:main",
             "cdgen=ldndctools.cdgen:main",
             "nlcc_split4db=ldndctools.nlcc_split4db:main",
+            "soilzarr=ldndctools.soilzarr:main",
         ]
     },
     dependency_links=dependency_links,
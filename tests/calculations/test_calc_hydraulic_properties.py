@@ -1,9 +1,19 @@
+import numpy as np
 import pytest
+import xarray as xr
 
-from ldndctools.misc.calculations import calc_hydraulic_properties
+from ldndctools.misc.calculations import (
+    calc_hydraulic_properties,
+    calc_hydraulic_properties_array,
+    calc_hydraulic_properties_table,
+)
 from ldndctools.misc.errors import ParameterMissingError
+from ldndctools.misc.layertable import LayerTable
 from ldndctools.misc.types import LayerData
 
+# corg, clay, sand, bd
+_ranges = [(0.001, 0.5), (0.0, 0.4), (0.0, 0.55), (0.3, 2.65)]
+
 
 def test_basic_computation():
     ld = LayerData(sand=0.1, clay=0.3, corg=0.05, bd=1.2)
@@ -25,3 +35,84 @@ def test_raise_for_bad_wcmin_wcmax():
     ld = LayerData(sand=0.1, clay=0.3, corg=1.0, bd=1.2)
     with pytest.raises(ValueError):
         calc_hydraulic_properties(ld)
+
+
+def test_table_computation_matches_layers():
+    layers = [
+        LayerData(sand=0.1, clay=0.3, corg=0.05, bd=1.2),
+        LayerData(sand=0.6, clay=0.05, corg=0.01, bd=1.5),
+        LayerData(sand=0.1, clay=0.3, corg=1.0, bd=1.2),
+    ]
+    table = calc_hydraulic_properties_table(LayerTable.from_layerdata([layers]))
+    for ld, result in zip(layers, table.layerdata(0)):
+        ld = calc_hydraulic_properties(ld)
+        assert (result.wcmin, result.wcmax) == (ld.wcmin, ld.wcmax)
+
+
+def test_table_missing_parameter_per_layer():
+    layers = [
+        LayerData(sand=0.1, clay=0.3, corg=0.05, bd=1.2),
+        LayerData(sand=0.1, clay=0.3, corg=0.05),
+    ]
+    table = calc_hydraulic_properties_table(LayerTable.from_layerdata([layers]))
+    assert table.column("wcmin")[0] == pytest.approx(295.35934)
+    assert np.isnan(table.column("wcmin")[1]) and np.isnan(table.column("wcmax")[1])
+
+
+def test_fixed_wcmin_is_logged(caplog):
+    layers = [
+        LayerData(sand=0.1, clay=0.3, corg=0.05, bd=1.2),
+        LayerData(sand=0.1, clay=0.3, corg=1.0, bd=1.2),
+    ]
+    table = calc_hydraulic_properties_table(LayerTable.from_layerdata([layers]))
+    assert np.isnan(table.column("wcmin")[1])
+    assert "Field capacity < wilting point (1 layers)" in caplog.text
+
+
+def test_scalar_computation_matches_array():
+    rng = np.random.default_rng(4)
+    corg, clay, sand, bd = (rng.uniform(lo, hi, 200) for lo, hi in _ranges)
+    wcmin, wcmax = calc_hydraulic_properties_array(corg, clay, sand, bd)
+    assert np.isnan(wcmin).any() and not np.isnan(wcmin).all()
+    for k in range(200):
+        ld = LayerData(corg=corg[k], clay=clay[k], sand=sand[k], bd=bd[k])
+        ld = calc_hydraulic_properties(ld)
+        assert ld.wcmax == wcmax[k]
+        assert ld.wcmin == (None if np.isnan(wcmin[k]) else wcmin[k])
+
+
+def test_array_computation_missing_values():
+    wcmin, wcmax = calc_hydraulic_properties_array(
+        np.array([0.05, np.nan]), 0.3, 0.1, np.array([1.2, 1.2])
+    )
+    assert wcmin[0] == pytest.approx(295.35934)
+    assert np.isnan(wcmin[1]) and np.isnan(wcmax[1])
+
+
+def test_soil_dataset_has_hydraulic_properties(isricwise_ds):
+    data = isricwise_ds.data
+    wcmin, wcmax = calc_hydraulic_properties_array(
+        data.corg.values, data.clay.values, data.sand.values, data.bd.values
+    )
+    np.testing.assert_array_equal(data.wcmin.values, wcmin)
+    np.testing.assert_array_equal(data.wcmax.values, wcmax)
+
+
+def test_negative_values_are_dropped_on_both_paths(isricwise_ds, caplog):
+    """tables and converted soil data null the same negative wcmin/ wcmax"""
+    # corg, clay, sand, bd (the first layer yields a negative wilting point)
+    cells = np.array([[-0.05, 0.0, 0.5, 2.6], [0.05, 0.3, 0.1, 1.2]])
+    layers = [
+        LayerData.construct(corg=c, clay=cl, sand=s, bd=b) for c, cl, s, b in cells
+    ]
+    table = calc_hydraulic_properties_table(LayerTable.from_layerdata([layers]))
+
+    ds = xr.Dataset(
+        {v: ("lev", cells[:, k]) for k, v in enumerate(["corg", "clay", "sand", "bd"])}
+    )
+    isricwise_ds._add_hydraulic_properties(ds)
+
+    for v in ["wcmin", "wcmax"]:
+        np.testing.assert_allclose(ds[v].values, table.column(v), rtol=1e-6)
+    assert np.isnan(table.column("wcmin")[0]) and table.column("wcmax")[0] > 0
+    assert caplog.text.count("Negative wcmin/ wcmax (1 layers)") == 2
@@ -0,0 +1,15 @@
+import pytest
+
+from ldndctools.cli.cli import cli
+
+
+@pytest.mark.parametrize(
+    "option", [["-i"], ["--bbox", "5,45,15,55"], ["--region", "DE"]]
+)
+def test_cli_rejects_ids_with_region_selection(option):
+    with pytest.raises(SystemExit):
+        cli(["--ids", "ids.txt", *option])
+
+
+def test_cli_ids():
+    assert cli(["--ids", "ids.txt"]).ids == "ids.txt"
@@ -0,0 +1,33 @@
+import pytest
+
+from ldndctools.cli.selector import CoordinateSelection, IdSelection
+
+
+def test_id_selection_reads_cdgen_ids_file(tmp_path):
+    ids_file = tmp_path / "ids.txt"
+    ids_file.write_text("872670179 873021899\n\n873373619\n")
+    assert IdSelection(ids_file).ids == [872670179, 873021899, 873373619]
+
+
+def test_coordinate_selection_reads_points_file(tmp_path):
+    points_file = tmp_path / "points.txt"
+    points_file.write_text("ID lat lon\n7 50.25 11.25\n9  48.75\t8.25\n")
+    selector = CoordinateSelection(points_file)
+    assert list(selector.ids) == [7, 9]
+    assert selector.selected == {7: (11.25, 50.25), 9: (8.25, 48.75)}
+
+
+@pytest.mark.parametrize("ids", ["a1 b2", "7 9.5"])
+def test_coordinate_selection_rejects_non_integer_ids(tmp_path, ids):
+    points_file = tmp_path / "points.txt"
+    first, second = ids.split()
+    points_file.write_text(f"ID lat lon\n{first} 50.25 11.25\n{second} 48.75 8.25\n")
+    with pytest.raises(ValueError, match="must be integers"):
+        CoordinateSelection(points_file)
+
+
+def test_id_selection_rejects_non_integer_ids(tmp_path):
+    ids_file = tmp_path / "ids.txt"
+    ids_file.write_text("872670179 site2\n")
+    with pytest.raises(ValueError, match="'site2'"):
+        IdSelection(ids_file)
@@ -8,6 +8,19 @@ from ldndctools.sources.soil.soil_iscricwise import ISRICWISE_SoilDataset
 from ldndctools.sources.soil.types import BaseAttribute, FullAttribute
 
 
+@pytest.fixture(scope="session", autouse=True)
+def cache_dir(tmp_path_factory):
+    """keep cached files (i.e. geohash id grids) out of the user cache"""
+    path = tmp_path_factory.mktemp("cache")
+    previous = os.environ.get("LDNDCTOOLS_CACHE")
+    os.environ["LDNDCTOOLS_CACHE"] = str(path)
+    yield path
+    if previous is None:
+        del os.environ["LDNDCTOOLS_CACHE"]
+    else:
+        os.environ["LDNDCTOOLS_CACHE"] = previous
+
+
 @pytest.fixture()
 def source_attribs():
     return [
@@ -0,0 +1,138 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from importlib import resources
+from pathlib import Path
+
+import intake
+import pytest
+import xarray as xr
+
+from ldndctools.io.blockcache import open_blocks, open_source, remote_url
+from ldndctools.sources.soil.soil_iscricwise import ISRICWISE_SoilDataset
+
+pytest.importorskip("h5netcdf")
+pytest.importorskip("h5py")
+
+SOURCE = Path(__file__).parent.parent / "data" / "ISRICWISE_DE_LR.nc"
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    """serves the files of the server (with range requests), counts sent bytes"""
+
+    def do_HEAD(self):
+        self._respond(body=False)
+
+    def do_GET(self):
+        self._respond(body=True)
+
+    def _respond(self, body: bool):
+        data = self.server.files.get(self.path)
+        if data is None:
+            self.send_error(404)
+            return
+
+        status, start, stop = 200, 0, len(data)
+        if "Range" in self.headers:
+            first, last = self.headers["Range"].split("=")[1].split("-")
+            status, start = 206, int(first)
+            stop = min(int(last) + 1, len(data)) if last else len(data)
+
+        self.send_response(status)
+        self.send_header("Content-Length", str(stop - start))
+        self.send_header("Accept-Ranges", "bytes")
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{stop - 1}/{len(data)}")
+        self.end_headers()
+        if body:
+            self.wfile.write(data[start:stop])
+            self.server.sent += stop - start
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server(tmp_path):
+    # an uncompressed copy of the test data (variables stored one after another)
+    path = tmp_path / "soil.nc"
+    ds = xr.open_dataset(SOURCE).load()
+    for var in ds.variables.values():
+        var.encoding = {k: v for k, v in var.encoding.items() if k == "_FillValue"}
+    ds.to_netcdf(path, engine="h5netcdf")
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), RangeHandler)
+    httpd.files, httpd.sent = {"/soil.nc": path.read_bytes()}, 0
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    httpd.url = f"http://127.0.0.1:{httpd.server_port}/soil.nc"
+    yield httpd
+    httpd.shutdown()
+
+
+def test_open_blocks_reads_part_of_file(server, tmp_path):
+    size = len(server.files["/soil.nc"])
+    f = open_blocks(server.url, block_size=2**12, directory=tmp_path / "blocks")
+    ds = xr.open_dataset(f, engine="h5netcdf")
+    bulk = ds["BULK"].isel(lat=slice(0, 4)).load()
+
+    xr.testing.assert_identical(
+        bulk, xr.open_dataset(SOURCE)["BULK"].isel(lat=slice(0, 4)).load()
+    )
+    # (the metadata of all variables is read on open)
+    assert 0 < server.sent < size / 2
+
+    # the blocks are cached on disk, a new file object does not fetch them again
+    sent = server.sent
+    f = open_blocks(server.url, block_size=2**12, directory=tmp_path / "blocks")
+    xr.open_dataset(f, engine="h5netcdf")["BULK"].isel(lat=slice(0, 4)).load()
+    assert server.sent == sent
+
+
+def test_open_blocks_cache_is_bounded(server, tmp_path):
+    directory = tmp_path / "blocks"
+    max_bytes = 2**16
+    f = open_blocks(
+        server.url, block_size=2**13, max_bytes=max_bytes, directory=directory
+    )
+    xr.testing.assert_identical(
+        xr.open_dataset(f, engine="h5netcdf").load(), xr.open_dataset(SOURCE).load()
+    )
+    assert server.sent >= len(server.files["/soil.nc"])
+    cached = sum(p.stat().st_size for p in directory.glob("*/*.blk"))
+    assert 0 < cached <= max_bytes
+
+
+def test_open_source_window(server, tmp_path):
+    source = intake.open_netcdf(server.url, chunks={})
+    soil = ISRICWISE_SoilDataset(
+        open_source(source, block_size=2**12, directory=tmp_path / "blocks")
+    )
+    expected = ISRICWISE_SoilDataset(xr.open_dataset(SOURCE))
+    for s in (soil, expected):
+        s.window(minx=6, miny=47, maxx=8, maxy=48.5)
+
+    xr.testing.assert_identical(soil.data.compute(), expected.data)
+    assert server.sent < len(server.files["/soil.nc"])
+
+
+def test_remote_url():
+    options = {"s3": {"anon": True}, "simplecache": {"cache_storage": ".cache"}}
+    assert remote_url("simplecache::s3://bucket/soil.nc", options) == (
+        "s3://bucket/soil.nc",
+        {"anon": True},
+    )
+    assert remote_url("https://host/soil.nc", {"a": 1}) == (
+        "https://host/soil.nc",
+        {"a": 1},
+    )
+
+
+def test_remote_url_of_catalog_sources():
+    with resources.path("data", "catalog.yml") as cat:
+        catalog = intake.open_catalog(str(cat))
+    for name in ["soil", "elevation"]:
+        source = catalog[name](res="LR")
+        urlpath, options = remote_url(source.urlpath, source.storage_options)
+        assert urlpath == source.urlpath.replace("simplecache::", "")
+        assert urlpath.startswith("s3://ldndcdata/")
+        assert options["anon"] is True
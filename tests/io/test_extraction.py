@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from ldndctools.io.extraction import cells_from_coords, cells_from_ids
+from ldndctools.misc.geohash import coords2geohash_dec
+
+
+@pytest.fixture
+def soildata(isricwise_ds):
+    return isricwise_ds.data
+
+
+def test_cells_from_ids(soildata):
+    lats, lons = soildata.lat.values, soildata.lon.values
+    ids = [
+        coords2geohash_dec(lat=lats[j].item(), lon=lons[i].item())
+        for j, i in [(5, 3), (0, 21), (5, 1)]
+    ]
+    jx, ix = cells_from_ids(ids + [ids[0], 0, 123456789], lats, lons)
+    assert list(zip(jx, ix)) == [(0, 21), (5, 1), (5, 3)]
+
+
+def test_cells_from_coords(soildata):
+    lats, lons = soildata.lat.values, soildata.lon.values
+    step = lats[1] - lats[0]
+    points = np.array(
+        [
+            (lats[5] + 0.3 * step, lons[3]),
+            (lats[0], lons[21]),
+            (lats[5] - 0.3 * step, lons[3]),  # same cell as the first point
+            (lats[0] - 5 * step, lons[0]),  # outside the grid
+            (lats[5], lons[1]),
+        ]
+    )
+    jx, ix, kept = cells_from_coords(points[:, 0], points[:, 1], lats, lons)
+    assert list(zip(jx, ix)) == [(0, 21), (5, 1), (5, 3)]
+    assert list(kept) == [1, 4, 0]
+
+
+def test_cells_from_ids_empty_grid():
+    jx, ix = cells_from_ids([872670179, 1], np.array([]), np.array([]))
+    assert len(jx) == len(ix) == 0
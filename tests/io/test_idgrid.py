@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from ldndctools.io.idgrid import GeohashGrid
+from ldndctools.misc.geohash import coords2geohash_dec
+
+
+@pytest.fixture
+def grid():
+    return np.arange(47.25, 55, 0.5), np.arange(5.25, 15.5, 0.5)
+
+
+def test_geohash_grid_ids(grid, tmp_path):
+    lats, lons = grid
+    ids = GeohashGrid(lats, lons, directory=tmp_path).ids
+    assert ids.shape == (len(lats), len(lons))
+    assert ids[3, 7] == coords2geohash_dec(lat=lats[3], lon=lons[7])
+
+
+def test_geohash_grid_is_cached_and_memory_mapped(grid, tmp_path):
+    first = GeohashGrid(*grid, name="LR", directory=tmp_path)
+    assert first.path.is_file() and first.path.name.startswith("geohash_LR_")
+
+    second = GeohashGrid(*grid, name="LR", directory=tmp_path)
+    assert isinstance(second.ids, np.memmap)
+    assert second.path == first.path
+    np.testing.assert_array_equal(second.ids, first.ids)
+
+
+def test_geohash_grid_rebuilds_mismatching_cache(grid, tmp_path):
+    lats, lons = grid
+    cached = GeohashGrid(lats, lons, directory=tmp_path)
+    np.savez(cached.coords_path, lat=lats + 0.1, lon=lons, pre=6)
+    np.save(cached.path, np.zeros((len(lats), len(lons)), dtype=np.int64))
+
+    ids = GeohashGrid(lats, lons, directory=tmp_path).ids
+    assert ids[0, 0] == coords2geohash_dec(lat=lats[0], lon=lons[0])
+
+
+def test_geohash_grid_subgrid(grid, tmp_path):
+    lats, lons = grid
+    ids = GeohashGrid(lats, lons, directory=tmp_path)
+
+    sub = ids.subgrid(lats[2:5], lons[4:10])
+    np.testing.assert_array_equal(sub, ids.ids[2:5, 4:10])
+
+    # coordinates that are not part of the grid are computed
+    sub = ids.subgrid(lats[2:5] + 0.01, lons[4:10])
+    assert sub[0, 0] == coords2geohash_dec(lat=lats[2] + 0.01, lon=lons[4])
+
+
+def test_geohash_grid_without_cache_dir(grid, tmp_path):
+    blocked = tmp_path / "file"
+    blocked.write_text("not a directory")
+    ids = GeohashGrid(*grid, directory=blocked).ids
+    assert not isinstance(ids, np.memmap)
+    assert ids.shape == (len(grid[0]), len(grid[1]))
@@ -0,0 +1,51 @@
+import numpy as np
+
+from ldndctools.io.layercache import LayerCache
+
+
+def test_key_depends_on_values_and_settings():
+    a = {"depth": np.array([200.0, 300.0]), "ph": np.array([6.1, np.nan])}
+    b = {"depth": np.array([200.0, 300.0]), "ph": np.array([6.1, np.nan])}
+    c = {"depth": np.array([200.0, 300.0]), "ph": np.array([6.2, np.nan])}
+    assert LayerCache.key(a, True) == LayerCache.key(b, True)
+    assert LayerCache.key(a, True) != LayerCache.key(c, True)
+    assert LayerCache.key(a, True) != LayerCache.key(a, False)
+
+
+def test_keys_of_many_profiles():
+    values = {
+        "depth": np.array([[200.0, 300.0], [200.0, 300.0], [200.0, np.nan]]),
+        "ph": np.array([[6.1, np.nan], [6.1, np.nan], [6.1, np.nan]]),
+    }
+    keys = LayerCache.keys(values, True)
+    assert keys[0] == keys[1] != keys[2]
+    assert keys[0] == LayerCache.key({k: v[0] for k, v in values.items()}, True)
+
+
+def test_get_or_create_many_counts_hits_and_misses():
+    cache = LayerCache(maxsize=10)
+    calls = []
+
+    def create(positions):
+        calls.append(positions)
+        return [f"x{n}" for n in positions]
+
+    assert cache.get_or_create_many([b"a", b"b", b"a"], create) == ["x0", "x1", "x0"]
+    assert cache.get_or_create_many([b"b", b"c"], create) == ["x1", "x1"]
+    assert calls == [[0, 1], [1]]
+    assert cache.stats == dict(hits=2, misses=3)
+
+
+def test_lru_eviction():
+    cache = LayerCache(maxsize=2)
+    for keys in [[b"a", b"b"], [b"a"], [b"c"]]:
+        cache.get_or_create_many(keys, lambda pos: [keys[n][0] for n in pos])
+    assert len(cache) == 2
+    values = cache.get_or_create_many([b"a", b"b"], lambda pos: [None] * len(pos))
+    assert values == [ord("a"), None]
+
+
+def test_created_values_are_reused_beyond_maxsize():
+    cache = LayerCache(maxsize=1)
+    keys = [b"a", b"b", b"a"]
+    assert cache.get_or_create_many(keys, lambda pos: pos) == [0, 1, 0]
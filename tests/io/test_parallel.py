@@ -0,0 +1,34 @@
+import numpy as np
+
+from ldndctools.io.parallel import map_blocks, row_blocks, SharedArrays
+
+
+def block_sum(arrays, start, stop, *, scale=1):
+    return arrays["x"][start:stop].sum() * scale
+
+
+def test_row_blocks_cover_all_cells_at_row_boundaries():
+    jx = np.array([0, 0, 1, 1, 1, 3, 4, 4, 7])
+    blocks = row_blocks(jx, 3)
+    assert blocks[0][0] == 0 and blocks[-1][1] == len(jx)
+    assert all(a[1] == b[0] for a, b in zip(blocks[:-1], blocks[1:]))
+    assert all(jx[start] != jx[start - 1] for start, _ in blocks[1:])
+
+
+def test_row_blocks_more_blocks_than_rows():
+    assert row_blocks(np.array([2, 2, 5]), 10) == [(0, 2), (2, 3)]
+    assert row_blocks(np.array([], dtype=int), 4) == []
+
+
+def test_shared_arrays_roundtrip():
+    x = np.arange(12, dtype="float32").reshape(3, 4)
+    with SharedArrays({"x": x}) as shared:
+        name, shape, dtype = shared.spec["x"]
+        assert shape == (3, 4) and np.dtype(dtype) == x.dtype
+
+
+def test_map_blocks_keeps_block_order():
+    x = np.arange(100)
+    blocks = [(0, 10), (10, 55), (55, 56), (56, 100)]
+    results = list(map_blocks(block_sum, {"x": x}, blocks, workers=2, scale=2))
+    assert results == [(x[a:b].sum() * 2, b - a) for a, b in blocks]
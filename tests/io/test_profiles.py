@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+import xarray as xr
+
+from ldndctools.io.profiles import ProfileStore
+from ldndctools.sources.soil.soil_iscricwise import ISRICWISE_SoilDataset
+
+
+def assert_same_sites(a, b):
+    np.testing.assert_array_equal(a.jx, b.jx)
+    np.testing.assert_array_equal(a.ix, b.ix)
+    np.testing.assert_array_equal(a.lat, b.lat)
+    assert a.layers.keys() == b.layers.keys()
+    for var in a.layers:
+        assert a.layers[var].dtype == b.layers[var].dtype
+        np.testing.assert_array_equal(a.layers[var], b.layers[var])
+
+
+def test_profile_store_holds_valid_layers_only(isricwise_ds):
+    store = isricwise_ds.profiles
+    valid = isricwise_ds.mask_3d.notnull()
+    assert store.nlayers == valid.sum().item()
+    assert len(store) == isricwise_ds.number_of_sites
+    assert not np.isnan(store.layers["depth"]).all()
+    assert store.offsets[-1] == store.nlayers
+
+
+def point_values(data, jx, ix):
+    """layer values (cells, levels) of the cells (jx, ix) of the converted data"""
+    points = data.isel(
+        lat=xr.DataArray(jx, dims="site"), lon=xr.DataArray(ix, dims="site")
+    )
+    return {v: points[v].transpose("site", "lev").values for v in data.data_vars}
+
+
+def test_profile_store_gather_all(isricwise_ds):
+    data = isricwise_ds.data
+    cells = isricwise_ds.profiles.gather()
+    assert len(cells) == data["depth"].isel(lev=0).notnull().sum().item()
+    assert set(cells.layers) == set(data.data_vars)
+
+    # row-major order
+    assert np.all(np.diff(cells.jx * data.sizes["lon"] + cells.ix) > 0)
+    np.testing.assert_array_equal(cells.lat, data.lat.values[cells.jx])
+    np.testing.assert_array_equal(cells.lon, data.lon.values[cells.ix])
+    for var, values in point_values(data, cells.jx, cells.ix).items():
+        assert cells.layers[var].dtype == values.dtype
+        np.testing.assert_array_equal(cells.layers[var], values)
+
+
+def test_profile_store_gather_cells(isricwise_ds):
+    # valid, masked and repeated cells in arbitrary order
+    jx = np.array([5, 0, 3, 3, 15, 7])
+    ix = np.array([2, 0, 10, 10, 21, 8])
+    cells = isricwise_ds.profiles.gather(jx, ix)
+    np.testing.assert_array_equal(cells.jx, jx)
+    np.testing.assert_array_equal(cells.lat, isricwise_ds.data.lat.values[jx])
+    for var, values in point_values(isricwise_ds.data, jx, ix).items():
+        np.testing.assert_array_equal(cells.layers[var], values)
+
+
+def test_profile_store_compact(isricwise_ds):
+    soil = ISRICWISE_SoilDataset(isricwise_ds.original.copy(), compact=True)
+    store = soil.profiles
+    assert store.layers["depth"].dtype == np.int16
+    assert store.fill_values == {"depth": soil.FILL_VALUE}
+
+    # integer variables are decoded (NaN for missing layers) when gathered
+    cells, expected = store.gather(), isricwise_ds.profiles.gather()
+    np.testing.assert_array_equal(cells.jx, expected.jx)
+    for var, values in expected.layers.items():
+        assert cells.layers[var].dtype == np.float32
+        np.testing.assert_allclose(cells.layers[var], values, rtol=1e-6)
+
+
+@pytest.mark.parametrize("mmap", [True, False])
+def test_profile_store_save_load(isricwise_ds, tmp_path, mmap):
+    store = isricwise_ds.profiles
+    store.save(tmp_path / "profiles")
+    # saving again replaces the store
+    store.save(tmp_path / "profiles")
+
+    loaded = ProfileStore.load(tmp_path / "profiles", mmap=mmap)
+    assert isinstance(loaded.layers["depth"], np.memmap) == mmap
+    assert loaded.nlev == store.nlev
+    assert_same_sites(loaded.gather(), store.gather())
+
+
+def test_profile_store_subset(isricwise_ds):
+    store = isricwise_ds.profiles
+    lat, lon = store.lat[3:12], store.lon[4:20]
+    keep = np.zeros((len(lat), len(lon)), dtype=bool)
+    keep[2:7, 3:15] = True
+
+    part = store.subset(lat, lon, keep)
+    jx, ix = np.nonzero(keep)
+    sites, expected = part.gather(jx, ix), store.gather(jx + 3, ix + 4)
+    np.testing.assert_array_equal(sites.lon, expected.lon)
+    for var in store.layers:
+        np.testing.assert_array_equal(sites.layers[var], expected.layers[var])
+    assert len(part) == len(store.subset(lat, lon).subset(lat, lon, keep))
+
+    with pytest.raises(ValueError):
+        store.subset(lat + 0.1, lon)
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+import xarray as xr
+
+from ldndctools.io.regiongrid import RegionGrid
+
+
+@pytest.fixture
+def grid():
+    return np.arange(45.25, 56, 0.5), np.arange(2.25, 17, 0.5)
+
+
+def clip_mask(country_gdf, codes, lats, lons):
+    """mask of rio.clip (all_touched) with the dissolved regions"""
+    da = xr.DataArray(
+        np.ones((len(lats), len(lons))),
+        coords={"lat": lats, "lon": lons},
+        dims=("lat", "lon"),
+    )
+    da = da.rio.set_spatial_dims(x_dim="lon", y_dim="lat").rio.write_crs("epsg:4326")
+    regions = country_gdf[country_gdf.ADM0_A3.isin(codes)].assign(dummy=0)
+    geometry = regions.dissolve(by="dummy").geometry
+    return da.rio.clip(geometry, all_touched=True, drop=False).notnull().values
+
+
+@pytest.mark.parametrize("codes", [["DEU"], ["DEU", "FRA"], ["AUT", "CHE", "LIE"]])
+def test_region_grid_mask_matches_clip(country_gdf, grid, tmp_path, codes):
+    regions = RegionGrid(country_gdf, *grid, directory=tmp_path)
+    np.testing.assert_array_equal(
+        regions.mask(codes), clip_mask(country_gdf, codes, *grid)
+    )
+
+
+def test_region_grid_shared_cells(country_gdf, grid, tmp_path):
+    regions = RegionGrid(country_gdf, *grid, directory=tmp_path)
+    assert regions.codes == sorted(country_gdf.ADM0_A3)
+    # border cells are touched by several countries
+    assert len(regions.shared_cells) > 0
+    deu, fra = regions.mask(["DEU"]), regions.mask(["FRA"])
+    assert np.any(deu & fra)
+    np.testing.assert_array_equal(regions.mask(["DEU", "FRA"]), deu | fra)
+    assert not regions.mask(["XXX"]).any()
+
+
+def test_region_grid_is_cached_and_memory_mapped(country_gdf, grid, tmp_path):
+    first = RegionGrid(country_gdf, *grid, name="LR", directory=tmp_path)
+    assert first.path.is_file() and first.path.name.startswith("regions_LR_")
+
+    second = RegionGrid(country_gdf, *grid, name="LR", directory=tmp_path)
+    assert isinstance(second.ids, np.memmap)
+    np.testing.assert_array_equal(second.ids, first.ids)
+    np.testing.assert_array_equal(second.shared_cells, first.shared_cells)
+
+    # other geometries are a different cache entry
+    other = RegionGrid(country_gdf[country_gdf.ADM0_A3 != "DEU"], *grid)
+    assert other.path != first.path
+
+
+def test_region_grid_subgrid_mask(country_gdf, grid, tmp_path):
+    lats, lons = grid
+    regions = RegionGrid(country_gdf, lats, lons, directory=tmp_path)
+    mask = regions.mask(["DEU"], lats[2:9], lons[5:20])
+    np.testing.assert_array_equal(mask, regions.mask(["DEU"])[2:9, 5:20])
+
+    with pytest.raises(ValueError):
+        regions.mask(["DEU"], lats[2:9] + 0.1, lons)
@@ -0,0 +1,88 @@
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pytest
+import xarray as xr
+
+from ldndctools.io.soilcache import file_checksum, SoilCache
+from ldndctools.io.xmlwriter import SiteXmlWriter
+from ldndctools.misc.types import RES
+from ldndctools.sources.soil.soil_iscricwise import ISRICWISE_SoilDataset
+
+DATA = Path(__file__).parent.parent / "data"
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "ISRICWISE_DE_LR.nc"
+    shutil.copy(DATA / "ISRICWISE_DE_LR.nc", path)
+    return path
+
+
+def open_soil(path, **kwargs):
+    return ISRICWISE_SoilDataset(xr.open_dataset(path, chunks={}), **kwargs)
+
+
+def test_soil_cache_store_and_load(source, tmp_path):
+    cache = SoilCache(source, name="LR", directory=tmp_path / "cache")
+    soil = cache.attach(open_soil(source))
+    assert cache.path(soil).is_dir()
+
+    # a second run uses the memory-mapped entry without building the mask
+    cached = cache.attach(open_soil(source))
+    assert isinstance(cached.profiles.layers["depth"], np.memmap)
+    assert cached.rebuilds["layer_mask"] == 0
+
+    expected = ISRICWISE_SoilDataset(xr.open_dataset(source))
+    xr.testing.assert_identical(cached.layer_mask, expected.layer_mask)
+    assert cached.number_of_sites == expected.number_of_sites
+
+
+def test_soil_cache_write_matches_reference(source, tmp_path):
+    cache = SoilCache(source, directory=tmp_path / "cache")
+    cache.attach(open_soil(source))
+    writer = SiteXmlWriter(cache.attach(open_soil(source)), res=RES.LR)
+    assert writer.write() == (DATA / "ISRICWISE_DE_LR_sites.xml").read_text()
+
+
+@pytest.mark.parametrize(
+    "box",
+    [
+        dict(minx=6, miny=47, maxx=10, maxy=50),
+        dict(minx=7.3, miny=48.2, maxx=9.9, maxy=52.7),
+    ],
+)
+def test_soil_cache_write_clipped(source, tmp_path, box):
+    cache = SoilCache(source, directory=tmp_path / "cache")
+    cache.attach(open_soil(source))
+
+    soil, expected = cache.attach(open_soil(source)), open_soil(source)
+    for s in (soil, expected):
+        s.window(**box)
+        s.clip_mask_box(**box)
+    assert soil.profiles.nlayers < cache.attach(open_soil(source)).profiles.nlayers
+
+    xml = SiteXmlWriter(soil, res=RES.LR).write()
+    assert xml == SiteXmlWriter(expected, res=RES.LR).write()
+
+
+def test_soil_cache_key(source, tmp_path):
+    cache = SoilCache(source, directory=tmp_path / "cache")
+    soil = open_soil(source)
+    assert cache.path(soil) != cache.path(open_soil(source, compact=True))
+
+    # the checksum is memoized, a modified source is a new entry
+    assert SoilCache(source, directory=tmp_path / "cache").checksum == cache.checksum
+    with open(source, "ab") as f:
+        f.write(b"\0")
+    changed = SoilCache(source, directory=tmp_path / "cache")
+    assert changed.checksum == file_checksum(source, tmp_path)
+    assert changed.path(soil) != cache.path(soil)
+
+
+def test_soil_cache_requires_full_grid(source, tmp_path):
+    soil = open_soil(source)
+    soil.window(minx=6, miny=47, maxx=10, maxy=50)
+    with pytest.raises(ValueError):
+        SoilCache(source, directory=tmp_path).store(soil)
@@ -0,0 +1,59 @@
+import xml.dom.minidom as md
+import xml.etree.cElementTree as et
+
+import pytest
+
+from ldndctools.io.xmlserializer import SiteXmlSerializer
+from ldndctools.misc.layertable import LayerTable
+from ldndctools.misc.types import LayerData
+from ldndctools.misc.xmlclasses import SiteXML
+
+
+@pytest.fixture
+def layers():
+    return [
+        LayerData(depth=20, ph=6.14, bd=1.39, clay=0.21, sand=0.52, corg=0.00941),
+        LayerData(depth=180, ph=6.5, bd=1.4, sand=0.3, norg=0.000433, iron=0.01),
+    ]
+
+
+def test_layer_matches_serialize(layers):
+    serializer = SiteXmlSerializer()
+    table = LayerTable.from_layerdata([layers])
+    for ld, row in zip(layers, table.site(0)):
+        attrs = et.fromstring(serializer.layer(serializer.row_values(row))).attrib
+        assert attrs == ld.serialize()
+
+
+def test_site_matches_minidom(layers):
+    site = SiteXML(lat=47.25, lon=11.75, id=1234)
+    for ld in layers:
+        site.xml.find("./soil/layers").append(et.Element("layer", **ld.serialize()))
+    desc = site.xml.find("description")
+    site.xml.remove(desc)
+    xml = et.Element("ldndcsite")
+    xml.append(desc)
+    xml.append(site.xml)
+    expected = md.parseString(et.tostring(xml)).toprettyxml()
+
+    serializer = SiteXmlSerializer()
+    rendered = serializer.site(
+        lat=47.25,
+        lon=11.75,
+        cid=1234,
+        layers=serializer.table_layers(LayerTable.from_layerdata([layers]).site(0)),
+    )
+    document = serializer.document_start + rendered + serializer.document_end
+    assert document == expected
+
+
+def test_compact_site_is_single_line(layers):
+    serializer = SiteXmlSerializer(pretty=False)
+    rendered = serializer.site(
+        lat=1.0,
+        lon=2.0,
+        cid=3,
+        layers=serializer.table_layers(LayerTable.from_layerdata([layers]).site(0)),
+    )
+    assert rendered.count("\n") == 1
+    assert len(et.fromstring(rendered).findall("./soil/layers/layer")) == 2
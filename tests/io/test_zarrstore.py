@@ -0,0 +1,71 @@
+from pathlib import Path
+
+import pytest
+import xarray as xr
+
+from ldndctools.io.soilcache import SoilCache
+from ldndctools.io.xmlwriter import SiteXmlWriter
+from ldndctools.io.zarrstore import convert_to_zarr, open_zarr, soil_zarr_path
+from ldndctools.misc.types import RES
+from ldndctools.sources.soil.soil_iscricwise import ISRICWISE_SoilDataset
+
+SOURCE = Path(__file__).parent.parent / "data" / "ISRICWISE_DE_LR.nc"
+
+
+@pytest.fixture
+def store(tmp_path):
+    ds = xr.open_dataset(SOURCE, chunks={})
+    chunks = {"lat": 4, "lon": 8}
+    return convert_to_zarr(ds, tmp_path / "soil_LR.zarr", chunks=chunks)
+
+
+def test_zarr_store_is_chunked(store):
+    ds = open_zarr(store)
+    assert ds["BULK"].chunks == ((5,), (4, 4, 4, 4), (8, 8, 6))
+    assert ds["SUID"].chunks == ((4, 4, 4, 4), (8, 8, 6))
+    xr.testing.assert_identical(ds.load(), xr.open_dataset(SOURCE).load())
+
+
+def test_zarr_store_chunks_are_capped(tmp_path):
+    ds = xr.open_dataset(SOURCE, chunks={})
+    path = convert_to_zarr(ds, tmp_path / "soil.zarr", attrs={"source_checksum": "x"})
+    converted = open_zarr(path)
+    assert converted["BULK"].chunks == ((5,), (16,), (22,))
+    assert converted.attrs == {"source_checksum": "x"}
+
+    # converting again replaces the store
+    convert_to_zarr(ds, path, chunks={"lat": 8})
+    assert open_zarr(path)["BULK"].chunks == ((5,), (8, 8), (22,))
+
+
+def test_zarr_store_window_reads_intersecting_chunks(store):
+    soil = ISRICWISE_SoilDataset(open_zarr(store))
+    assert soil.original["BULK"].data.npartitions == 12
+
+    # the (padded) window lies within a single chunk
+    soil.window(minx=6, miny=47, maxx=8, maxy=48.5)
+    assert soil.original["BULK"].data.npartitions == 1
+    assert soil.data["bd"].notnull().any()
+
+
+def test_zarr_store_write_matches_reference(store):
+    soil = ISRICWISE_SoilDataset(open_zarr(store))
+    xml = SiteXmlWriter(soil, res=RES.LR).write()
+    assert xml == (SOURCE.parent / "ISRICWISE_DE_LR_sites.xml").read_text()
+
+
+def test_zarr_store_shares_soil_cache_with_source(store, tmp_path):
+    cache = SoilCache(SOURCE, directory=tmp_path / "cache")
+    cache.attach(ISRICWISE_SoilDataset(xr.open_dataset(SOURCE, chunks={})))
+
+    copy = SoilCache(checksum=cache.checksum, directory=tmp_path / "cache")
+    soil = copy.attach(ISRICWISE_SoilDataset(open_zarr(store)))
+    assert soil.rebuilds["layer_mask"] == 0
+
+    with pytest.raises(ValueError):
+        SoilCache()
+
+
+def test_soil_zarr_path(tmp_path):
+    assert soil_zarr_path("HR", tmp_path) == tmp_path / "zarr" / "soil_HR.zarr"
+    assert soil_zarr_path("LR").name == "soil_LR.zarr"
@@ -0,0 +1,49 @@
+import xml.etree.cElementTree as et
+
+import numpy as np
+
+from ldndctools.cli.selector import IdSelection
+from ldndctools.misc.create_data import create_dataset
+from ldndctools.misc.geohash import coords2geohash_dec_array
+from ldndctools.misc.types import RES
+from ldndctools.sources.soil.soil_iscricwise import ISRICWISE_SoilDataset
+
+
+def id_selection(tmp_path, ids):
+    ids_file = tmp_path / "ids.txt"
+    ids_file.write_text(" ".join(str(i) for i in ids))
+    return IdSelection(ids_file)
+
+
+def test_create_dataset_ids_outside_grid(isricwise_ds, tmp_path, caplog):
+    soil = ISRICWISE_SoilDataset(isricwise_ds.original.copy())
+    outside = coords2geohash_dec_array(
+        np.array([0.25, -30.25]), np.array([0.25, 100.25])
+    )
+
+    site_xml, _ = create_dataset(soil, id_selection(tmp_path, outside), RES.LR)
+    assert et.fromstring(site_xml).findall("site") == []
+    assert "2 site ids not found" in caplog.text
+    # no window (the soil grid is kept)
+    assert soil.original.sizes == isricwise_ds.original.sizes
+
+
+def test_create_dataset_ids_window(isricwise_ds, tmp_path):
+    soil = ISRICWISE_SoilDataset(isricwise_ds.original.copy())
+    inside = coords2geohash_dec_array(np.array([47.25]), np.array([5.25]))
+    outside = coords2geohash_dec_array(np.array([0.25]), np.array([0.25]))
+
+    site_xml, _ = create_dataset(
+        soil, id_selection(tmp_path, [*outside, *inside]), RES.LR
+    )
+    sites = et.fromstring(site_xml).findall("site")
+    assert [int(s.get("id")) for s in sites] == list(inside)
+    assert soil.original.sizes["lat"] < isricwise_ds.original.sizes["lat"]
+
+
+def test_window_without_cells(isricwise_ds):
+    soil = ISRICWISE_SoilDataset(isricwise_ds.original.copy())
+    soil.window(minx=100, miny=-10, maxx=101, maxy=-9)
+    assert soil.number_of_sites == 0
+    assert soil.mask_3d.notnull().sum() == 0
+    assert len(soil.profiles) == 0
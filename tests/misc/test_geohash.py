@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from ldndctools.misc.geohash import (
+    coords2geohash_dec,
+    coords2geohash_dec_array,
+    geohash_dec2coords,
+    geohash_dec2coords_array,
+)
+
+
+@pytest.fixture
+def coords():
+    rng = np.random.default_rng(1)
+    lats = np.concatenate([rng.uniform(-90, 90, 500), np.arange(-89.75, 90, 0.5)])
+    lons = np.concatenate([rng.uniform(-180, 180, 500), np.arange(-179.5, 180, 1.0)])
+    # include the borders of the coordinate space
+    return np.append(lats, [-90, 90, 0]), np.append(lons, [-180, 180, 0])
+
+
+@pytest.mark.parametrize("pre", [4, 6, 8])
+def test_coords2geohash_dec_array_matches_scalar(coords, pre):
+    lats, lons = coords
+    expected = [
+        coords2geohash_dec(lat=lat, lon=lon, pre=pre) for lat, lon in zip(lats, lons)
+    ]
+    assert coords2geohash_dec_array(lats, lons, pre=pre).tolist() == expected
+
+
+@pytest.mark.parametrize("pre", [4, 6, 8])
+def test_geohash_dec2coords_array_matches_scalar(pre):
+    ids = np.random.default_rng(2).integers(0, 32**pre, 1000)
+    expected = [geohash_dec2coords(geohash_dec=int(cid), pre=pre) for cid in ids]
+    lats, lons = geohash_dec2coords_array(ids, pre=pre)
+    assert list(zip(lats.tolist(), lons.tolist())) == expected
+
+
+def test_coords2geohash_dec_array_broadcasts():
+    lats, lons = np.array([50.25, 50.75]), np.array([10.25, 10.75, 11.25])
+    ids = coords2geohash_dec_array(lats[:, None], lons[None, :])
+    assert ids.shape == (2, 3)
+    assert ids[1, 2] == coords2geohash_dec(lat=50.75, lon=11.25)
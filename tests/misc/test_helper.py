@@ -71,3 +71,11 @@ def test_prettify():
 """
 
     assert prettify(e) == res
+
+
+def test_mutually_exclusive_ignores_none_values():
+    @mutually_exclusive("arg1", "arg2")
+    def dummy_function(arg1: Optional[str] = None, arg2: Optional[int] = None):
+        return True
+
+    assert dummy_function(arg1="asf123", arg2=None) is True
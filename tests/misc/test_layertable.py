@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from ldndctools.misc.layertable import FIELDS, LayerTable, PRESETS
+from ldndctools.misc.types import LayerData
+
+nan = np.nan
+
+
+@pytest.fixture
+def profiles():
+    """three cells: complete, incomplete second layer (after a gap), empty"""
+    return {
+        "depth": np.array([[50.0, 100.0], [30.0, nan], [nan, nan]]),
+        "ph": np.array([[6.0, 6.5], [7.0, 7.0], [nan, nan]]),
+        "bd": np.array([[1.2, 1.3], [1.4, 1.4], [nan, nan]]),
+        "clay": np.array([[0.2, 0.25], [0.1, 0.1], [nan, nan]]),
+        "sand": np.array([[0.3, nan], [0.5, 0.5], [nan, nan]]),
+    }
+
+
+def test_layer_table_from_profiles(profiles):
+    table = LayerTable.from_profiles(profiles)
+    assert len(table) == 3
+    assert table.counts.tolist() == [1, 1, 0]
+    assert table.column("depth").tolist() == [50.0, 30.0]
+    assert table.column("iron").tolist() == [0.01, 0.01]
+    assert np.isnan(table.column("corg")).all()
+
+
+def test_layer_table_views(profiles):
+    table = LayerTable.from_profiles(profiles)
+    assert table.records.dtype.names == tuple(FIELDS)
+    assert table.records["ph"].tolist() == [6.0, 7.0]
+
+    (ld,) = table.layerdata(1)
+    assert isinstance(ld, LayerData)
+    assert ld.depth == 30 and isinstance(ld.depth, int)
+    assert ld.corg is None
+    assert table.layerdata(2) == []
+
+
+def test_layer_table_from_layerdata():
+    sites = [[LayerData(depth=40, ph=6.0), LayerData(depth=60)], [], [LayerData()]]
+    table = LayerTable.from_layerdata(sites)
+    assert table.counts.tolist() == [2, 0, 1]
+    assert [ld.dict() for ld in table.layerdata(0)] == [ld.dict() for ld in sites[0]]
+
+
+def test_layer_table_extra_split_preset():
+    sites = [
+        [LayerData(depth=40, ph=6.0), LayerData(depth=60)],
+        [],
+        [LayerData(depth=39)],
+        [LayerData(depth=100, ph=5.0)],
+        [LayerData(depth=10), LayerData(depth=50)],
+    ]
+    table = LayerTable.from_layerdata(sites).rediscretize(*PRESETS["extra_split"])
+    assert table.counts.tolist() == [3, 0, 1, 2, 2]
+    assert table.column("depth").tolist() == [20, 20, 60, 39, 20, 80, 10, 50]
+    assert table.column("ph")[4:6].tolist() == [5.0, 5.0]
+
+
+def test_layer_table_rediscretize():
+    sites = [[LayerData(depth=10), LayerData(depth=50)], [LayerData(depth=250)], []]
+    table = LayerTable.from_layerdata(sites).rediscretize(thickness=20, max_depth=100)
+    assert table.counts.tolist() == [3, 6, 0]
+    # the rest of a layer is never thinner than the target thickness
+    assert table.column("depth").tolist() == [10, 20, 30, 20, 20, 20, 20, 20, 150]
+    np.testing.assert_array_equal(
+        np.add.reduceat(table.column("depth"), table.offsets[:2]), [60, 250]
+    )
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from ldndctools.io.xmlwriter import translate_layers
+from ldndctools.misc.types import LayerData
+from ldndctools.misc.validation import validate_layers
+
+
+@pytest.fixture
+def layers():
+    rng = np.random.default_rng(3)
+    shape = (300, 5)
+
+    def values(low, high):
+        v = rng.uniform(low, high, shape)
+        v[rng.random(shape) < 0.1] = np.nan
+        return v
+
+    # ranges exceed the LayerData constraints (and texture sums exceed 1)
+    return {
+        "bd": values(0.0, 3.0),
+        "scel": values(-0.1, 1.1),
+        "clay": values(-0.1, 0.7),
+        "ph": values(2.0, 11.0),
+        "sand": values(0.0, 0.7),
+        "silt": values(0.0, 0.6),
+        "corg": values(-0.01, 0.1),
+        "norg": values(-0.001, 0.01),
+        "depth": values(1.0, 300.0),
+        "topd": values(-2.0, 100.0),
+    }
+
+
+def test_validate_layers_matches_layerdata(layers):
+    valid, _ = validate_layers(layers)
+    for n in range(len(layers["depth"])):
+        expected = translate_layers({k: v[n] for k, v in layers.items()})
+        result = [
+            {k: None if np.isnan(v[n, lev]) else v[n, lev] for k, v in valid.items()}
+            for lev in range(layers["depth"].shape[1])
+            if not np.isnan(layers["depth"][n, lev])
+        ]
+        assert result == [{k: ld.dict()[k] for k in layers} for ld in expected]
+
+
+def test_validate_layers_counts_rejections():
+    layers = {
+        "ph": np.array([[1.0, 7.0, np.nan, 12.0]]),
+        "sand": np.array([[0.5, 0.5, 0.5, 0.5]]),
+        "clay": np.array([[0.6, 0.4, np.nan, -0.1]]),
+    }
+    valid, rejected = validate_layers(layers)
+    assert rejected == {"ph": 2, "sand": 0, "clay": 1, "texture": 1}
+    np.testing.assert_array_equal(valid["ph"], [[np.nan, 7.0, np.nan, np.nan]])
+    # the texture rule rejects the value that exceeds the sum when it is assigned
+    np.testing.assert_array_equal(valid["clay"], [[np.nan, 0.4, np.nan, np.nan]])
+
+
+def test_validate_layers_counts_rejections_per_cell():
+    layers = {
+        "ph": np.array([[1.0, 7.0], [np.nan, 12.0], [7.0, 7.0]]),
+        "sand": np.array([[0.5, 0.5], [0.5, 0.5], [0.5, 0.5]]),
+        "clay": np.array([[0.6, 0.4], [np.nan, -0.1], [0.1, 0.1]]),
+    }
+    _, rejected = validate_layers(layers, per_cell=True)
+    assert {k: v.tolist() for k, v in rejected.items()} == {
+        "ph": [1, 1, 0],
+        "sand": [0, 0, 0],
+        "clay": [0, 1, 0],
+        "texture": [1, 0, 0],
+    }
+
+
+def test_validate_layers_truncates_int_fields():
+    valid, _ = validate_layers({"depth": np.array([200.7, np.nan])})
+    np.testing.assert_array_equal(valid["depth"], [200.0, np.nan])
+    assert LayerData(depth=200.7).depth == valid["depth"][0]
+
+
+def test_validate_layers_rejects_invalid_required_values():
+    with pytest.raises(ValueError):
+        validate_layers({"depth": np.array([200.0, -5.0])})
+    with pytest.raises(ValueError):
+        validate_layers({"unknown": np.array([1.0])})
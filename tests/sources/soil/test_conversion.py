@@ -1,7 +1,8 @@
+import numpy as np
 import pytest
 from xarray.testing import assert_equal
 
-from ldndctools.sources.soil.conversion import convert_unit, Converter
+from ldndctools.sources.soil.conversion import _compile_plan, convert_unit, Converter
 
 
 @pytest.fixture()
@@ -55,3 +56,41 @@ class TestConverter:
 
         # da = converter(isricwise_ds.original["BULK"])
         # assert_equal(isricwise_ds.original["BULK"], da * 1)
+
+
+def test_conversion_plan_is_compiled_once(converter):
+    plan = converter.plan(["CLPC", "BULK", "TotDep"])
+    assert plan is converter.plan(["CLPC", "BULK", "TotDep"])
+    assert plan.names == ["clay", "bd"]
+    assert [factor for _, _, factor in plan.steps] == [0.01, 1]
+    assert converter.plan(["CLPC", "BULK"], dtype=np.float64) is not plan
+
+
+def test_conversion_plan_cache_is_bounded(converter):
+    converter.plan(["CLPC", "BULK"])
+    info = _compile_plan.cache_info()
+    assert info.maxsize is not None and 0 < info.currsize <= info.maxsize
+
+
+def test_conversion_plan_stack(converter, isricwise_ds):
+    source, mask = isricwise_ds.original, isricwise_ds.mask_3d
+    plan = converter.plan(source.data_vars)
+
+    stack = plan(source, mask)
+    assert stack.dtype == np.float32
+    assert stack.shape == (3,) + mask.shape
+
+    ds = plan.to_dataset(stack, source, mask)
+    for var in ["BULK", "PHAQ", "CLPC"]:
+        expected = converter(source[var])
+        name = expected.name
+        expected = expected * mask
+        np.testing.assert_allclose(ds[name].values, expected.values, rtol=1e-6)
+        assert ds[name].attrs["unit"] == converter(source[var]).attrs["unit"]
+
+    # preallocated output is reused
+    out = np.zeros_like(stack)
+    assert plan(source, mask, out=out) is out
+    np.testing.assert_array_equal(out, stack)
+    with pytest.raises(ValueError):
+        plan(source, mask, out=out[:2])
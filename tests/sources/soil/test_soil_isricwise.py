@@ -1,7 +1,12 @@
 import numpy as np
 import pytest
+import xarray as xr
 
-from ldndctools.sources.soil.soil_iscricwise import count_layers
+from ldndctools.io.regiongrid import RegionGrid
+from ldndctools.sources.soil.soil_iscricwise import (
+    count_layers,
+    ISRICWISE_SoilDataset,
+)
 
 
 def test_count_layers():
@@ -40,4 +45,128 @@ class TestIsricWiseSoilDataset:
             "clay",
             "scel",
             "ph",
+            "wcmin",
+            "wcmax",
         }
+
+
+def test_derived_properties_are_memoized(isricwise_ds):
+    soil = ISRICWISE_SoilDataset(isricwise_ds.original)
+    data = soil.data
+    assert soil.data is data
+    assert soil.mask is soil.mask
+    assert soil.number_of_sites == np.count_nonzero(soil.mask.values == 1)
+    assert soil.rebuilds == {
+        "layer_mask": 1,
+        "mask": 1,
+        "mask_3d": 1,
+        "data": 1,
+        "number_of_sites": 1,
+    }
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_gather_converts_only_the_cells(isricwise_ds, compact):
+    soil = ISRICWISE_SoilDataset(isricwise_ds.original, compact=compact)
+    jx, ix = np.nonzero(soil.layer_mask.notnull().values)
+    jx, ix = jx[::7], ix[::7]
+
+    sites = soil.gather(jx, ix)
+    assert soil.rebuilds == {"layer_mask": 1}
+
+    expected = soil.profiles.gather(jx, ix)
+    for var, values in expected.layers.items():
+        np.testing.assert_array_equal(sites.layers[var], values)
+
+
+def test_clip_invalidates_derived_properties(isricwise_ds):
+    soil = ISRICWISE_SoilDataset(isricwise_ds.original)
+    data, n = soil.data, soil.number_of_sites
+
+    lons, lats = soil.mask.lon.values, soil.mask.lat.values
+    soil.clip_mask_box(minx=lons[0], miny=lats.min(), maxx=lons[5], maxy=lats.max() + 1)
+    assert soil.data is not data
+    assert soil.data.sizes["lon"] < data.sizes["lon"]
+    assert soil.number_of_sites < n
+    assert soil.rebuilds["data"] == 2
+    assert soil.rebuilds["number_of_sites"] == 2
+
+
+@pytest.mark.parametrize(
+    "box",
+    [
+        dict(minx=6, miny=47, maxx=10, maxy=50),
+        dict(minx=7.3, miny=48.2, maxx=9.9, maxy=52.7),
+    ],
+)
+def test_window_converts_only_the_box(isricwise_ds, box):
+    clipped = ISRICWISE_SoilDataset(isricwise_ds.original)
+    clipped.clip_mask_box(**box)
+
+    windowed = ISRICWISE_SoilDataset(isricwise_ds.original)
+    windowed.window(**box)
+    assert windowed.original.sizes["lon"] < isricwise_ds.original.sizes["lon"]
+    np.testing.assert_array_equal(windowed.grid[1], isricwise_ds.original.lon)
+
+    windowed.clip_mask_box(**box)
+    xr.testing.assert_identical(windowed.mask, clipped.mask)
+    xr.testing.assert_identical(windowed.data, clipped.data)
+    assert windowed.rebuilds["layer_mask"] == 1
+
+
+def test_build_mask_matches_count_layers(isricwise_ds):
+    soil = isricwise_ds.original.copy(deep=True)
+    rng = np.random.default_rng(42)
+    check_vars = ["PHAQ", "BULK", "CLPC", "DEPTH"]
+    for v in check_vars:
+        values = soil[v].values
+        values[rng.random(values.shape) < 0.2] = np.nan
+        values[rng.random(values.shape) < 0.1] = -1
+
+    counts = xr.Dataset(
+        {
+            v: xr.apply_ufunc(
+                count_layers, soil[v], input_core_dims=[["lev"]], vectorize=True
+            )
+            for v in check_vars
+        }
+    )
+    expected = counts.where(counts > 0).to_array(dim="v", name="mask")
+    expected = expected.min(dim="v", skipna=False)
+
+    xr.testing.assert_identical(isricwise_ds._build_mask(soil), expected)
+
+
+def test_clip_mask_cells_matches_clip_mask(isricwise_ds, country_gdf, tmp_path):
+    box = dict(minx=5, miny=47, maxx=16, maxy=55)
+    deu = country_gdf[country_gdf.ADM0_A3 == "DEU"]
+
+    clipped = ISRICWISE_SoilDataset(isricwise_ds.original)
+    clipped.clip_mask_box(**box)
+    clipped.clip_mask(deu.geometry, all_touched=True)
+
+    rasterized = ISRICWISE_SoilDataset(isricwise_ds.original)
+    rasterized.clip_mask_box(**box)
+    regions = RegionGrid(country_gdf, *rasterized.grid, directory=tmp_path)
+    lats, lons = rasterized.layer_mask.lat.values, rasterized.layer_mask.lon.values
+    rasterized.clip_mask_cells(regions.mask(["DEU"], lats, lons))
+
+    xr.testing.assert_identical(rasterized.mask, clipped.mask)
+    xr.testing.assert_identical(rasterized.data, clipped.data)
+
+
+def test_compact_data_types(isricwise_ds):
+    soil = ISRICWISE_SoilDataset(isricwise_ds.original.copy(), compact=True)
+    assert all(soil.original[v].dtype != np.float64 for v in soil.original.data_vars)
+
+    data = soil.data
+    assert data["depth"].dtype == np.int16
+    assert {data[v].dtype for v in data.data_vars if v != "depth"} == {
+        np.dtype(np.float32)
+    }
+
+    missing = data["depth"] == soil.FILL_VALUE
+    np.testing.assert_array_equal(missing, isricwise_ds.data["depth"].isnull())
+    np.testing.assert_array_equal(
+        data["depth"].values[~missing], isricwise_ds.data["depth"].values[~missing]
+    )
@@ -1,9 +1,25 @@
+import io
+import json
+import xml.etree.cElementTree as et
 from importlib import resources
+from itertools import zip_longest
+from pathlib import Path
 
 import intake
+import numpy as np
 import pytest
 
-from ldndctools.io.xmlwriter import SiteXmlWriter
+from ldndctools.io import xmlwriter
+from ldndctools.io.layercache import LayerCache
+from ldndctools.io.xmlserializer import SiteXmlSerializer
+from ldndctools.io.xmlwriter import (
+    open_site_stream,
+    render_layers,
+    RenderedSite,
+    sample_cells,
+    SiteXmlStream,
+    SiteXmlWriter,
+)
 from ldndctools.misc.types import RES
 from ldndctools.sources.soil.soil_iscricwise import ISRICWISE_SoilDataset
 
@@ -38,3 +54,309 @@ def test_sitexml_lowres_number_of_sites(site_xml_writer_lr):
 def test_sitexml_highres_number_of_sites(site_xml_writer_hr):
     """check number of valid sites in hr data"""
     assert site_xml_writer_hr.number_of_sites == 2069990
+
+
+@pytest.fixture
+def reference_xml():
+    """return site xml created with the original per-point writer"""
+    return (Path(__file__).parent / "data" / "ISRICWISE_DE_LR_sites.xml").read_text()
+
+
+def test_sitexml_write_matches_reference(isricwise_ds, reference_xml):
+    """check that the vectorized extraction produces identical xml output"""
+    writer = SiteXmlWriter(isricwise_ds, res=RES.LR)
+    assert writer.write() == reference_xml
+
+
+def test_sitexml_write_compact_soil(isricwise_ds, reference_xml):
+    soil = ISRICWISE_SoilDataset(isricwise_ds.original.copy(), compact=True)
+    xml = SiteXmlWriter(soil, res=RES.LR).write()
+
+    # values agree at the significant digits of the target attributes
+    msd = {a.name: a.msd for a in soil._target_attrs}
+    layers = et.fromstring(xml).iter("layer")
+    reference = et.fromstring(reference_xml).iter("layer")
+    for layer, expected in zip_longest(layers, reference):
+        assert layer.keys() == expected.keys()
+        for k, d in msd.items():
+            if k in expected.keys():
+                assert round(float(layer.get(k)), d) == round(float(expected.get(k)), d)
+
+
+def test_sitexml_write_assigns_ids_to_mask(isricwise_ds):
+    writer = SiteXmlWriter(isricwise_ds, res=RES.LR)
+    writer.write()
+    ids = writer.arrays["siteid"]
+    assert ids.notnull().sum().item() == writer.number_of_sites
+    assert ids.sel(lat=47.25, lon=5.25, method="nearest").item() == 872670179
+
+
+def test_sitexml_write_counts_rejected_values(isricwise_ds):
+    writer = SiteXmlWriter(isricwise_ds, res=RES.LR)
+    writer.write(sample=50, seed=0)
+    assert "texture" in writer.rejected
+    assert all(v >= 0 for v in writer.rejected.values())
+
+
+def test_sitexml_write_discretization(isricwise_ds, reference_xml):
+    writer = SiteXmlWriter(isricwise_ds, res=RES.LR)
+    assert writer.write(discretization="extra_split") == reference_xml
+
+    sites = et.fromstring(writer.write(discretization=(20, 300))).findall("site")
+    reference = et.fromstring(reference_xml).findall("site")
+    assert [s.get("id") for s in sites] == [s.get("id") for s in reference]
+    for site, ref in zip(sites, reference):
+        depths = [int(lay.get("depth")) for lay in site.iter("layer")]
+        assert sum(depths) == sum(int(lay.get("depth")) for lay in ref.iter("layer"))
+        assert all(d == 20 for d in depths[: 300 // 20 - 1])
+
+
+def test_sitexml_write_caches_id_grid(isricwise_ds, cache_dir):
+    SiteXmlWriter(isricwise_ds, res=RES.LR).write(sample=3)
+    assert list((cache_dir / "idgrids").glob("geohash_LR_*.npy"))
+
+
+def test_sitexml_write_streams_to_file(isricwise_ds, reference_xml, tmp_path):
+    writer = SiteXmlWriter(isricwise_ds, res=RES.LR)
+    outfile = tmp_path / "sites.xml"
+    assert writer.write(outfile=outfile) is None
+    assert outfile.read_text() == reference_xml
+
+
+def test_sitexml_write_streams_to_file_object(isricwise_ds, reference_xml):
+    writer = SiteXmlWriter(isricwise_ds, res=RES.LR)
+    buffer = io.StringIO()
+    writer.write(outfile=buffer)
+    assert buffer.getvalue() == reference_xml
+
+
+def test_sitexml_stream_without_sites():
+    buffer = io.StringIO()
+    SiteXmlStream(buffer).close()
+    assert buffer.getvalue() == '<?xml version="1.0" ?>\n<ldndcsite/>\n'
+
+
+def test_sitexml_write_compact(isricwise_ds, reference_xml):
+    writer = SiteXmlWriter(isricwise_ds, res=RES.LR)
+    compact = et.fromstring(writer.write(pretty=False))
+    pretty = et.fromstring(reference_xml)
+    assert len(compact) == len(pretty)
+    for a, b in zip(compact.iter(), pretty.iter()):
+        assert (a.tag, a.attrib) == (b.tag, b.attrib)
+
+
+def test_sitexml_write_parallel(isricwise_ds, reference_xml):
+    writer = SiteXmlWriter(isricwise_ds, res=RES.LR)
+    assert writer.write(workers=2) == reference_xml
+
+
+def test_sitexml_write_shards_by_sites(isricwise_ds, reference_xml, tmp_path):
+    writer = SiteXmlWriter(isricwise_ds, res=RES.LR)
+    writer.write(outfile=tmp_path / "sites_LR.xml", shard_sites=100)
+
+    manifest = json.loads((tmp_path / "sites_LR.manifest.json").read_text())
+    assert [s["sites"] for s in manifest["shards"]] == [100, 100, 100, 4]
+    assert manifest["sites"] == 304
+
+    reference = et.fromstring(reference_xml).findall("site")
+    sites = []
+    for shard in manifest["shards"]:
+        shard_sites = et.parse(tmp_path / shard["file"]).getroot().findall("site")
+        ids = [int(s.get("id")) for s in shard_sites]
+        lons = [float(s.get("lon")) for s in shard_sites]
+        assert shard["id_range"] == [min(ids), max(ids)]
+        assert shard["bbox"][0] == min(lons) and shard["bbox"][2] == max(lons)
+        sites.extend(shard_sites)
+    assert [s.attrib for s in sites] == [s.attrib for s in reference]
+
+
+def test_sitexml_write_shards_by_bytes(isricwise_ds, tmp_path):
+    writer = SiteXmlWriter(isricwise_ds, res=RES.LR)
+    writer.write(outfile=tmp_path / "sites_LR.xml", shard_bytes=50_000)
+
+    manifest = json.loads((tmp_path / "sites_LR.manifest.json").read_text())
+    assert len(manifest["shards"]) > 1
+    for shard in manifest["shards"]:
+        size = (tmp_path / shard["file"]).stat().st_size
+        assert size == shard["bytes"] <= 50_000
+
+
+def test_site_stream_shards_count_bytes(tmp_path):
+    serializer = SiteXmlSerializer()
+    site = serializer.site(lat=1.0, lon=2.0, cid=3, layers="<!-- Bodenfläche -->\n")
+    with open_site_stream(
+        tmp_path / "sites.xml", serializer, shard_bytes=1_000
+    ) as stream:
+        for cid in range(10):
+            stream.add(RenderedSite(cid=cid, lat=1.0, lon=2.0, xml=site))
+
+    manifest = json.loads((tmp_path / "sites.manifest.json").read_text())
+    for shard in manifest["shards"]:
+        size = (tmp_path / shard["file"]).stat().st_size
+        assert size == shard["bytes"] <= 1_000
+
+
+def test_site_stream_shards_are_closed_on_error(tmp_path):
+    serializer = SiteXmlSerializer()
+    site = serializer.site(lat=1.0, lon=2.0, cid=3, layers="")
+    with pytest.raises(RuntimeError):
+        with open_site_stream(tmp_path / "sites.xml", serializer, shard_sites=2) as s:
+            for cid in range(3):
+                s.add(RenderedSite(cid=cid, lat=1.0, lon=2.0, xml=site))
+            raise RuntimeError("rendering failed")
+
+    manifest = json.loads((tmp_path / "sites.manifest.json").read_text())
+    assert [shard["sites"] for shard in manifest["shards"]] == [2, 1]
+    for shard in manifest["shards"]:
+        et.parse(tmp_path / shard["file"])
+
+
+def test_sitexml_write_shards_require_path(isricwise_ds):
+    writer = SiteXmlWriter(isricwise_ds, res=RES.LR)
+    with pytest.raises(ValueError):
+        writer.write(shard_sites=10)
+
+
+def test_render_layers_completes_each_profile_once(isricwise_ds, monkeypatch):
+    """profiles in the cache are not validated, completed and rendered again"""
+    cells = isricwise_ds.profiles.gather()
+    completed = []
+    build = xmlwriter.build_layer_table
+
+    def build_layer_table(layers, **kwargs):
+        completed.append(len(layers["depth"]))
+        return build(layers, **kwargs)
+
+    monkeypatch.setattr(xmlwriter, "build_layer_table", build_layer_table)
+    serializer, cache = SiteXmlSerializer(), LayerCache()
+    layers, rejected = render_layers(cells, serializer, cache)
+    assert sum(completed) == cache.misses < len(cells)
+    assert len(rejected) == len(cells)
+
+    assert render_layers(cells, serializer) == (layers, rejected)
+    assert render_layers(cells, serializer, cache)[0] == layers
+    assert cache.hits == 2 * len(cells) - cache.misses
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_sitexml_write_layer_cache(isricwise_ds, reference_xml, workers):
+    writer = SiteXmlWriter(isricwise_ds, res=RES.LR)
+    assert writer.write(cache_size=0, workers=workers) == reference_xml
+    assert writer.cache_stats is None
+
+    assert writer.write(cache_size=5, workers=workers) == reference_xml
+    assert sum(writer.cache_stats.values()) == writer.number_of_sites
+    assert writer.cache_stats["hits"] > 0
+
+
+def test_sitexml_write_sample(isricwise_ds, reference_xml):
+    writer = SiteXmlWriter(isricwise_ds, res=RES.LR)
+    sites = et.fromstring(writer.write(sample=25, seed=42)).findall("site")
+    assert len(sites) == 25
+    assert writer.arrays["siteid"].notnull().sum().item() == 25
+
+    # sampled sites are identical to the sites of a full run (and in grid order)
+    def content(site):
+        return [(e.tag, e.attrib) for e in site.iter()]
+
+    reference = {s.get("id"): content(s) for s in et.fromstring(reference_xml)}
+    assert all(content(s) == reference[s.get("id")] for s in sites)
+    ids = [int(s.get("id")) for s in sites]
+    order = [list(reference).index(str(i)) for i in ids]
+    assert order == sorted(order)
+
+
+def test_sitexml_write_sample_is_reproducible(isricwise_ds):
+    writer = SiteXmlWriter(isricwise_ds, res=RES.LR)
+    assert writer.write(sample=10, seed=1) == writer.write(sample=10, seed=1)
+    assert writer.write(sample=10, seed=1) != writer.write(sample=10, seed=2)
+
+
+def test_sitexml_write_sample_larger_than_region(isricwise_ds, reference_xml):
+    writer = SiteXmlWriter(isricwise_ds, res=RES.LR)
+    assert writer.write(sample=10_000) == reference_xml
+
+
+def test_sitexml_write_sample_valid_sites(isricwise_ds):
+    """cells without a valid layer are not drawn, only drawn cells are converted"""
+    ds = isricwise_ds.original.copy(deep=True)
+    ds["BULK"][:, : ds.sizes["lat"] // 2] = 9.0
+
+    def count(xml):
+        return len(et.fromstring(xml).findall("site"))
+
+    valid = count(SiteXmlWriter(ISRICWISE_SoilDataset(ds), res=RES.LR).write())
+    assert valid < isricwise_ds.number_of_sites / 2
+
+    soil = ISRICWISE_SoilDataset(ds)
+    writer = SiteXmlWriter(soil, res=RES.LR)
+    assert count(writer.write(sample=100, seed=0)) == 100
+    assert count(writer.write(sample=1_000, seed=0)) == valid
+    assert soil.rebuilds["profiles"] == 0
+
+
+def test_sample_cells_oversamples_by_valid_fraction(isricwise_ds, monkeypatch):
+    """later rounds draw by the observed valid fraction, sampled cells are reused"""
+    ds = isricwise_ds.original.copy(deep=True)
+    ds["BULK"][:, : ds.sizes["lat"] // 2] = 9.0
+    soil = ISRICWISE_SoilDataset(ds)
+    jx, ix = np.nonzero(soil.mask.values)
+
+    draws = []
+    gather = soil.gather
+    monkeypatch.setattr(
+        soil, "gather", lambda jx, ix: draws.append(len(jx)) or gather(jx, ix)
+    )
+    serializer = SiteXmlSerializer()
+
+    cells, layers, _ = sample_cells(soil, jx, ix, 100, serializer, seed=0)
+    assert len(cells) == len(layers) == 100 and all(layers)
+    assert draws[0] == 100 and len(draws) < 5
+    assert list(cells.jx) == sorted(cells.jx)
+
+    draws.clear()
+    cells, _, _ = sample_cells(soil, jx, ix, 100, serializer, seed=0, max_rounds=1)
+    assert draws == [100] and len(cells) < 100
+
+    # the writer renders the sampled cells without gathering them again
+    def sample(*args, **kwargs):
+        result = sample_cells(*args, **kwargs)
+        sampled.append(len(draws))
+        return result
+
+    sampled = []
+    monkeypatch.setattr(xmlwriter, "sample_cells", sample)
+    draws.clear()
+    SiteXmlWriter(soil, res=RES.LR).write(sample=100, seed=0)
+    assert sampled == [len(draws)] and 0 < len(draws) < 5
+
+
+def test_sitexml_write_id_selection(isricwise_ds, reference_xml):
+    """selected sites are identical to the full run and in grid order"""
+    reference = et.fromstring(reference_xml).findall("site")
+    selection = [int(reference[n].get("id")) for n in (250, 7, 100)] + [12345]
+
+    writer = SiteXmlWriter(isricwise_ds, res=RES.LR)
+    sites = et.fromstring(writer.write(id_selection=selection)).findall("site")
+    assert [s.attrib for s in sites] == [reference[n].attrib for n in (7, 100, 250)]
+
+
+def test_sitexml_write_coords(isricwise_ds, reference_xml):
+    """sites of the cells nearest to the points, with user ids, deduplicated"""
+    reference = et.fromstring(reference_xml).findall("site")
+    lonlat = [
+        (float(reference[n].get("lon")), float(reference[n].get("lat")))
+        for n in (250, 7, 100)
+    ]
+    coords = lonlat + [(lonlat[1][0] + 0.1, lonlat[1][1] - 0.1), (0.0, 0.0)]
+    ids = [1, 2, 3, 4, 5]
+
+    writer = SiteXmlWriter(isricwise_ds, res=RES.LR)
+    sites = et.fromstring(writer.write(coords=coords, coord_ids=ids)).findall("site")
+    assert [s.get("id") for s in sites] == ["2", "3", "1"]
+
+    def content(site):
+        return [(e.tag, e.attrib) for e in site.iter() if e.tag != "site"]
+
+    assert [content(s) for s in sites] == [content(reference[n]) for n in (7, 100, 250)]
+    assert sorted(writer.arrays["siteid"].to_series().dropna()) == [1, 2, 3]
@@ -0,0 +1,16 @@
+from ldndctools.io.zarrstore import DEFAULT_CHUNKS
+from ldndctools.soilzarr import conf
+
+
+def test_soilzarr_defaults():
+    args = conf([])
+    assert args.resolution == ["LR", "MR", "HR"]
+    assert args.chunks == [DEFAULT_CHUNKS["lat"], DEFAULT_CHUNKS["lon"]]
+    assert not args.overwrite
+
+
+def test_soilzarr_options():
+    args = conf(["-r", "HR", "MR", "--chunks", "64", "128", "--overwrite"])
+    assert args.resolution == ["HR", "MR"]
+    assert args.chunks == [64, 128]
+    assert args.overwrite